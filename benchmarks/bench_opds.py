@@ -0,0 +1,83 @@
+"""
+Compare the cost of extracting links from OPDS feeds using atoma and CMOPDSParser.
+
+    poetry run python benchmarks/bench_opds.py [--scale N] [FEED ...]
+
+Each FEED is a recorded OPDS document (for example, saved with curl from a CM). If
+no feeds are given, the sample feeds used by the unit tests are measured. The
+entries of each feed are repeated --scale times to approximate large acquisition
+feeds.
+"""
+import argparse
+import glob
+import os
+import timeit
+from pathlib import Path
+from typing import Callable, List
+
+import atoma
+
+from circulation_load_test.common.cmopds import CMOPDSParser
+
+FEEDS = os.path.join(Path(__file__).parent.parent, "tests", "feeds")
+
+
+def scale(data: bytes, factor: int) -> bytes:
+    """Repeat the entries of the given feed 'factor' times."""
+    start = data.find(b"<entry")
+    end = data.rfind(b"</entry>")
+    if start < 0 or end < 0 or factor <= 1:
+        return data
+    end += len(b"</entry>")
+    return data[:start] + data[start:end] * factor + data[end:]
+
+
+def parse_atoma(data: bytes):
+    feed = atoma.parse_atom_bytes(data)
+    links = [link.href for link in feed.links]
+    for entry in feed.entries:
+        links.extend(link.href for link in entry.links)
+    return links
+
+
+def parse_streaming(data: bytes):
+    feed = CMOPDSParser.parse(data)
+    links = [link.href for link in feed.links]
+    for entry in feed.entries:
+        links.extend(link.href for link in entry.links)
+    return links
+
+
+def measure(function: Callable[[bytes], List[str]], data: bytes) -> float:
+    timer = timeit.Timer(lambda: function(data))
+    count, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=count))
+    return best / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("feeds", nargs="*", help="Recorded OPDS feeds")
+    parser.add_argument("--scale", type=int, default=100, help="Entry repetitions")
+    args = parser.parse_args()
+
+    feeds = args.feeds or sorted(glob.glob(os.path.join(FEEDS, "*.xml")))
+    print(
+        f"{'feed':<32} {'bytes':>10} {'atoma ms':>10} {'stream ms':>10} {'speedup':>8}"
+    )
+    for path in feeds:
+        with open(path, "rb") as f:
+            data = scale(f.read(), args.scale)
+
+        assert parse_atoma(data) == parse_streaming(data)
+        time_atoma = measure(parse_atoma, data)
+        time_streaming = measure(parse_streaming, data)
+        print(
+            f"{os.path.basename(path):<32} {len(data):>10} "
+            f"{time_atoma * 1000:>10.3f} {time_streaming * 1000:>10.3f} "
+            f"{time_atoma / time_streaming:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Measure the time and memory that a Locust worker spends importing the locustfile.
+
+    poetry run python benchmarks/bench_startup.py [--runs N] [--corpus FILE]
+
+Each stage is measured in a fresh Python process, --runs times: importing Locust
+alone, importing the locustfile (without a configuration file, which it must not
+need), and importing the locustfile and then loading the configuration and the
+search term corpus, as a worker does before its first search. The benchmark reports
+the median time taken to import Locust and to run the rest of each stage, and the
+largest peak resident set size of the stage's processes.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).parent.parent
+HOSTS = os.path.join(ROOT, "tests", "hosts.json")
+
+# The statements that each stage runs after importing Locust, and whether the stage
+# is given the configuration file.
+STAGES = {
+    "locust": ("", False),
+    "locustfile": ("import locustfile", False),
+    "corpus": (
+        "import locustfile\n"
+        "from circulation_load_test.common.words import Words\n"
+        "Words.get()\n",
+        True,
+    ),
+}
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import locust
+imported = time.perf_counter()
+exec(compile(sys.argv[1], "<stage>", "exec"))
+finished = time.perf_counter()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    peak //= 1024
+print(
+    json.dumps(
+        {"locust": imported - start, "stage": finished - imported, "peak_kib": peak}
+    )
+)
+"""
+
+
+def write_configuration(corpus: Optional[str]) -> str:
+    with open(HOSTS) as f:
+        hosts = json.load(f)
+    if corpus is not None:
+        hosts["circulation_manager"]["search_terms"] = {"corpus": corpus}
+    handle, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(handle, "w") as f:
+        json.dump(hosts, f)
+    return path
+
+
+def run_stage(statements: str, environment: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, statements],
+        cwd=ROOT,
+        env=environment,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--corpus", help="A search term corpus to load")
+    args = parser.parse_args()
+
+    configuration = write_configuration(args.corpus)
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [str(ROOT / "src"), environment.get("PYTHONPATH", "")]
+    ).rstrip(os.pathsep)
+    environment.pop("CIRCULATION_LOAD_CONFIGURATION_FILE", None)
+    environment.pop("CIRCULATION_LOAD_PRELOAD", None)
+    try:
+        print(f"{'stage':<12} {'locust ms':>10} {'stage ms':>10} {'peak RSS MiB':>13}")
+        for name, (statements, configured) in STAGES.items():
+            stage_environment = dict(environment)
+            if configured:
+                stage_environment["CIRCULATION_LOAD_CONFIGURATION_FILE"] = configuration
+            results: List[Dict[str, Any]] = [
+                run_stage(statements, stage_environment) for _ in range(args.runs)
+            ]
+            locust = statistics.median(r["locust"] for r in results) * 1000.0
+            stage = statistics.median(r["stage"] for r in results) * 1000.0
+            peak = max(r["peak_kib"] for r in results) / 1024.0
+            print(f"{name:<12} {locust:>10.1f} {stage:>10.1f} {peak:>13.1f}")
+    finally:
+        os.unlink(configuration)
+
+
+if __name__ == "__main__":
+    main()
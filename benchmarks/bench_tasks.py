@@ -0,0 +1,233 @@
+"""
+Measure the client-side cost of every CMTests and RegistryTests task.
+
+    poetry run python benchmarks/bench_tasks.py [--save FILE] [--compare FILE]
+
+Each task is run repeatedly by a single simulated user against the mock server
+(started in a subprocess, so that its CPU time is not counted). For each task the
+benchmark reports the client CPU time per request, the peak memory traced by
+tracemalloc per request, and the maximum request rate that one fully-utilized core
+could sustain. Results can be saved as a JSON baseline, and a later run can be
+compared against that baseline; the comparison exits with a non-zero status if any
+task regressed by more than the given tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+HOSTS = os.path.join(Path(__file__).parent.parent, "tests", "hosts.json")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Mock server did not start on port {port}")
+
+
+def start_mock_server(port: int, arguments: List[str]) -> subprocess.Popen:
+    command = [sys.executable, "-m", "circulation_load_test.mock"]
+    command += ["--port", str(port)] + arguments
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    _wait_for_port(port, timeout=30.0)
+    return process
+
+
+def write_configuration(address: str) -> str:
+    with open(HOSTS) as f:
+        hosts = json.load(f)
+    hosts["circulation_manager"]["host"] = address
+    hosts["registry"]["host"] = address
+    # Read without pausing between updates, so that reading_sync measures requests
+    # rather than simulated reading time.
+    hosts["circulation_manager"]["reading_sync"] = {
+        "updates": 2,
+        "update_interval": {"distribution": "none"},
+    }
+    handle, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(handle, "w") as f:
+        json.dump(hosts, f)
+    return path
+
+
+class TaskBenchmark:
+    """Runs a single task repeatedly, counting the requests that it makes."""
+
+    def __init__(self, user_class, task: Callable):
+        from locust.env import Environment
+
+        self.name = f"{user_class.__name__}.{task.__name__}"
+        self.task = task
+        self.requests = 0
+        self.failures = 0
+        environment = Environment(user_classes=[user_class])
+        environment.events.request.add_listener(self._on_request)
+        self.user = user_class(environment)
+
+    def _on_request(self, exception=None, **kwargs):
+        self.requests += 1
+        if exception is not None:
+            self.failures += 1
+
+    def _run(self, iterations: int):
+        for _ in range(iterations):
+            try:
+                self.task(self.user)
+            except Exception:
+                self.failures += 1
+
+    def measure(self, iterations: int, warmup: int) -> Dict[str, Any]:
+        self._run(warmup)
+
+        self.requests = 0
+        self.failures = 0
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        self._run(iterations)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        requests = max(1, self.requests)
+        failures = self.failures
+
+        self.requests = 0
+        tracemalloc.start()
+        peak = 0
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            self._run(1)
+            peak += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        traced_requests = max(1, self.requests)
+
+        return {
+            "requests": requests,
+            "failures": failures,
+            "cpu_us_per_request": cpu * 1_000_000 / requests,
+            "peak_kib_per_request": peak / 1024 / traced_requests,
+            "rps_per_core": requests / cpu if cpu > 0 else float("inf"),
+            "wall_seconds": wall,
+        }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    results: Dict[str, Any],
+    tolerance: float,
+    selected: Optional[Set[str]],
+) -> List[str]:
+    """Return a description of every task that regressed against the baseline."""
+    regressions = []
+    for name, base in baseline["tasks"].items():
+        if selected is not None and name.split(".")[-1] not in selected:
+            continue
+        current = results["tasks"].get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from this run")
+            continue
+        for metric in ("cpu_us_per_request", "peak_kib_per_request"):
+            if current[metric] > base[metric] * (1.0 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {current[metric]:.1f} > {base[metric]:.1f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--tasks", help="Comma-separated task names to run")
+    parser.add_argument("--save", help="Save the results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare the results to a JSON baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative regression when comparing (default 0.25)",
+    )
+    parser.add_argument(
+        "mock_arguments",
+        nargs=argparse.REMAINDER,
+        help="Arguments passed to the mock server after --",
+    )
+    args = parser.parse_args()
+    mock_arguments = [a for a in args.mock_arguments if a != "--"]
+
+    port = _free_port()
+    server = start_mock_server(port, mock_arguments)
+    configuration = write_configuration(f"http://127.0.0.1:{port}/")
+    os.environ["CIRCULATION_LOAD_CONFIGURATION_FILE"] = configuration
+    selected = set(args.tasks.split(",")) if args.tasks else None
+    try:
+        from circulation_load_test.cm.basic import CMTests
+        from circulation_load_test.registry.registry import RegistryTests
+
+        results: Dict[str, Any] = {
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "mock_arguments": mock_arguments,
+            "tasks": {},
+        }
+
+        header = f"{'task':<32} {'requests':>8} {'cpu us/req':>11}"
+        print(f"{header} {'peak KiB/req':>13} {'req/s/core':>11} {'failures':>8}")
+        for user_class in (CMTests, RegistryTests):
+            seen = set()
+            for task in user_class.tasks:
+                if task.__name__ in seen:
+                    continue
+                seen.add(task.__name__)
+                if selected is not None and task.__name__ not in selected:
+                    continue
+
+                benchmark = TaskBenchmark(user_class, task)
+                result = benchmark.measure(args.iterations, args.warmup)
+                results["tasks"][benchmark.name] = result
+                print(
+                    f"{benchmark.name:<32} {result['requests']:>8} "
+                    f"{result['cpu_us_per_request']:>11.1f} "
+                    f"{result['peak_kib_per_request']:>13.1f} "
+                    f"{result['rps_per_core']:>11.0f} {result['failures']:>8}"
+                )
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(configuration)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance, selected)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,22 @@
-# Note: All imports in this file are used by Locust to locate tests.
+import os
+
+# Note: The imports of user classes in this file are used by Locust to locate tests.
 from circulation_load_test.cm.basic import CMTests  # noqa: autoflake
+from circulation_load_test.cm.journey import CMJourneyTests  # noqa: autoflake
+from circulation_load_test.cm.replay import CMReplayTests  # noqa: autoflake
+
+# Shards the patrons, libraries, and books between the workers of a distributed test.
+from circulation_load_test.common.cmdistribution import (  # noqa: autoflake
+    CMDistribution,
+)
+
+# Records per-endpoint latency histograms when they are enabled.
+from circulation_load_test.common.cmhistogram import CMHistograms  # noqa: autoflake
+from circulation_load_test.common.words import Words
 from circulation_load_test.registry.registry import RegistryTests  # noqa: autoflake
+
+# Set CIRCULATION_LOAD_PRELOAD to load the configuration and the search term corpora
+# when the locustfile is imported, so that the worker processes started with
+# --processes share them instead of each loading their own copy.
+if os.getenv("CIRCULATION_LOAD_PRELOAD"):
+    Words.preload()
@@ -0,0 +1,57 @@
+import argparse
+import logging
+
+from circulation_load_test.catalog.crawl import CMCatalogCrawler
+from circulation_load_test.common.cmcatalog import CMCatalogIndex
+from circulation_load_test.common.config import Configurations
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m circulation_load_test.catalog",
+        description=(
+            "Crawl the libraries of the configured Circulation Manager and write an "
+            "index of their borrowable books."
+        ),
+    )
+    parser.add_argument("--output", required=True, help="The index file to write")
+    parser.add_argument(
+        "--libraries",
+        help="Comma-separated library identifiers (default: the configured libraries)",
+    )
+    parser.add_argument(
+        "--maximum-feeds",
+        type=int,
+        default=100,
+        help="Feeds crawled per library",
+    )
+    parser.add_argument(
+        "--maximum-entries",
+        type=int,
+        default=10000,
+        help="Borrowable entries recorded per library",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    config = Configurations.get().circulation_manager
+    if args.libraries:
+        identifiers = [id.strip() for id in args.libraries.split(",") if id.strip()]
+    else:
+        identifiers = sorted(config.library_identifiers)
+
+    crawler = CMCatalogCrawler(args.maximum_feeds, args.maximum_entries)
+    libraries = []
+    for identifier in identifiers:
+        root = f"{config.address.rstrip('/')}/{identifier}/"
+        entries = crawler.crawl(root)
+        print(f"{identifier}: {len(entries)} borrowable books")
+        libraries.append((identifier, root, entries))
+
+    total = CMCatalogIndex.write(args.output, libraries)
+    print(f"Wrote {total} books to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+from urllib.request import Request, urlopen
+
+from circulation_load_test.common.cmcatalog import CMCatalogEntry
+from circulation_load_test.common.cmopds import CMOPDSParser
+
+REL_BORROW = "http://opds-spec.org/acquisition/borrow"
+
+# The links followed while crawling: lanes, and further pages of each lane.
+CRAWL_RELATIONS = frozenset({"collection", "next"})
+
+Fetch = Callable[[str], Optional[bytes]]
+
+
+def fetch(url: str, timeout: float = 30.0) -> Optional[bytes]:
+    """Fetch an OPDS feed, returning None if the response is not an Atom document."""
+    request = Request(url, headers={"Accept": "application/atom+xml"})
+    with urlopen(request, timeout=timeout) as response:
+        content_type = response.headers.get("content-type") or ""
+        if not content_type.startswith("application/atom+xml"):
+            return None
+        return response.read()
+
+
+class CMCatalogCrawler:
+    """
+    Crawl the lanes of a library breadth-first from its catalog root, recording every
+    entry that has a borrow link. The crawl stops after 'maximum_feeds' feeds or once
+    'maximum_entries' borrowable entries have been found.
+    """
+
+    def __init__(
+        self,
+        maximum_feeds: int = 100,
+        maximum_entries: int = 10000,
+        fetch: Fetch = fetch,
+    ):
+        assert maximum_feeds > 0
+        assert maximum_entries > 0
+        self.maximum_feeds = maximum_feeds
+        self.maximum_entries = maximum_entries
+        self.fetch = fetch
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def crawl(self, root: str) -> List[CMCatalogEntry]:
+        entries: Dict[str, CMCatalogEntry] = {}
+        frontier: Deque[str] = deque([root])
+        visited: Set[str] = {root}
+        feeds = 0
+
+        while frontier and feeds < self.maximum_feeds:
+            url = frontier.popleft()
+            self.logger.info(f"get {url}")
+            data = self.fetch(url)
+            feeds += 1
+            if data is None:
+                continue
+
+            feed = CMOPDSParser.parse(
+                data,
+                feed_rels=CRAWL_RELATIONS,
+                entry_rels=CRAWL_RELATIONS | {REL_BORROW},
+            )
+            links = list(feed.links)
+            for entry in feed.entries:
+                links.extend(link for link in entry.links if link.rel != REL_BORROW)
+                for link in entry.links:
+                    if link.rel != REL_BORROW:
+                        continue
+                    book_id = entry.id or link.href
+                    if book_id not in entries:
+                        media_type = (
+                            link.acquisition_types[-1]
+                            if link.acquisition_types
+                            else link.type
+                        )
+                        entries[book_id] = CMCatalogEntry(
+                            book_id=book_id,
+                            borrow_link=link.href,
+                            media_type=media_type,
+                        )
+                    break
+
+            if len(entries) >= self.maximum_entries:
+                break
+
+            for link in links:
+                if link.href not in visited:
+                    visited.add(link.href)
+                    frontier.append(link.href)
+
+        self.logger.info(f"found {len(entries)} borrowable entries in {feeds} feeds")
+        return list(entries.values())[: self.maximum_entries]
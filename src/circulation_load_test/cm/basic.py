@@ -2,17 +2,28 @@ import random
 
 from locust import tag, task
 
+from circulation_load_test.common.cmbookmarkwriter import CMBookmarkWriter
+from circulation_load_test.common.cmcatalog import CMCatalogs
 from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+from circulation_load_test.common.cmlinkgraph import CMLinkGraphs
 from circulation_load_test.common.cmlogin import CMLogin
+from circulation_load_test.common.cmopensearch import CMSearchTemplates
+from circulation_load_test.common.cmreadingsync import CMReadingSync
 from circulation_load_test.common.cmsearch import CMSearch
 from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+from circulation_load_test.common.cmshard import CMShards
 from circulation_load_test.common.cmuser import CMAuthenticationLinkType, CMHTTPUser
-from circulation_load_test.common.config import Configurations
+from circulation_load_test.common.cmworkload import CMWorkload
+from circulation_load_test.common.config import Configurations, Configured
 
 
 class CMTests(CMHTTPUser):
 
-    host = Configurations.get().circulation_manager.address
+    host = Configured(lambda config: config.circulation_manager.address)
+
+    def on_stop(self):
+        CMSearchAndBookmark.revoke_pooled_loans(self)
+        super().on_stop()
 
     @task
     @tag("cm")
@@ -26,9 +37,7 @@ class CMTests(CMHTTPUser):
     @tag("login_multiple")
     def login_multiple(self):
         """Check how long it takes to log in to the target CM."""
-        id = random.choice(
-            list(Configurations.get().circulation_manager.library_identifiers)
-        )
+        id = random.choice(CMShards.libraries())
         CMLogin.login_specific(self, id)
 
     @task
@@ -36,12 +45,18 @@ class CMTests(CMHTTPUser):
     @tag("feeds")
     def random_feed_walk(self):
         """Walk through feeds at random until reaching a maximum depth."""
-        document = CMLogin.login(self)
+        document = CMLogin.login_cached(self)
         root = document.links[CMAuthenticationLinkType.CATALOG]
+        walk_config = Configurations.get().circulation_manager.feed_walk
         walk = CMFeedWalk(
             root,
             allowed_link_relations={"collection", "related", "alternate"},
-            maximum_visits=10,
+            maximum_visits=walk_config.maximum_visits,
+            policy=walk_config.policy,
+            concurrency=walk_config.concurrency,
+            maximum_depth=walk_config.maximum_depth,
+            maximum_bytes=walk_config.maximum_bytes,
+            link_graph=CMLinkGraphs.get(),
         )
         walk.execute(self)
 
@@ -50,10 +65,13 @@ class CMTests(CMHTTPUser):
     @tag("search")
     def random_search(self):
         """Perform a random search and walk through all the results."""
-        document = CMLogin.login(self)
+        document = CMLogin.login_cached(self)
         root = document.links[CMAuthenticationLinkType.CATALOG]
-        search_link = CMSearch.find_search_link(self, root)
-        search = CMSearch(search_link)
+        template = CMSearchTemplates.find(self, root)
+        if template is None:
+            raise ValueError(f"No search link found in {root}")
+        pagination = Configurations.get().circulation_manager.search_pagination
+        search = CMSearch(template, pagination)
         search.execute(self)
 
     @task
@@ -61,8 +79,37 @@ class CMTests(CMHTTPUser):
     @tag("bookmarks")
     def bookmarks(self):
         """Borrow an open access book, and start producing a lot of bookmarks."""
-        document = CMLogin.login(self)
+        document = CMLogin.login_cached(self)
         root = document.links[CMAuthenticationLinkType.CATALOG]
-        search_link = CMSearchAndBookmark.find_search_link(self, root)
-        search = CMSearchAndBookmark(search_link)
+        template = CMSearchTemplates.find(self, root)
+        if template is None:
+            raise ValueError(f"No search link found in {root}")
+        config = Configurations.get().circulation_manager
+        writer = CMBookmarkWriter.create(config.bookmarks)
+        catalog = CMCatalogs.get()
+        books = catalog.library_for_root(root) if catalog is not None else None
+        search = CMSearchAndBookmark(template, writer, books, root)
         search.execute(self)
+
+    @task
+    @tag("cm")
+    @tag("reading_sync")
+    @CMWorkload.optional
+    def reading_sync(self):
+        """Borrow a book, and synchronize the reading position while reading it."""
+        document = CMLogin.login_cached(self)
+        root = document.links[CMAuthenticationLinkType.CATALOG]
+        template = CMSearchTemplates.find(self, root)
+        if template is None:
+            raise ValueError(f"No search link found in {root}")
+        config = Configurations.get().circulation_manager
+        sync = CMReadingSync.create(config.reading_sync)
+        catalog = CMCatalogs.get()
+        books = catalog.library_for_root(root) if catalog is not None else None
+        search = CMSearchAndBookmark(template, sync, books, root)
+        search.execute(self)
+
+
+CMWorkload.apply_on_init(
+    CMTests, lambda: Configurations.get().circulation_manager.workload
+)
@@ -0,0 +1,43 @@
+from locust import tag, task
+
+from circulation_load_test.common.cmjourney import CMJourney
+from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.cmworkload import CMWorkload
+from circulation_load_test.common.config import (
+    CMWorkloadConfiguration,
+    Configurations,
+    Configured,
+)
+
+
+class CMJourneyTests(CMHTTPUser):
+
+    host = Configured(lambda config: config.circulation_manager.address)
+
+    # Journey users only run when journeys are configured: Locust leaves out user
+    # classes with no weight.
+    weight = Configured(lambda config: config.circulation_manager.journey.weight)
+
+    def on_stop(self):
+        CMSearchAndBookmark.revoke_pooled_loans(self)
+        super().on_stop()
+
+    @task
+    @tag("cm")
+    @tag("journey")
+    def journey(self):
+        """Open the app and browse, search, borrow, read, and return books."""
+        CMJourney(Configurations.get().circulation_manager).execute(self)
+
+
+def _journey_workload() -> CMWorkloadConfiguration:
+    # Journeys use the think time or arrival rate of the CM workload, but not its
+    # task weights, which refer to the tasks of CMTests.
+    workload = Configurations.get().circulation_manager.workload
+    return CMWorkloadConfiguration(
+        think_time=workload.think_time, arrival_rate=workload.arrival_rate
+    )
+
+
+CMWorkload.apply_on_init(CMJourneyTests, _journey_workload)
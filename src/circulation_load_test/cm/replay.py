@@ -0,0 +1,45 @@
+from typing import Optional
+
+from locust import constant, tag, task
+from locust.exception import StopUser
+
+from circulation_load_test.common.cmreplay import CMReplay, CMReplayChannel, CMReplayers
+from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.config import Configured
+
+
+class CMReplayTests(CMHTTPUser):
+
+    host = Configured(lambda config: config.circulation_manager.address)
+
+    # The pace of a replay is set by the times in the log.
+    wait_time = constant(0)
+
+    # Replay users only run when a replay log is configured: Locust leaves out user
+    # classes with no weight.
+    weight = Configured(
+        lambda config: 0 if config.circulation_manager.replay.log is None else 1
+    )
+
+    _channel: Optional[CMReplayChannel] = None
+
+    def on_start(self):
+        replayer = CMReplayers.get()
+        assert replayer is not None
+        self._channel = replayer.register()
+
+    def on_stop(self):
+        replayer = CMReplayers.get()
+        if replayer is not None and self._channel is not None:
+            replayer.unregister(self._channel)
+            self._channel = None
+        super().on_stop()
+
+    @task
+    @tag("cm")
+    @tag("replay")
+    def replay(self):
+        """Reissue the requests of a recorded log against the target CM."""
+        assert self._channel is not None
+        if not CMReplay(self._channel).execute(self):
+            raise StopUser()
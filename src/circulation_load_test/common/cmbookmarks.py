@@ -101,8 +101,13 @@ class CMBookmarkBody(CMBookmarkElement):
 
 
 class CMMotivation(Enum):
-    IDLING = 1
-    BOOKMARKING = 2
+    """
+    The purpose of an annotation: a reading position, of which a patron has one per
+    book, or one of any number of bookmarks.
+    """
+
+    IDLING = "http://www.w3.org/ns/oa#idling"
+    BOOKMARKING = "http://www.w3.org/ns/oa#bookmarking"
 
 
 @dataclass
@@ -118,6 +123,6 @@ class CMBookmark(CMBookmarkElement):
             "type": "Annotation",
             "id": self.id,
             "body": self.body.to_json_dict(),
-            "motivation": "http://www.w3.org/ns/oa#bookmarking",
+            "motivation": self.motivation.value,
             "target": self.target.to_json_dict(),
         }
@@ -0,0 +1,156 @@
+import json
+import logging
+import time
+import uuid
+from typing import List, Mapping
+
+from gevent.pool import Pool
+
+from circulation_load_test.common.cmbookmarks import (
+    CMBookmark,
+    CMBookmarkBody,
+    CMBookmarkTarget,
+    CMLocatorPage,
+    CMMotivation,
+)
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.config import CMBookmarkWriteConfiguration
+
+TYPE_ANNOTATION = 'application/ld+json; profile="http://www.w3.org/ns/anno.jsonld"'
+
+# Placeholder values that are serialized into a template and then replaced. The page
+# placeholder is a number so that it survives the double encoding of the selector.
+_PAGE_PLACEHOLDER = 917_364_285_103
+_TIME_PLACEHOLDER = "@@time-7f3a9c@@"
+
+
+class CMBookmarkTemplate:
+    """
+    A bookmark serialized once, into which only the page and timestamp of each
+    individual bookmark are spliced.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        source: str,
+        device_id: str,
+        motivation: CMMotivation = CMMotivation.BOOKMARKING,
+    ):
+        bookmark = CMBookmark(
+            id=id,
+            target=CMBookmarkTarget(
+                locator=CMLocatorPage(_PAGE_PLACEHOLDER), source=source
+            ),
+            motivation=motivation,
+            body=CMBookmarkBody(device_id=device_id, time=_TIME_PLACEHOLDER, others={}),
+        )
+        text = json.dumps(bookmark.to_json_dict())
+
+        # Split the serialized bookmark into literal parts, and the slots between them.
+        self._parts: List[bytes] = []
+        self._slots: List[str] = []
+        position = 0
+        while True:
+            page = text.find(str(_PAGE_PLACEHOLDER), position)
+            stamp = text.find(_TIME_PLACEHOLDER, position)
+            found = [(i, s) for i, s in ((page, "page"), (stamp, "time")) if i >= 0]
+            if not found:
+                break
+            index, slot = min(found)
+            placeholder = (
+                str(_PAGE_PLACEHOLDER) if slot == "page" else _TIME_PLACEHOLDER
+            )
+            self._parts.append(text[position:index].encode("utf-8"))
+            self._slots.append(slot)
+            position = index + len(placeholder)
+        self._parts.append(text[position:].encode("utf-8"))
+
+        if sorted(self._slots) != ["page", "time"]:
+            raise ValueError(f"Unable to find the bookmark placeholders in {text}")
+
+    def render(self, page: int, timestamp: str) -> bytes:
+        """Serialize the bookmark for the given page and timestamp."""
+        values = {
+            "page": str(page).encode("utf-8"),
+            "time": json.dumps(timestamp)[1:-1].encode("utf-8"),
+        }
+        output = [self._parts[0]]
+        for slot, part in zip(self._slots, self._parts[1:]):
+            output.append(values[slot])
+            output.append(part)
+        return b"".join(output)
+
+
+class CMBookmarkWriter:
+    """
+    Write 'count' bookmarks for a loaned book, with up to 'concurrency' requests in
+    flight at once, and optionally read the annotations back afterwards.
+    """
+
+    def __init__(self, count: int = 99, concurrency: int = 1, read_back: bool = False):
+        assert isinstance(count, int) and count >= 1
+        assert isinstance(concurrency, int) and concurrency >= 1
+        assert isinstance(read_back, bool)
+        self.count = count
+        self.concurrency = concurrency
+        self.read_back = read_back
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _write(
+        self,
+        user: CMHTTPUser,
+        annotations_link: str,
+        headers: Mapping[str, str],
+        data: bytes,
+    ):
+        response = user.client.post(
+            annotations_link,
+            data=data,
+            headers=headers,
+            name=CMRequestNames.name(annotations_link),
+        )
+        if response.status_code >= 400:
+            self.logger.error(f"{response.text}")
+            user.raise_for_status(response)
+
+    def execute(self, user: CMHTTPUser, annotations_link: str, book_id: str):
+        """Write bookmarks for the given book to the given annotations service."""
+        template = CMBookmarkTemplate(
+            id=str(uuid.uuid4()), source=book_id, device_id=str(uuid.uuid4())
+        )
+
+        headers = {"content-type": TYPE_ANNOTATION}
+        headers.update(user.authentication.headers_required())
+
+        def write(page: int):
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+            self._write(
+                user, annotations_link, headers, template.render(page, timestamp)
+            )
+
+        self.logger.info(f"writing {self.count} bookmarks")
+        if self.concurrency == 1:
+            for page in range(1, self.count + 1):
+                write(page)
+        else:
+            pool = Pool(size=self.concurrency)
+            try:
+                for _ in pool.imap_unordered(write, range(1, self.count + 1)):
+                    pass
+            finally:
+                pool.kill()
+
+        if self.read_back:
+            self.logger.info(f"reading bookmarks {annotations_link}")
+            response = user.client.get(
+                annotations_link,
+                headers=user.authentication.headers_required(),
+                name=CMRequestNames.name(annotations_link),
+            )
+            user.raise_for_status(response)
+
+    @staticmethod
+    def create(config: CMBookmarkWriteConfiguration) -> "CMBookmarkWriter":
+        return CMBookmarkWriter(config.count, config.concurrency, config.read_back)
@@ -0,0 +1,222 @@
+import json
+import mmap
+import random
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from circulation_load_test.common.cmshard import CMShard, CMShards
+from circulation_load_test.common.config import Configurations
+
+_MAGIC = b"CMCATIDX"
+_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+_OFFSET = struct.Struct("<Q")
+_OFFSETS = struct.Struct("<QQ")
+
+
+@dataclass
+class CMCatalogEntry:
+    """A borrowable book, as recorded in a catalog index."""
+
+    book_id: str
+    borrow_link: str
+    media_type: Optional[str]
+
+
+def _root_path(url: str) -> str:
+    return urlsplit(url).path.rstrip("/")
+
+
+class CMCatalogLibrary:
+    """
+    The borrowable books of a single library in a catalog index. Books are chosen
+    at random from the given shard, unless the library has fewer books than there
+    are shards.
+    """
+
+    def __init__(
+        self,
+        index: "CMCatalogIndex",
+        identifier: str,
+        first: int,
+        count: int,
+        shard: CMShard = CMShard(),
+    ):
+        self.index = index
+        self.identifier = identifier
+        self.shard = shard
+        self._first = first
+        self._count = count
+        self._shard_size = shard.size(count)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, position: int) -> CMCatalogEntry:
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        return self.index._entry(self._first + position)
+
+    def random(self, root: str) -> CMCatalogEntry:
+        """
+        Choose a book uniformly at random. The borrow link is resolved against the
+        given catalog root, so that an index can be used with a different host from
+        the one that was crawled.
+        """
+        if self._shard_size > 0:
+            position = self.shard.item(random.randrange(self._shard_size))
+        else:
+            position = random.randrange(self._count)
+        entry = self.get(position)
+        return CMCatalogEntry(
+            book_id=entry.book_id,
+            borrow_link=urljoin(root, entry.borrow_link),
+            media_type=entry.media_type,
+        )
+
+
+class CMCatalogIndex:
+    """
+    A memory-mapped index of the borrowable books in one or more libraries, as
+    written by CMCatalogIndex.write (see the circulation_load_test.catalog tool).
+
+    The file contains a JSON header describing each library, followed by a table of
+    record offsets and the records themselves, so that any book can be read in
+    constant time without loading the whole index. Because the file is mapped
+    read-only, the index pages are shared by all of the workers on a machine.
+    """
+
+    def __init__(self, path: str, shard: CMShard = CMShard()):
+        assert isinstance(path, str)
+        self.path = path
+        self.shard = shard
+        self._file: Optional[BinaryIO] = None
+        self._map: Optional[mmap.mmap] = None
+        self._libraries: Dict[str, CMCatalogLibrary] = {}
+        self._roots: Dict[str, str] = {}
+        self._offsets = 0
+        self._records = 0
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, header_size = _PREAMBLE.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{self.path} is not a catalog index")
+            start = _PREAMBLE.size
+            header = json.loads(self._map[start : start + header_size])
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"Unable to read catalog index {self.path}: {e}") from e
+
+        total = header["total"]
+        self._offsets = _PREAMBLE.size + header_size
+        self._records = self._offsets + _OFFSET.size * (total + 1)
+        for identifier, library in header["libraries"].items():
+            self._libraries[identifier] = CMCatalogLibrary(
+                self, identifier, library["first"], library["count"], self.shard
+            )
+            self._roots[library["root"]] = identifier
+
+    def _entry(self, index: int) -> CMCatalogEntry:
+        assert self._map is not None
+        start, end = _OFFSETS.unpack_from(
+            self._map, self._offsets + index * _OFFSET.size
+        )
+        record = self._map[self._records + start : self._records + end]
+        book_id, borrow_link, media_type = record.decode("utf-8").split("\t")
+        return CMCatalogEntry(book_id, borrow_link, media_type or None)
+
+    @property
+    def libraries(self) -> Mapping[str, CMCatalogLibrary]:
+        return self._libraries
+
+    def library(self, identifier: str) -> Optional[CMCatalogLibrary]:
+        return self._libraries.get(identifier)
+
+    def library_for_root(self, root: str) -> Optional[CMCatalogLibrary]:
+        """Find the library whose catalog root has the same path as the given URL."""
+        identifier = self._roots.get(_root_path(root))
+        if identifier is None:
+            return None
+        return self._libraries[identifier]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def write(
+        path: str, libraries: Iterable[Tuple[str, str, List[CMCatalogEntry]]]
+    ) -> int:
+        """
+        Write an index of the given (identifier, root URL, entries) libraries. Borrow
+        links on the same host as the root are stored relative to that host. Returns
+        the number of entries written.
+        """
+        header: Dict[str, dict] = {}
+        offsets = [0]
+        records = bytearray()
+        for identifier, root, entries in libraries:
+            split = urlsplit(root)
+            origin = f"{split.scheme}://{split.netloc}"
+            header[identifier] = {
+                "root": _root_path(root),
+                "first": len(offsets) - 1,
+                "count": len(entries),
+            }
+            for entry in entries:
+                borrow_link = entry.borrow_link
+                if borrow_link.startswith(origin + "/"):
+                    borrow_link = borrow_link[len(origin) :]
+                fields = [entry.book_id, borrow_link, entry.media_type or ""]
+                if any("\t" in field for field in fields):
+                    raise ValueError(f"Entry contains a tab character: {fields}")
+                records += "\t".join(fields).encode("utf-8")
+                offsets.append(len(records))
+
+        total = len(offsets) - 1
+        data = json.dumps({"total": total, "libraries": header}).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_PREAMBLE.pack(_MAGIC, _VERSION, len(data)))
+            f.write(data)
+            f.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+            f.write(records)
+        return total
+
+
+class CMCatalogs:
+    """
+    The worker-wide catalog index. This is None unless the configuration names an
+    index file.
+    """
+
+    _index: Optional[CMCatalogIndex] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[CMCatalogIndex]:
+        if cls._initialized:
+            return cls._index
+        path = Configurations.get().circulation_manager.catalog_index
+        if path is not None:
+            cls._index = CMCatalogIndex(path, CMShards.get())
+        else:
+            cls._index = None
+        cls._initialized = True
+        return cls._index
+
+    @classmethod
+    def clear(cls):
+        if cls._index is not None:
+            cls._index.close()
+        cls._index = None
+        cls._initialized = False
@@ -0,0 +1,133 @@
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Iterator, Optional
+
+from geventhttpclient.connectionpool import ConnectionPool, SSLConnectionPool
+from geventhttpclient.useragent import HTTPClientPool
+from locust.env import Environment
+
+from circulation_load_test.common.config import (
+    CMConnectionConfiguration,
+    CMConnectionPolicy,
+)
+
+
+class CMHTTPClientPool(HTTPClientPool):
+    """
+    The HTTP clients of one simulated user, which replace their connections
+    according to a connection policy, the way a mobile app does. With 'persistent',
+    connections are kept alive for as long as the server allows. With 'session',
+    all connections are closed when the user has made no request for
+    'idle_seconds', as when the app is backgrounded and its sockets are dropped.
+    With 'requests', all connections are closed after every
+    'requests_per_connection' requests.
+
+    With 'timing', the time taken to resolve the host, connect, and complete the
+    TLS handshake of each new connection is reported to Locust as "connection"
+    requests named "dns", "connect", and "tls", separately from the time of the
+    request that opened the connection.
+    """
+
+    def __init__(
+        self,
+        environment: Environment,
+        config: CMConnectionConfiguration,
+        clock=time.monotonic,
+        **kw,
+    ):
+        super().__init__(**kw)
+        self.environment = environment
+        self.config = config
+        self.clock = clock
+        self.requests = 0
+        self.reconnections = 0
+        self._last: Optional[float] = None
+
+    def _expired(self, now: float) -> bool:
+        policy = self.config.policy
+        if policy == CMConnectionPolicy.REQUESTS:
+            return self.requests >= self.config.requests_per_connection
+        if policy == CMConnectionPolicy.SESSION:
+            return (
+                self._last is not None and now - self._last > self.config.idle_seconds
+            )
+        return False
+
+    def get_client(self, url):
+        # Every request asks the pool for its client, so this is where the policy
+        # decides whether the request goes out on a new connection.
+        now = self.clock()
+        if self._expired(now):
+            self.close()
+            self.requests = 0
+            self.reconnections += 1
+        self._last = now
+        self.requests += 1
+
+        clients = len(self.clients)
+        client = super().get_client(url)
+        if self.config.timing and len(self.clients) != clients:
+            self._instrument(client._connection_pool)
+        return client
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        exception: Optional[Exception] = None
+        try:
+            yield
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            self.environment.events.request.fire(
+                request_type="connection",
+                name=name,
+                response_time=(time.perf_counter() - start) * 1000.0,
+                response_length=0,
+                exception=exception,
+                context={},
+            )
+
+    def _instrument(self, pool: ConnectionPool):
+        resolve = pool._resolve
+
+        def _resolve():
+            with self._timed("dns"):
+                return resolve()
+
+        pool._resolve = _resolve  # type: ignore[method-assign]
+        pool._connect_socket = partial(self._connect, pool)  # type: ignore
+
+    def _connect(self, pool: ConnectionPool, sock, address):
+        with self._timed("connect"):
+            sock = ConnectionPool._connect_socket(pool, sock, address)
+        if not isinstance(pool, SSLConnectionPool):
+            return sock
+
+        # This is SSLConnectionPool._connect_socket, with the handshake timed apart
+        # from the TCP connection.
+        if pool._use_proxy:
+            pool._setup_proxy(sock)
+        server_hostname = pool.ssl_options.get("server_hostname", pool._request_host)
+        with self._timed("tls"):
+            return pool.ssl_context.wrap_socket(sock, server_hostname=server_hostname)
+
+    @staticmethod
+    def install(
+        user, config: CMConnectionConfiguration
+    ) -> Optional["CMHTTPClientPool"]:
+        """
+        Give a FastHttpUser a client pool that follows the given policy, unless the
+        configuration asks for nothing that Locust's own pool does not do.
+        """
+        if config.policy == CMConnectionPolicy.PERSISTENT and not config.timing:
+            return None
+        agent = user.client.client
+        pool = CMHTTPClientPool(
+            user.environment, config, **agent.clientpool.client_args
+        )
+        agent.clientpool.close()
+        agent.clientpool = pool
+        return pool
@@ -0,0 +1,106 @@
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from locust import events
+from locust.env import Environment
+from locust.runners import MasterRunner, WorkerRunner
+
+from circulation_load_test.common.cmcatalog import CMCatalogs
+from circulation_load_test.common.cmloanpool import CMLoanPools
+from circulation_load_test.common.cmshard import CMShard, CMShards
+from circulation_load_test.common.cmuserpool import CMUserPools
+
+SHARD_MESSAGE = "circulation_load_test_shard"
+
+
+class CMDistribution:
+    """
+    Coordinates the workers of a distributed test. When a test starts, the master
+    gives each connected worker its own shard of the patrons, libraries, and books,
+    so that workers do not log in as the same patrons or borrow the same books. The
+    shard is sent before the worker is told to start its users. Workers that connect
+    after the test has started keep the whole set until the next test starts.
+
+    A worker only changes its shard while none of its users are running, since the
+    running users hold patrons leased from the user pool and loans in the loan pool.
+    A shard that arrives while users are still stopping is applied when the test
+    stops or the next test starts, whichever comes first.
+    """
+
+    logger = logging.getLogger("CMDistribution")
+    _pending: Optional[CMShard] = None
+
+    @staticmethod
+    def shards(workers: Iterable[str]) -> Dict[str, CMShard]:
+        """Divide the work between the given workers, ordered by their ids."""
+        ordered = sorted(workers)
+        return {
+            worker: CMShard(index, len(ordered)) for index, worker in enumerate(ordered)
+        }
+
+    @staticmethod
+    def assign(environment: Environment, **kwargs: Any):
+        runner = environment.runner
+        assert isinstance(runner, MasterRunner)
+        workers = (
+            runner.clients.ready + runner.clients.running + runner.clients.spawning
+        )
+        for worker, shard in CMDistribution.shards(w.id for w in workers).items():
+            runner.send_message(SHARD_MESSAGE, shard.to_json_dict(), client_id=worker)
+
+    @staticmethod
+    def receive(environment: Optional[Environment], msg: Any, **kwargs: Any):
+        shard = CMShard.parse(msg.data)
+        if CMDistribution._busy(environment):
+            CMDistribution.logger.info(
+                f"using shard {shard.index} of {shard.count} when the users stop"
+            )
+            CMDistribution._pending = shard
+            return
+        CMDistribution._pending = None
+        CMDistribution.use(shard)
+
+    @staticmethod
+    def apply_pending(environment: Environment, **kwargs: Any):
+        """Apply a shard that arrived while users were running, if they have stopped."""
+        shard = CMDistribution._pending
+        if shard is None or CMDistribution._busy(environment):
+            return
+        CMDistribution._pending = None
+        CMDistribution.use(shard)
+
+    @staticmethod
+    def _busy(environment: Optional[Environment]) -> bool:
+        runner = environment.runner if environment is not None else None
+        return runner is not None and runner.user_count > 0
+
+    @staticmethod
+    def use(shard: CMShard):
+        """Use the given shard. None of this worker's users may be running."""
+        if shard == CMShards.get():
+            return
+        CMDistribution.logger.info(f"using shard {shard.index} of {shard.count}")
+        loans = CMLoanPools.get()
+        if loans is not None and len(loans) > 0:
+            # The users return their pooled loans when they stop, so these loans have
+            # no user left to return them.
+            CMDistribution.logger.warning(
+                f"abandoning {len(loans)} pooled loans of the previous shard"
+            )
+        CMShards.set(shard)
+        CMUserPools.clear()
+        CMCatalogs.clear()
+        CMLoanPools.clear()
+
+    @staticmethod
+    def on_init(environment: Environment, **kwargs: Any):
+        runner = environment.runner
+        if isinstance(runner, MasterRunner):
+            environment.events.test_start.add_listener(CMDistribution.assign)
+        elif isinstance(runner, WorkerRunner):
+            runner.register_message(SHARD_MESSAGE, CMDistribution.receive)
+            environment.events.test_stop.add_listener(CMDistribution.apply_pending)
+            environment.events.test_start.add_listener(CMDistribution.apply_pending)
+
+
+events.init.add_listener(CMDistribution.on_init)
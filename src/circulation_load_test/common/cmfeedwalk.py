@@ -1,65 +1,167 @@
 import logging
 import random
-from typing import List, Set
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
 
-import atoma
-from atoma.atom import AtomLink
+import gevent
+from gevent.pool import Pool
 
+from circulation_load_test.common.cminstrumentation import CMInstrumentations
+from circulation_load_test.common.cmlinkgraph import DISCOVERY_RELATIONS, CMLinkGraph
+from circulation_load_test.common.cmopds import CMOPDSLink, CMOPDSParser
+from circulation_load_test.common.cmrequestnames import CMRequestNames
 from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.config import CMFeedWalkPolicy
 
 
 class CMFeedWalk:
-    """A class to walk randomly through an OPDS feed."""
+    """
+    A class to walk randomly through an OPDS feed. Discovered links are kept in a
+    frontier, and are visited in breadth-first, depth-first, or random order with up
+    to 'concurrency' requests in flight at once. The walk stops when the frontier is
+    empty, or when it has visited 'maximum_visits' links or received 'maximum_bytes'
+    bytes. Links more than 'maximum_depth' links away from the start are not visited.
+
+    If a link graph is given, the links of feeds that are already in the graph are
+    taken from the graph instead of being fetched again, so that repeated walks spend
+    their visits on feeds that have not yet been discovered.
+    """
 
     def __init__(
-        self, link_start: str, allowed_link_relations: Set[str], maximum_visits: int
+        self,
+        link_start: str,
+        allowed_link_relations: Set[str],
+        maximum_visits: int,
+        policy: CMFeedWalkPolicy = CMFeedWalkPolicy.DEPTH_FIRST,
+        concurrency: int = 1,
+        maximum_depth: Optional[int] = None,
+        maximum_bytes: Optional[int] = None,
+        link_graph: Optional[CMLinkGraph] = None,
     ):
         assert isinstance(link_start, str)
         assert isinstance(allowed_link_relations, Set)
         assert isinstance(maximum_visits, int)
+        assert isinstance(policy, CMFeedWalkPolicy)
+        assert isinstance(concurrency, int) and concurrency >= 1
         self.maximum_visits = maximum_visits
+        self.maximum_depth = maximum_depth
+        self.maximum_bytes = maximum_bytes
+        self.policy = policy
+        self.concurrency = concurrency
         self.link_start = link_start
         self.allowed_link_relations = allowed_link_relations
+        self.link_graph = link_graph
+        self._parse_relations = (
+            allowed_link_relations | DISCOVERY_RELATIONS
+            if link_graph is not None
+            else allowed_link_relations
+        )
         self.visited: Set[str] = set()
+        self.fetched = 0
+        self.received_bytes = 0
+        self._frontier: Deque[Tuple[str, int]] = deque()
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    def _execute(self, link: str, user: CMHTTPUser):
-        if link in self.visited:
+    def _frontier_push(self, links: List[CMOPDSLink], depth: int):
+        if self.maximum_depth is not None and depth > self.maximum_depth:
             return
+        links = [link for link in links if link.rel in self.allowed_link_relations]
+        random.shuffle(links)
+        for link in links:
+            if link.href not in self.visited:
+                self._frontier.append((link.href, depth))
 
-        self.visited.add(link)
-        if len(self.visited) >= self.maximum_visits:
-            return
+    def _frontier_pop(self) -> Tuple[str, int]:
+        if self.policy == CMFeedWalkPolicy.BREADTH_FIRST:
+            return self._frontier.popleft()
+        if self.policy == CMFeedWalkPolicy.RANDOM:
+            self._frontier.rotate(-random.randrange(len(self._frontier)))
+        return self._frontier.pop()
+
+    def _frontier_next(self, user: CMHTTPUser) -> Optional[Tuple[str, int]]:
+        """Take the next link to fetch from the frontier, unless the walk is over."""
+        while self._frontier and not self._exhausted():
+            link, depth = self._frontier_pop()
+            if link in self.visited:
+                continue
+            self.visited.add(link)
+
+            if self.link_graph is not None:
+                links = self.link_graph.get(link, user.environment)
+                if links is not None:
+                    self._frontier_push(links, depth + 1)
+                    continue
 
+            self.fetched += 1
+            return link, depth
+        return None
+
+    def _exhausted(self) -> bool:
+        if self.fetched >= self.maximum_visits:
+            return True
+        if self.maximum_bytes is not None:
+            return self.received_bytes >= self.maximum_bytes
+        return False
+
+    def _visit(self, link: str, depth: int, user: CMHTTPUser):
         self.logger.info(f"get {link}")
-        response = user.client.get(link)
-        response.raise_for_status()
+        measurement = CMInstrumentations.measure(user, "feed")
+        response = user.conditional_get(link, name=CMRequestNames.name(link))
+        user.raise_for_status(response)
+        measurement.received(response)
+        self.received_bytes += len(response.content or b"")
 
         content_type = response.headers.get("content-type")
         self.logger.debug(f"content type {content_type}")
         if content_type.startswith("application/atom+xml"):
-            feed = atoma.parse_atom_bytes(response.text.encode("utf-8"))
+            feed = CMOPDSParser.parse(
+                response.content,
+                feed_rels=self._parse_relations,
+                entry_rels=self._parse_relations,
+            )
+            measurement.parsed()
 
-            raw_links: List[AtomLink] = []
-            for link in feed.links:
-                raw_links.append(link)
-            for entry in feed.entries:
-                for link in entry.links:
-                    raw_links.append(link)
+            if self.link_graph is not None:
+                candidates = self.link_graph.put_feed(link, feed)
+            else:
+                candidates = list(feed.links)
+                for entry in feed.entries:
+                    candidates.extend(entry.links)
 
-            candidates: List[AtomLink] = list(
-                filter(lambda link: self._is_candidate_link(link), raw_links)
-            )
             self.logger.debug(f"found {str(len(candidates))} candidate links")
-            random.shuffle(candidates)
-            for candidate in candidates:
-                assert isinstance(candidate, AtomLink)
-                self._execute(candidate.href, user)
-
-    def _is_candidate_link(self, link: AtomLink) -> bool:
-        return link.rel in self.allowed_link_relations
+            self._frontier_push(candidates, depth + 1)
+        measurement.finish()
 
     def execute(self, user: CMHTTPUser):
         """Start walking."""
         self.visited.clear()
-        self._execute(self.link_start, user)
+        self.fetched = 0
+        self.received_bytes = 0
+        self._frontier.clear()
+        self._frontier.append((self.link_start, 0))
+
+        if self.concurrency == 1:
+            while True:
+                next = self._frontier_next(user)
+                if next is None:
+                    return
+                self._visit(next[0], next[1], user)
+
+        pool = Pool(size=self.concurrency)
+        running: Set[gevent.Greenlet] = set()
+        try:
+            while True:
+                while len(running) < self.concurrency:
+                    next = self._frontier_next(user)
+                    if next is None:
+                        break
+                    running.add(pool.spawn(self._visit, next[0], next[1], user))
+
+                if not running:
+                    break
+
+                for greenlet in gevent.wait(list(running), count=1):
+                    running.discard(greenlet)
+                    greenlet.get()
+        finally:
+            pool.kill()
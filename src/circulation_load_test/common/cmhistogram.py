@@ -0,0 +1,349 @@
+import gzip
+import json
+import logging
+import math
+import time
+from array import array
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+from locust import events
+from locust.env import Environment
+from locust.runners import WorkerRunner
+
+from circulation_load_test.common.config import CMHistogramConfiguration, Configurations
+
+# The key under which workers report their histograms to the master.
+REPORT_KEY = "cm_histograms"
+
+# The percentiles reported for each endpoint.
+PERCENTILES = (50.0, 90.0, 99.0, 99.9, 99.99)
+
+
+class CMHistogram:
+    """
+    A high dynamic range histogram of latencies in microseconds, in the style of
+    HdrHistogram. Values from 1 to 'highest' are recorded with 'significant_figures'
+    significant decimal digits of precision, in a fixed array of counts in which
+    each power of two is divided into the same number of linear sub-buckets.
+    Histograms with the same parameters can be merged by adding their counts, and
+    are exported as the sparse list of their non-zero counts.
+    """
+
+    def __init__(self, highest: int = 3_600_000_000, significant_figures: int = 3):
+        assert highest >= 2
+        assert 1 <= significant_figures <= 5
+        self.highest = highest
+        self.significant_figures = significant_figures
+
+        resolution = 2 * 10**significant_figures
+        self._sub_bucket_count_magnitude = math.ceil(math.log2(resolution))
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << self._sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+
+        bucket_count = 1
+        smallest_untrackable = self._sub_bucket_count
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._counts = array("Q", [0]) * (
+            (bucket_count + 1) * self._sub_bucket_half_count
+        )
+
+        self.total = 0
+        self.minimum = 0
+        self.maximum = 0
+        self._sum = 0
+
+    def _index(self, value: int) -> int:
+        bucket = (value | self._sub_bucket_mask).bit_length() - (
+            self._sub_bucket_half_count_magnitude + 1
+        )
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self._sub_bucket_half_count_magnitude) + (
+            sub_bucket - self._sub_bucket_half_count
+        )
+
+    def _value(self, index: int) -> int:
+        bucket = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self._sub_bucket_half_count - 1)) + (
+            self._sub_bucket_half_count
+        )
+        if bucket < 0:
+            sub_bucket -= self._sub_bucket_half_count
+            bucket = 0
+        return sub_bucket << bucket
+
+    def _highest_equivalent(self, index: int) -> int:
+        """The largest value that is recorded at the given index."""
+        value = self._value(index)
+        bucket = max(0, (index >> self._sub_bucket_half_count_magnitude) - 1)
+        return value + (1 << bucket) - 1
+
+    def compatible(self, other: "CMHistogram") -> bool:
+        return (
+            self.highest == other.highest
+            and self.significant_figures == other.significant_figures
+        )
+
+    def record(self, value: int, count: int = 1):
+        """Record a value, clamping it to the range of the histogram."""
+        value = min(max(value, 1), self.highest)
+        self._counts[self._index(value)] += count
+        if self.total == 0 or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        self.total += count
+        self._sum += value * count
+
+    def _add(self, index: int, count: int):
+        self._counts[index] += count
+        self.total += count
+        self._sum += self._value(index) * count
+
+    def merge(self, other: "CMHistogram"):
+        if not self.compatible(other):
+            raise ValueError("Cannot merge histograms with different parameters")
+        if other.total == 0:
+            return
+        self.minimum = min(self.minimum, other.minimum) if self.total else other.minimum
+        self.maximum = max(self.maximum, other.maximum)
+        for index, count in other.counts():
+            self._add(index, count)
+
+    def counts(self) -> Iterator[Tuple[int, int]]:
+        """The non-zero counts, as (index, count) pairs."""
+        for index, count in enumerate(self._counts):
+            if count:
+                yield index, count
+
+    def mean(self) -> float:
+        return self._sum / self.total if self.total else 0.0
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """
+        The value at or below which the given percentage of the recorded values
+        lie, to the precision of the histogram.
+        """
+        if self.total == 0:
+            return 0
+        target = max(1, math.ceil(self.total * min(percentile, 100.0) / 100.0))
+        seen = 0
+        for index, count in self.counts():
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.maximum)
+        return self.maximum
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "highest": self.highest,
+            "significant_figures": self.significant_figures,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "counts": [[index, count] for index, count in self.counts()],
+        }
+
+    @staticmethod
+    def parse(data: Dict[str, Any]) -> "CMHistogram":
+        histogram = CMHistogram(data["highest"], data["significant_figures"])
+        for index, count in data["counts"]:
+            histogram._add(index, count)
+        histogram.minimum = data["minimum"]
+        histogram.maximum = data["maximum"]
+        return histogram
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def summarize(histogram: CMHistogram) -> Dict[str, Any]:
+    """The count, mean, percentiles, and maximum of a histogram, in milliseconds."""
+    result: Dict[str, Any] = {
+        "count": histogram.total,
+        "mean_ms": round(histogram.mean() / 1000.0, 3),
+    }
+    for percentile in PERCENTILES:
+        value = histogram.value_at_percentile(percentile)
+        result[f"p{percentile:g}_ms"] = round(value / 1000.0, 3)
+    result["max_ms"] = round(histogram.maximum / 1000.0, 3)
+    return result
+
+
+class CMHistogramCollector:
+    """
+    Collects a histogram of response times for each request type and name. The
+    histograms are kept for fixed intervals; when an interval ends, its histograms
+    are written to the export file, one JSON object per line, and added to the
+    histograms of the whole test, which are written when the collector is closed.
+    Export files whose names end in '.gz' are compressed.
+    """
+
+    def __init__(self, config: CMHistogramConfiguration, clock=time.time):
+        self.config = config
+        self.clock = clock
+        self.highest = max(2, int(config.highest * 1_000_000))
+        self.interval: Dict[str, CMHistogram] = {}
+        self.totals: Dict[str, CMHistogram] = {}
+        self._interval_start = clock()
+        self._file: Optional[IO[str]] = None
+
+    def _histogram(self, histograms: Dict[str, CMHistogram], name: str) -> CMHistogram:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = CMHistogram(self.highest, self.config.significant_figures)
+            histograms[name] = histogram
+        return histogram
+
+    def record(self, name: str, microseconds: int):
+        self._roll()
+        self._histogram(self.interval, name).record(microseconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return and reset the histograms, in a form that can be sent to the master."""
+        result = {name: h.to_json_dict() for name, h in self.interval.items()}
+        self.interval = {}
+        return result
+
+    def merge(self, data: Dict[str, Dict[str, Any]]):
+        self._roll()
+        for name, histogram in data.items():
+            self._histogram(self.interval, name).merge(CMHistogram.parse(histogram))
+
+    def _write(self, record: Dict[str, Any]):
+        if self.config.export is None:
+            return
+        if self._file is None:
+            self._file = _open(self.config.export, "w")
+        self._file.write(json.dumps(record, separators=(",", ":")))
+        self._file.write("\n")
+
+    def _roll(self, force: bool = False):
+        now = self.clock()
+        if not force and now < self._interval_start + self.config.interval:
+            return
+        for name in sorted(self.interval):
+            histogram = self.interval[name]
+            self._write(
+                {
+                    "kind": "interval",
+                    "start": round(self._interval_start, 3),
+                    "end": round(now, 3),
+                    "name": name,
+                    **summarize(histogram),
+                    "histogram": histogram.to_json_dict(),
+                }
+            )
+            self._histogram(self.totals, name).merge(histogram)
+        self.interval = {}
+        self._interval_start = now
+
+    def close(self):
+        """Write the last interval and the histograms of the whole test."""
+        self._roll(force=True)
+        for name in sorted(self.totals):
+            histogram = self.totals[name]
+            self._write(
+                {
+                    "kind": "total",
+                    "name": name,
+                    **summarize(histogram),
+                    "histogram": histogram.to_json_dict(),
+                }
+            )
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_export(path: str) -> Iterator[Dict[str, Any]]:
+    """Read the records of a histogram export file."""
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_totals(path: str) -> Dict[str, CMHistogram]:
+    """The histograms of the whole test in an export file, by name."""
+    totals: Dict[str, CMHistogram] = {}
+    intervals: Dict[str, CMHistogram] = {}
+    for record in read_export(path):
+        histogram = CMHistogram.parse(record["histogram"])
+        if record["kind"] == "total":
+            totals[record["name"]] = histogram
+        elif record["name"] in intervals:
+            intervals[record["name"]].merge(histogram)
+        else:
+            intervals[record["name"]] = histogram
+    # An export that was cut short has no totals, so fall back to its intervals.
+    return totals or intervals
+
+
+class CMHistograms:
+    """
+    The worker-wide histogram collector. This is None unless histograms are enabled
+    in the configuration. Every request reported to Locust is recorded under its
+    request type and name.
+    """
+
+    _collector: Optional[CMHistogramCollector] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[CMHistogramCollector]:
+        if cls._initialized:
+            return cls._collector
+        config = Configurations.get().circulation_manager.histograms
+        cls._collector = CMHistogramCollector(config) if config.enabled else None
+        cls._initialized = True
+        return cls._collector
+
+    @classmethod
+    def clear(cls):
+        cls._collector = None
+        cls._initialized = False
+
+    @classmethod
+    def on_request(
+        cls, request_type: str, name: str, response_time: float, **kwargs: Any
+    ):
+        collector = cls.get()
+        if collector is not None and response_time is not None:
+            collector.record(f"{request_type} {name}", int(response_time * 1000.0))
+
+    @classmethod
+    def on_report_to_master(cls, client_id: str, data: Dict[str, Any], **kwargs: Any):
+        collector = cls.get()
+        if collector is not None and collector.interval:
+            data[REPORT_KEY] = collector.snapshot()
+
+    @classmethod
+    def on_worker_report(cls, client_id: str, data: Dict[str, Any], **kwargs: Any):
+        collector = cls.get()
+        if collector is not None and REPORT_KEY in data:
+            collector.merge(data[REPORT_KEY])
+
+    @classmethod
+    def on_quitting(cls, environment: Environment, **kwargs: Any):
+        """Write the histograms of a local test, or of all workers on the master."""
+        if isinstance(environment.runner, WorkerRunner):
+            return
+        collector = cls.get()
+        if collector is not None:
+            collector.close()
+            if collector.config.export is not None:
+                logging.getLogger(cls.__name__).info(
+                    f"wrote histograms to {collector.config.export}"
+                )
+
+
+events.request.add_listener(CMHistograms.on_request)
+events.report_to_master.add_listener(CMHistograms.on_report_to_master)
+events.worker_report.add_listener(CMHistograms.on_worker_report)
+events.quitting.add_listener(CMHistograms.on_quitting)
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple
+
+from circulation_load_test.common.config import CMHTTPCacheConfiguration, Configurations
+
+if TYPE_CHECKING:
+    from circulation_load_test.common.cmuser import CMHTTPUser
+
+# A cache key: the URL, and the credentials with which it was fetched.
+CMHTTPCacheKey = Tuple[str, Optional[str]]
+
+
+@dataclass
+class CMHTTPCacheEntry:
+    """A cached response body and the validators with which to revalidate it."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content: bytes
+    content_type: Optional[str]
+
+    def validators(self) -> Dict[str, str]:
+        """The headers that make a request conditional on this entry being stale."""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CMCachedResponse:
+    """
+    The response returned in place of a 304 Not Modified response: the cached body,
+    with the status and headers of the response that was cached.
+    """
+
+    status_code = 200
+    not_modified = True
+
+    def __init__(self, entry: CMHTTPCacheEntry):
+        self.content = entry.content
+        self.headers: Dict[str, str] = {}
+        if entry.content_type is not None:
+            self.headers["content-type"] = entry.content_type
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        pass
+
+
+class CMHTTPCache:
+    """
+    A cache of response bodies that are revalidated with conditional GETs, the way
+    the Palace apps revalidate the feeds they have already seen. Only responses with
+    an ETag or Last-Modified header are cached, keyed by URL and Authorization header.
+    The least recently used entries are evicted when the bodies exceed 'maximum_bytes'.
+
+    Each revalidation is reported to Locust as a "cache" request named "not_modified"
+    (the server answered 304, and the cached body was used) or "modified" (the server
+    sent a new body), with the number of cached bytes as its length.
+    """
+
+    def __init__(self, maximum_bytes: int):
+        assert maximum_bytes > 0
+        self.maximum_bytes = maximum_bytes
+        self.size = 0
+        self.not_modified = 0
+        self.modified = 0
+        self.saved_bytes = 0
+        self._entries: "OrderedDict[CMHTTPCacheKey, CMHTTPCacheEntry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: CMHTTPCacheKey) -> Optional[CMHTTPCacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key: CMHTTPCacheKey, entry: CMHTTPCacheEntry):
+        self.discard(key)
+        if len(entry.content) > self.maximum_bytes:
+            return
+        self._entries[key] = entry
+        self.size += len(entry.content)
+        while self.size > self.maximum_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.content)
+
+    def discard(self, key: CMHTTPCacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.content)
+
+    @staticmethod
+    def _fire(user: "CMHTTPUser", name: str, length: int):
+        user.environment.events.request.fire(
+            request_type="cache",
+            name=name,
+            response_time=0,
+            response_length=length,
+            exception=None,
+            context={},
+        )
+
+    def get(
+        self,
+        user: "CMHTTPUser",
+        url: str,
+        name: str,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Any:
+        """GET the given URL, revalidating the cached body if there is one."""
+        request_headers = dict(headers or {})
+        key = (url, request_headers.get("Authorization"))
+        entry = self.lookup(key)
+        if entry is not None:
+            request_headers.update(entry.validators())
+
+        response = user.client.get(url, headers=request_headers, name=name)
+        if entry is not None:
+            if response.status_code == 304:
+                self.not_modified += 1
+                self.saved_bytes += len(entry.content)
+                self._fire(user, "not_modified", len(entry.content))
+                return CMCachedResponse(entry)
+            if response.status_code == 200:
+                self.modified += 1
+                self._fire(user, "modified", len(entry.content))
+
+        if response.status_code == 200:
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+            if etag is not None or last_modified is not None:
+                self.store(
+                    key,
+                    CMHTTPCacheEntry(
+                        etag,
+                        last_modified,
+                        response.content or b"",
+                        response.headers.get("content-type"),
+                    ),
+                )
+                return response
+        self.discard(key)
+        return response
+
+    @staticmethod
+    def create(config: CMHTTPCacheConfiguration) -> "CMHTTPCache":
+        return CMHTTPCache(config.maximum_bytes)
+
+
+class CMHTTPCaches:
+    """
+    The HTTP caches of the simulated users. Unless the cache is disabled in the
+    configuration, each user has a cache of its own, or all of the users of a worker
+    share one cache if it is 'shared'.
+    """
+
+    _shared: Optional[CMHTTPCache] = None
+
+    @classmethod
+    def for_user(cls) -> Optional[CMHTTPCache]:
+        """The cache for a new user, or None if the cache is disabled."""
+        config = Configurations.get().circulation_manager.http_cache
+        if not config.enabled:
+            return None
+        if not config.shared:
+            return CMHTTPCache.create(config)
+        if cls._shared is None:
+            cls._shared = CMHTTPCache.create(config)
+        return cls._shared
+
+    @classmethod
+    def clear(cls):
+        cls._shared = None
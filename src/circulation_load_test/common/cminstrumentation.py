@@ -0,0 +1,244 @@
+import csv
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from locust import events
+from locust.env import Environment
+from locust.runners import WorkerRunner
+
+from circulation_load_test.common.config import (
+    CMInstrumentationConfiguration,
+    Configurations,
+)
+
+if TYPE_CHECKING:
+    from circulation_load_test.common.cmuser import CMHTTPUser
+
+# The key under which workers report their operation statistics to the master.
+REPORT_KEY = "cm_operations"
+
+
+@dataclass
+class CMOperationStats:
+    """
+    The accumulated cost of a logical operation: waiting for the network, parsing
+    the response, and processing the parsed result. Times are in seconds.
+    """
+
+    count: int = 0
+    received_bytes: int = 0
+    network: float = 0.0
+    parse: float = 0.0
+    process: float = 0.0
+
+    def add(self, other: "CMOperationStats"):
+        self.count += other.count
+        self.received_bytes += other.received_bytes
+        self.network += other.network
+        self.parse += other.parse
+        self.process += other.process
+
+
+class CMInstrumentation:
+    """
+    Statistics for each logical operation of the CM tests, such as fetching a feed
+    or an authentication document. Each measurement is also reported to Locust as a
+    "parse" and a "process" request named after the operation; the network time is
+    already reported by the HTTP request itself.
+    """
+
+    def __init__(self, config: CMInstrumentationConfiguration):
+        self.config = config
+        self.operations: Dict[str, CMOperationStats] = {}
+
+    def record(self, operation: str, stats: CMOperationStats):
+        existing = self.operations.get(operation)
+        if existing is None:
+            self.operations[operation] = existing = CMOperationStats()
+        existing.add(stats)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return and reset the statistics, in a form that can be sent to the master."""
+        result = {name: asdict(stats) for name, stats in self.operations.items()}
+        self.operations = {}
+        return result
+
+    def merge(self, data: Dict[str, Dict[str, Any]]):
+        for name, stats in data.items():
+            self.record(name, CMOperationStats(**stats))
+
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for name in sorted(self.operations):
+            stats = self.operations[name]
+            count = max(stats.count, 1)
+            rows.append(
+                {
+                    "operation": name,
+                    "count": stats.count,
+                    "received_bytes": stats.received_bytes,
+                    "network_seconds": round(stats.network, 6),
+                    "parse_seconds": round(stats.parse, 6),
+                    "process_seconds": round(stats.process, 6),
+                    "mean_network_ms": round(stats.network * 1000.0 / count, 3),
+                    "mean_parse_ms": round(stats.parse * 1000.0 / count, 3),
+                    "mean_process_ms": round(stats.process * 1000.0 / count, 3),
+                }
+            )
+        return rows
+
+    def export(self, path: str):
+        """Write the statistics as JSON if the file name ends in '.json', or CSV."""
+        rows = self.rows()
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                json.dump({"operations": rows}, f, indent=2)
+                return
+            if not rows:
+                return
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+class CMMeasurement:
+    """
+    A measurement of one operation. Create it immediately before the request, and
+    call 'received' when the response has arrived, 'parsed' when it has been parsed,
+    and 'finish' when the result has been processed.
+    """
+
+    __slots__ = ("_instrumentation", "_user", "_operation", "_stats", "_mark")
+
+    def __init__(
+        self, instrumentation: CMInstrumentation, user: "CMHTTPUser", operation: str
+    ):
+        self._instrumentation = instrumentation
+        self._user = user
+        self._operation = operation
+        self._stats = CMOperationStats(count=1)
+        self._mark = time.perf_counter()
+
+    def _lap(self) -> float:
+        now = time.perf_counter()
+        elapsed = now - self._mark
+        self._mark = now
+        return elapsed
+
+    def received(self, response):
+        self._stats.network += self._lap()
+        self._stats.received_bytes += len(response.content or b"")
+
+    def parsed(self):
+        self._stats.parse += self._lap()
+
+    def resume(self):
+        """Restart the clock, for a response that waited before it was parsed."""
+        self._mark = time.perf_counter()
+
+    def finish(self):
+        stats = self._stats
+        stats.process += self._lap()
+        self._instrumentation.record(self._operation, stats)
+        fire = self._user.environment.events.request.fire
+        fire(
+            request_type="parse",
+            name=self._operation,
+            response_time=stats.parse * 1000.0,
+            response_length=stats.received_bytes,
+            exception=None,
+            context={},
+        )
+        fire(
+            request_type="process",
+            name=self._operation,
+            response_time=stats.process * 1000.0,
+            response_length=0,
+            exception=None,
+            context={},
+        )
+
+
+class _CMDisabledMeasurement:
+    """The measurement used when instrumentation is disabled, which does nothing."""
+
+    __slots__ = ()
+
+    def received(self, response):
+        pass
+
+    def parsed(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def finish(self):
+        pass
+
+
+_DISABLED = _CMDisabledMeasurement()
+
+
+class CMInstrumentations:
+    """
+    The worker-wide instrumentation. This is None unless instrumentation is enabled
+    in the configuration.
+    """
+
+    _instrumentation: Optional[CMInstrumentation] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[CMInstrumentation]:
+        if cls._initialized:
+            return cls._instrumentation
+        config = Configurations.get().circulation_manager.instrumentation
+        cls._instrumentation = CMInstrumentation(config) if config.enabled else None
+        cls._initialized = True
+        return cls._instrumentation
+
+    @classmethod
+    def measure(cls, user: "CMHTTPUser", operation: str):
+        """Start measuring an operation of the given user."""
+        instrumentation = cls.get()
+        if instrumentation is None:
+            return _DISABLED
+        return CMMeasurement(instrumentation, user, operation)
+
+    @classmethod
+    def clear(cls):
+        cls._instrumentation = None
+        cls._initialized = False
+
+    @classmethod
+    def on_report_to_master(cls, client_id: str, data: Dict[str, Any], **kwargs: Any):
+        instrumentation = cls.get()
+        if instrumentation is not None and instrumentation.operations:
+            data[REPORT_KEY] = instrumentation.snapshot()
+
+    @classmethod
+    def on_worker_report(cls, client_id: str, data: Dict[str, Any], **kwargs: Any):
+        instrumentation = cls.get()
+        if instrumentation is not None and REPORT_KEY in data:
+            instrumentation.merge(data[REPORT_KEY])
+
+    @classmethod
+    def on_quitting(cls, environment: Environment, **kwargs: Any):
+        """Export the statistics of a local test, or of all workers on the master."""
+        if isinstance(environment.runner, WorkerRunner):
+            return
+        instrumentation = cls.get()
+        if instrumentation is not None and instrumentation.config.export is not None:
+            instrumentation.export(instrumentation.config.export)
+            logging.getLogger(cls.__name__).info(
+                f"wrote operation statistics to {instrumentation.config.export}"
+            )
+
+
+events.report_to_master.add_listener(CMInstrumentations.on_report_to_master)
+events.worker_report.add_listener(CMInstrumentations.on_worker_report)
+events.quitting.add_listener(CMInstrumentations.on_quitting)
@@ -0,0 +1,185 @@
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import gevent
+
+from circulation_load_test.common.cmbookmarkwriter import CMBookmarkWriter
+from circulation_load_test.common.cmcatalog import CMCatalogs
+from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+from circulation_load_test.common.cmlinkgraph import CMLinkGraphs
+from circulation_load_test.common.cmloanpool import CMLoan, CMLoanPools
+from circulation_load_test.common.cmlogin import CMLogin
+from circulation_load_test.common.cmopensearch import (
+    CMOpenSearchTemplate,
+    CMSearchTemplates,
+)
+from circulation_load_test.common.cmreadingsync import CMReadingSync
+from circulation_load_test.common.cmsearch import CMSearch
+from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+from circulation_load_test.common.cmterms import CMAliasSampler
+from circulation_load_test.common.cmuser import (
+    CMAuthDocument,
+    CMAuthenticationLinkType,
+    CMHTTPUser,
+)
+from circulation_load_test.common.cmworkload import CMThinkTime
+from circulation_load_test.common.config import (
+    CMConfiguration,
+    CMJourneyConfiguration,
+    CMJourneyStep,
+)
+
+
+@dataclass
+class CMJourneySession:
+    """The state carried between the steps of a journey."""
+
+    document: Optional[CMAuthDocument] = None
+    root: Optional[str] = None
+    search: Optional[CMOpenSearchTemplate] = None
+    loans: List[CMLoan] = field(default_factory=list)
+    steps: List[CMJourneyStep] = field(default_factory=list)
+
+
+class CMJourney:
+    """
+    A patron's session in the app, modelled as a Markov chain of steps. The journey
+    opens the app (logging in), and then moves from step to step according to the
+    configured transition weights until it reaches the 'end' step or has taken
+    'maximum_steps' steps. The login session, search template, and loans are kept in
+    a CMJourneySession and shared between steps. Loans that are still held at the end
+    of the journey are returned, or checked back in to the loan pool if one is
+    configured. Each 'read' step reads one of the borrowed books for a few reading
+    position updates, as configured by the journey's 'read' settings.
+
+    The duration of each step is reported to Locust as a "journey" request named
+    after the step.
+    """
+
+    def __init__(self, config: CMConfiguration):
+        self.config = config
+        self.journey: CMJourneyConfiguration = config.journey
+        self.think_time = CMThinkTime(self.journey.step_think_time)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._samplers: Dict[CMJourneyStep, CMAliasSampler] = {}
+        self._targets: Dict[CMJourneyStep, List[CMJourneyStep]] = {}
+        for source, targets in self.journey.transitions.items():
+            self._targets[source] = list(targets)
+            self._samplers[source] = CMAliasSampler.create(list(targets.values()))
+
+    def next_step(self, step: CMJourneyStep) -> CMJourneyStep:
+        sampler = self._samplers.get(step)
+        if sampler is None:
+            return CMJourneyStep.END
+        return self._targets[step][sampler.sample()]
+
+    def execute(self, user: CMHTTPUser) -> CMJourneySession:
+        session = CMJourneySession()
+        step = CMJourneyStep.OPEN
+        try:
+            while step != CMJourneyStep.END:
+                if len(session.steps) >= self.journey.maximum_steps:
+                    break
+                if step == CMJourneyStep.READ and not session.loans:
+                    step = CMJourneyStep.BORROW
+                if session.steps:
+                    gevent.sleep(self.think_time())
+                self._run(user, session, step)
+                step = self.next_step(step)
+        finally:
+            self._finish(user, session)
+        return session
+
+    def _run(self, user: CMHTTPUser, session: CMJourneySession, step: CMJourneyStep):
+        self.logger.info(f"step {step.value}")
+        session.steps.append(step)
+        start = time.perf_counter()
+        exception: Optional[Exception] = None
+        try:
+            getattr(self, f"_step_{step.value}")(user, session)
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            user.environment.events.request.fire(
+                request_type="journey",
+                name=step.value,
+                response_time=(time.perf_counter() - start) * 1000.0,
+                response_length=0,
+                exception=exception,
+                context={},
+            )
+
+    def _search_and_bookmark(self, user: CMHTTPUser, session: CMJourneySession):
+        assert session.search is not None and session.root is not None
+        catalog = CMCatalogs.get()
+        books = catalog.library_for_root(session.root) if catalog else None
+        writer = CMBookmarkWriter.create(self.config.bookmarks)
+        return CMSearchAndBookmark(session.search, writer, books, session.root)
+
+    def _step_open(self, user: CMHTTPUser, session: CMJourneySession):
+        session.document = CMLogin.login_cached(user)
+        session.root = session.document.links[CMAuthenticationLinkType.CATALOG]
+        session.search = CMSearchTemplates.find(user, session.root)
+
+    def _step_browse(self, user: CMHTTPUser, session: CMJourneySession):
+        assert session.root is not None
+        walk_config = self.config.feed_walk
+        walk = CMFeedWalk(
+            session.root,
+            allowed_link_relations={"collection", "related", "alternate"},
+            maximum_visits=walk_config.maximum_visits,
+            policy=walk_config.policy,
+            concurrency=walk_config.concurrency,
+            maximum_depth=walk_config.maximum_depth,
+            maximum_bytes=walk_config.maximum_bytes,
+            link_graph=CMLinkGraphs.get(),
+        )
+        walk.execute(user)
+
+    def _step_search(self, user: CMHTTPUser, session: CMJourneySession):
+        if session.search is None:
+            raise ValueError(f"No search link found in {session.root}")
+        CMSearch(session.search, self.config.search_pagination).execute(user)
+
+    def _step_borrow(self, user: CMHTTPUser, session: CMJourneySession):
+        if session.search is None:
+            raise ValueError(f"No search link found in {session.root}")
+        pool = CMLoanPools.get()
+        loan = pool.checkout(user.patron.name) if pool is not None else None
+        if loan is None:
+            loan = self._search_and_bookmark(user, session).create_loan(user)
+        session.loans.append(loan)
+
+    def _step_read(self, user: CMHTTPUser, session: CMJourneySession):
+        loan = random.choice(session.loans)
+        sync = CMReadingSync.create(self.journey.read)
+        sync.execute(user, loan.annotations_link, loan.book_id)
+
+    def _step_return(self, user: CMHTTPUser, session: CMJourneySession):
+        if not session.loans:
+            return
+        loan = session.loans.pop(random.randrange(len(session.loans)))
+        CMSearchAndBookmark.revoke(user, loan.revoke_link)
+
+    def _finish(self, user: CMHTTPUser, session: CMJourneySession):
+        pool = CMLoanPools.get()
+        loans, session.loans = session.loans, []
+        for loan in loans:
+            try:
+                if pool is not None:
+                    pool.checkin(user.patron.name, loan)
+                else:
+                    CMSearchAndBookmark.revoke(user, loan.revoke_link)
+            except Exception as e:
+                self.logger.warning(f"unable to return {loan.revoke_link}: {e}")
+
+        if pool is not None:
+            for retired in pool.retired(user.patron.name):
+                try:
+                    CMSearchAndBookmark.revoke(user, retired.revoke_link)
+                except Exception as e:
+                    self.logger.warning(f"unable to return {retired.revoke_link}: {e}")
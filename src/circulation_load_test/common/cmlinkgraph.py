@@ -0,0 +1,131 @@
+import random
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from locust.env import Environment
+
+from circulation_load_test.common.cmopds import CMOPDSFeed, CMOPDSLink
+from circulation_load_test.common.config import CMLinkGraphConfiguration, Configurations
+
+REL_AUTH_DOCUMENT = "http://opds-spec.org/auth/document"
+
+# The link relations recorded in the graph. Callers that consult the graph can only
+# discover links with these relations.
+DISCOVERY_RELATIONS = frozenset(
+    {"alternate", "collection", "related", "search", "start", REL_AUTH_DOCUMENT}
+)
+
+
+class CMLinkGraph:
+    """
+    A graph of the links discovered in each feed, shared by every simulated user in a
+    worker. The graph holds at most 'capacity' feeds (evicting the least recently used
+    feed) and at most 'maximum_links' links per feed, and forgets feeds after 'ttl'
+    seconds. The feed-level links (such as the search link) are always kept, and only
+    the entry-level links are dropped to fit in 'maximum_links'. Lookups are reported to
+    Locust as "linkgraph" requests named "hit" or "miss", so that the hit rate appears
+    in the statistics.
+    """
+
+    def __init__(self, capacity: int, maximum_links: int, ttl: float):
+        assert capacity > 0
+        assert maximum_links > 0
+        self.capacity = capacity
+        self.maximum_links = maximum_links
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._feeds: "OrderedDict[str, Tuple[float, List[CMOPDSLink]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def _report(self, environment: Optional[Environment], name: str):
+        if environment is None:
+            return
+        environment.events.request.fire(
+            request_type="linkgraph",
+            name=name,
+            response_time=0,
+            response_length=0,
+            exception=None,
+            context={},
+        )
+
+    def get(
+        self, url: str, environment: Optional[Environment] = None
+    ) -> Optional[List[CMOPDSLink]]:
+        """Return the links discovered in the given feed, if they are known."""
+        item = self._feeds.get(url)
+        if item is not None:
+            created, links = item
+            if time.monotonic() - created < self.ttl:
+                self._feeds.move_to_end(url)
+                self.hits += 1
+                self._report(environment, "hit")
+                return links
+            del self._feeds[url]
+
+        self.misses += 1
+        self._report(environment, "miss")
+        return None
+
+    def put(
+        self,
+        url: str,
+        links: List[CMOPDSLink],
+        feed_links: Sequence[CMOPDSLink] = (),
+    ):
+        """
+        Record the links discovered in the given feed. The 'feed_links' are always
+        kept, and a random sample of the other links fills the remaining space.
+        """
+        space = max(0, self.maximum_links - len(feed_links))
+        if len(links) > space:
+            links = random.sample(links, space)
+        self._feeds[url] = (time.monotonic(), list(feed_links) + links)
+        self._feeds.move_to_end(url)
+        while len(self._feeds) > self.capacity:
+            self._feeds.popitem(last=False)
+
+    def put_feed(self, url: str, feed: CMOPDSFeed) -> List[CMOPDSLink]:
+        """Record the feed-level and entry-level links of the given parsed feed."""
+        entry_links: List[CMOPDSLink] = []
+        for entry in feed.entries:
+            entry_links.extend(entry.links)
+        self.put(url, entry_links, feed.links)
+        return list(feed.links) + entry_links
+
+    def clear(self):
+        self._feeds.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def create(config: CMLinkGraphConfiguration) -> "CMLinkGraph":
+        return CMLinkGraph(config.capacity, config.maximum_links, config.ttl)
+
+
+class CMLinkGraphs:
+    """
+    The worker-wide link graph. This is None unless the configuration asks for link
+    discovery to be served from the cache.
+    """
+
+    _graph: Optional[CMLinkGraph] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[CMLinkGraph]:
+        if cls._initialized:
+            return cls._graph
+        config = Configurations.get().circulation_manager.link_graph
+        cls._graph = CMLinkGraph.create(config) if config.enabled else None
+        cls._initialized = True
+        return cls._graph
+
+    @classmethod
+    def clear(cls):
+        cls._graph = None
+        cls._initialized = False
@@ -0,0 +1,102 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from circulation_load_test.common.config import CMLoanPoolConfiguration, Configurations
+
+
+@dataclass
+class CMLoan:
+    """An active loan, with the links needed to annotate and return the book."""
+
+    book_id: str
+    revoke_link: Optional[str]
+    annotations_link: str
+    created: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+class CMLoanPool:
+    """
+    A pool of active loans, shared by the simulated users in a worker and keyed by
+    patron. Loans are checked out of the pool by a task and checked back in when the
+    task is done. A pool keeps at most 'loans_per_patron' idle loans for each patron,
+    and retires loans that are older than 'maximum_age' seconds or have been checked
+    out 'maximum_uses' times. Retired loans must be revoked by the caller.
+    """
+
+    def __init__(self, loans_per_patron: int, maximum_age: float, maximum_uses: int):
+        assert loans_per_patron > 0
+        assert maximum_age > 0
+        assert maximum_uses > 0
+        self.loans_per_patron = loans_per_patron
+        self.maximum_age = maximum_age
+        self.maximum_uses = maximum_uses
+        self._idle: Dict[str, List[CMLoan]] = {}
+        self._retired: Dict[str, List[CMLoan]] = {}
+
+    def _expired(self, loan: CMLoan) -> bool:
+        if loan.uses >= self.maximum_uses:
+            return True
+        return time.monotonic() - loan.created >= self.maximum_age
+
+    def checkout(self, patron: str) -> Optional[CMLoan]:
+        """Take an idle loan for the given patron, or return None if there is none."""
+        idle = self._idle.get(patron)
+        while idle:
+            loan = idle.pop()
+            if self._expired(loan):
+                self._retired.setdefault(patron, []).append(loan)
+                continue
+            loan.uses += 1
+            return loan
+        return None
+
+    def checkin(self, patron: str, loan: CMLoan):
+        """Return a loan to the pool, retiring it if it can no longer be used."""
+        idle = self._idle.setdefault(patron, [])
+        if self._expired(loan) or len(idle) >= self.loans_per_patron:
+            self._retired.setdefault(patron, []).append(loan)
+        else:
+            idle.append(loan)
+
+    def retired(self, patron: str) -> List[CMLoan]:
+        """Remove and return the retired loans of the given patron."""
+        return self._retired.pop(patron, [])
+
+    def drain(self, patron: str) -> List[CMLoan]:
+        """Remove and return all of the idle and retired loans of the given patron."""
+        return self._idle.pop(patron, []) + self._retired.pop(patron, [])
+
+    def __len__(self) -> int:
+        return sum(len(loans) for loans in self._idle.values())
+
+    @staticmethod
+    def create(config: CMLoanPoolConfiguration) -> "CMLoanPool":
+        return CMLoanPool(
+            config.loans_per_patron, config.maximum_age, config.maximum_uses
+        )
+
+
+class CMLoanPools:
+    """
+    The worker-wide loan pool. This is None unless the configuration keeps loans for
+    each patron.
+    """
+
+    _pool: Optional[CMLoanPool] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[CMLoanPool]:
+        if cls._initialized:
+            return cls._pool
+        config = Configurations.get().circulation_manager.loan_pool
+        cls._pool = CMLoanPool.create(config) if config.enabled else None
+        cls._initialized = True
+        return cls._pool
+
+    @classmethod
+    def clear(cls):
+        cls._pool = None
+        cls._initialized = False
@@ -1,6 +1,6 @@
-import atoma
-from atoma.atom import AtomLink
-
+from circulation_load_test.common.cminstrumentation import CMInstrumentations
+from circulation_load_test.common.cmopds import CMOPDSLink, CMOPDSParser
+from circulation_load_test.common.cmrequestnames import CMRequestNames
 from circulation_load_test.common.cmuser import (
     CMAuthDocument,
     CMAuthenticationLinkType,
@@ -9,22 +9,45 @@ from circulation_load_test.common.cmuser import (
 )
 from circulation_load_test.common.config import CMConfiguration, Configurations
 
+REL_AUTH_DOCUMENT = "http://opds-spec.org/auth/document"
+
 
 class CMLogin:
+    @staticmethod
+    def login_cached(user: CMHTTPUser) -> CMAuthDocument:
+        """
+        Log in to the CM, reusing the user's cached session if it has not yet
+        expired. Tests that want to measure the cost of logging in should use
+        login() instead.
+        """
+        session = user.session_cache.get()
+        if session is not None:
+            user.session_restore(session)
+            return session.auth_document
+
+        document = CMLogin.login(user)
+        user.session_cache.put(user.session_capture())
+        return document
+
     @staticmethod
     def login(user: CMHTTPUser) -> CMAuthDocument:
         config = Configurations.get()
         cm: CMConfiguration = config.circulation_manager
 
         # Fetch the root feed. This will typically contain a link to an authentication document.
-        response = user.client.get(cm.address)
+        measurement = CMInstrumentations.measure(user, "root")
+        response = user.client.get(cm.address, name=CMRequestNames.name(cm.address))
         response.raise_for_status()
+        measurement.received(response)
 
-        text = response.text
-        feed = atoma.parse_atom_bytes(bytes(text, "utf-8"))
-        for link in feed.links:
-            if link.rel == "http://opds-spec.org/auth/document":
-                return CMLogin._handle_auth_document(user, link)
+        feed = CMOPDSParser.parse(
+            response.content, feed_rels={REL_AUTH_DOCUMENT}, entry_rels=()
+        )
+        measurement.parsed()
+        link = feed.link(REL_AUTH_DOCUMENT)
+        measurement.finish()
+        if link:
+            return CMLogin._handle_auth_document(user, link)
 
         # Synthesize a fake authentication document that supplies a starting link
         links = {}
@@ -39,15 +62,20 @@ class CMLogin:
         cm: CMConfiguration = config.circulation_manager
 
         # Fetch the root feed. This will typically contain a link to an authentication document.
-        root_address = f"{cm.address}/{library_id}"
-        response = user.client.get(root_address)
+        root_address = f"{cm.address.rstrip('/')}/{library_id}"
+        measurement = CMInstrumentations.measure(user, "root")
+        response = user.client.get(root_address, name=CMRequestNames.name(root_address))
         response.raise_for_status()
+        measurement.received(response)
 
-        text = response.text
-        feed = atoma.parse_atom_bytes(bytes(text, "utf-8"))
-        for link in feed.links:
-            if link.rel == "http://opds-spec.org/auth/document":
-                return CMLogin._handle_auth_document(user, link)
+        feed = CMOPDSParser.parse(
+            response.content, feed_rels={REL_AUTH_DOCUMENT}, entry_rels=()
+        )
+        measurement.parsed()
+        link = feed.link(REL_AUTH_DOCUMENT)
+        measurement.finish()
+        if link:
+            return CMLogin._handle_auth_document(user, link)
 
         # Synthesize a fake authentication document that supplies a starting link
         links = {}
@@ -57,10 +85,13 @@ class CMLogin:
         return document
 
     @staticmethod
-    def _handle_auth_document(user: CMHTTPUser, link: AtomLink) -> CMAuthDocument:
-        response = user.client.get(link.href)
-        text = response.text
-        document = CMAuthDocument.parse(text)
+    def _handle_auth_document(user: CMHTTPUser, link: CMOPDSLink) -> CMAuthDocument:
+        measurement = CMInstrumentations.measure(user, "auth_document")
+        response = user.client.get(link.href, name=CMRequestNames.name(link.href))
+        measurement.received(response)
+        document = CMAuthDocument.parse(response.text)
+        measurement.parsed()
+        measurement.finish()
 
         # There may not be any required authentication.
         if len(document.auth_types) == 0:
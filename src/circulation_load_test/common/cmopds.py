@@ -0,0 +1,148 @@
+from dataclasses import dataclass, field
+from typing import Collection, List, Optional
+from xml.parsers import expat
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+OPDS_NS = "http://opds-spec.org/2010/catalog"
+
+_ENTRY = f"{ATOM_NS} entry"
+_LINK = f"{ATOM_NS} link"
+_ID = f"{ATOM_NS} id"
+_INDIRECT_ACQUISITION = f"{OPDS_NS} indirectAcquisition"
+
+
+@dataclass
+class CMOPDSLink:
+    rel: str
+    href: str
+    type: Optional[str]
+    # The types of any nested opds:indirectAcquisition elements, outermost first.
+    acquisition_types: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CMOPDSEntry:
+    id: Optional[str]
+    links: List[CMOPDSLink] = field(default_factory=list)
+
+
+@dataclass
+class CMOPDSFeed:
+    """
+    The links found in an OPDS document. For a feed, 'links' are the feed-level links
+    and 'entries' are the entries that contained at least one wanted link. For a
+    standalone entry document, 'links' are the links of that entry.
+    """
+
+    id: Optional[str]
+    links: List[CMOPDSLink] = field(default_factory=list)
+    entries: List[CMOPDSEntry] = field(default_factory=list)
+
+    def link(self, rel: str) -> Optional[CMOPDSLink]:
+        """Return the first top-level link with the given relation, if any."""
+        for link in self.links:
+            if link.rel == rel:
+                return link
+        return None
+
+
+class _CMOPDSHandler:
+    def __init__(
+        self,
+        feed_rels: Optional[Collection[str]],
+        entry_rels: Optional[Collection[str]],
+    ):
+        self.feed_rels = feed_rels
+        self.entry_rels = entry_rels
+        self.skip_entries = entry_rels is not None and len(entry_rels) == 0
+        self.feed = CMOPDSFeed(id=None)
+        self.depth = 0
+        self.entry: Optional[CMOPDSEntry] = None
+        self.link: Optional[CMOPDSLink] = None
+        self.text: Optional[List[str]] = None
+
+    def start(self, name: str, attributes: dict):
+        self.depth += 1
+        depth = self.depth
+        if name == _LINK:
+            if depth == 2:
+                self._link(attributes, self.feed_rels, self.feed.links)
+            elif depth == 3 and self.entry is not None:
+                self.link = self._link(attributes, self.entry_rels, self.entry.links)
+        elif name == _INDIRECT_ACQUISITION and self.link is not None:
+            type = attributes.get("type")
+            if type:
+                self.link.acquisition_types.append(type)
+        elif name == _ID:
+            if depth == 2 or (depth == 3 and self.entry is not None):
+                self.text = []
+        elif name == _ENTRY and depth == 2 and not self.skip_entries:
+            self.entry = CMOPDSEntry(id=None)
+
+    @staticmethod
+    def _link(
+        attributes: dict,
+        rels: Optional[Collection[str]],
+        links: List[CMOPDSLink],
+    ) -> Optional[CMOPDSLink]:
+        href = attributes.get("href")
+        if href is None:
+            return None
+        rel = attributes.get("rel", "alternate")
+        if rels is None or rel in rels:
+            link = CMOPDSLink(rel=rel, href=href, type=attributes.get("type"))
+            links.append(link)
+            return link
+        return None
+
+    def end(self, name: str):
+        depth = self.depth
+        self.depth -= 1
+        if name == _ID and self.text is not None:
+            text = "".join(self.text).strip()
+            self.text = None
+            if depth == 2:
+                self.feed.id = text
+            elif self.entry is not None:
+                self.entry.id = text
+        elif name == _LINK and depth == 3:
+            self.link = None
+        elif name == _ENTRY and depth == 2 and self.entry is not None:
+            if self.entry.links:
+                self.feed.entries.append(self.entry)
+            self.entry = None
+
+    def characters(self, data: str):
+        if self.text is not None:
+            self.text.append(data)
+
+
+class CMOPDSParser:
+    """
+    A streaming extractor for the links in OPDS (Atom) documents. Documents are parsed
+    directly from the raw response bytes without building an object tree, and only
+    the links with the requested relations are kept.
+    """
+
+    @staticmethod
+    def parse(
+        data: bytes,
+        feed_rels: Optional[Collection[str]] = None,
+        entry_rels: Optional[Collection[str]] = None,
+    ) -> CMOPDSFeed:
+        """
+        Parse the given document. If 'feed_rels' or 'entry_rels' are provided, only
+        feed-level or entry-level links with those relations are returned; an empty
+        'entry_rels' skips entries entirely.
+        """
+        handler = _CMOPDSHandler(feed_rels=feed_rels, entry_rels=entry_rels)
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.characters
+        try:
+            parser.Parse(data, True)
+        except expat.ExpatError as e:
+            raise ValueError(f"Malformed OPDS document: {e}") from e
+        return handler.feed
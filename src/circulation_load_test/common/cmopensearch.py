@@ -0,0 +1,166 @@
+import logging
+import re
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote_plus, urljoin
+
+from circulation_load_test.common.cminstrumentation import CMInstrumentations
+from circulation_load_test.common.cmlinkgraph import DISCOVERY_RELATIONS, CMLinkGraphs
+from circulation_load_test.common.cmopds import CMOPDSParser
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.config import Configurations
+
+OPENSEARCH_NS = "http://a9.com/-/spec/opensearch/1.1/"
+
+_PARAMETER = re.compile(r"\{([^}?]+)(\??)\}")
+
+# Values used for the OpenSearch parameters other than searchTerms. Optional
+# parameters are left empty.
+_PARAMETER_DEFAULTS = {
+    "count": "",
+    "startIndex": "1",
+    "startPage": "1",
+    "language": "*",
+    "inputEncoding": "UTF-8",
+    "outputEncoding": "UTF-8",
+}
+
+
+class CMOpenSearchTemplate:
+    """An OpenSearch URL template into which search terms can be substituted."""
+
+    def __init__(self, template: str):
+        assert isinstance(template, str)
+        self.template = template
+
+        def substitute(match: re.Match) -> str:
+            name, optional = match.group(1), match.group(2)
+            if name == "searchTerms":
+                return match.group(0)
+            if optional:
+                return ""
+            return _PARAMETER_DEFAULTS.get(name, "")
+
+        expanded = _PARAMETER.sub(substitute, template)
+        prefix, found, suffix = expanded.partition("{searchTerms}")
+        if not found:
+            raise ValueError(f"Template has no searchTerms parameter: {template}")
+        self._prefix = prefix
+        self._suffix = suffix
+
+    def expand(self, terms: str) -> str:
+        return self._prefix + quote_plus(terms) + self._suffix
+
+    @staticmethod
+    def parse(data: bytes, base: str) -> "CMOpenSearchTemplate":
+        """Find the template for OPDS results in an OpenSearch description document."""
+        # Descriptions are parsed once per library, so ElementTree is only imported
+        # by the workers that search.
+        from xml.etree import ElementTree
+
+        try:
+            root = ElementTree.fromstring(data)
+        except ElementTree.ParseError as e:
+            raise ValueError(f"Malformed OpenSearch description: {e}") from e
+
+        templates = []
+        for element in root.iter():
+            if element.tag in {f"{{{OPENSEARCH_NS}}}Url", "Url"}:
+                template = element.get("template")
+                if template:
+                    templates.append((element.get("type") or "", template))
+
+        if not templates:
+            raise ValueError("OpenSearch description contains no URL templates")
+        for type, template in templates:
+            if type.startswith("application/atom+xml"):
+                return CMOpenSearchTemplate(urljoin(base, template))
+        return CMOpenSearchTemplate(urljoin(base, templates[0][1]))
+
+    @staticmethod
+    def legacy(search_link: str) -> "CMOpenSearchTemplate":
+        """A template that appends the search terms to the given search link."""
+        separator = "&" if "?" in search_link else "?"
+        return CMOpenSearchTemplate(f"{search_link}{separator}q={{searchTerms}}")
+
+
+class CMSearchTemplates:
+    """
+    The search templates of each library, shared by all simulated users in a worker.
+    Templates are found by following the search link of the library's catalog root
+    to its OpenSearch description, and are kept for the configured time-to-live.
+    """
+
+    _templates: Dict[str, Tuple[float, CMOpenSearchTemplate]] = {}
+    _logger = logging.getLogger("CMSearchTemplates")
+
+    @classmethod
+    def find(cls, user: CMHTTPUser, root: str) -> Optional[CMOpenSearchTemplate]:
+        """Return the search template for the catalog with the given root feed."""
+        ttl = Configurations.get().circulation_manager.search_template_ttl
+        item = cls._templates.get(root)
+        if item is not None and time.monotonic() - item[0] < ttl:
+            return item[1]
+
+        search_link = cls.find_search_link(user, root)
+        if search_link is None:
+            return None
+
+        measurement = CMInstrumentations.measure(user, "opensearch")
+        response = user.conditional_get(
+            search_link, name=CMRequestNames.name(search_link)
+        )
+        user.raise_for_status(response)
+        measurement.received(response)
+        content_type = response.headers.get("content-type") or ""
+        if content_type.startswith("application/opensearchdescription+xml"):
+            template = CMOpenSearchTemplate.parse(response.content, search_link)
+            measurement.parsed()
+            measurement.finish()
+        else:
+            cls._logger.warning(
+                f"search link {search_link} is not an OpenSearch description"
+            )
+            template = CMOpenSearchTemplate.legacy(search_link)
+
+        cls._templates[root] = (time.monotonic(), template)
+        return template
+
+    @classmethod
+    def find_search_link(cls, user: CMHTTPUser, url: str) -> Optional[str]:
+        """Return the search link of the given feed."""
+        graph = CMLinkGraphs.get()
+        if graph is not None:
+            links = graph.get(url, user.environment)
+            if links is not None:
+                for link in links:
+                    if link.rel == "search":
+                        return link.href
+                # The link may have been dropped from the graph, so ask the server.
+
+        response = user.conditional_get(url, name=CMRequestNames.name(url))
+        user.raise_for_status(response)
+
+        content_type = response.headers.get("content-type")
+        if content_type.startswith("application/atom+xml"):
+            if graph is not None:
+                feed = CMOPDSParser.parse(
+                    response.content,
+                    feed_rels=DISCOVERY_RELATIONS,
+                    entry_rels=DISCOVERY_RELATIONS,
+                )
+                graph.put_feed(url, feed)
+            else:
+                feed = CMOPDSParser.parse(
+                    response.content, feed_rels={"search"}, entry_rels=()
+                )
+            link = feed.link("search")
+            if link:
+                return link.href
+
+        return None
+
+    @classmethod
+    def clear(cls):
+        cls._templates.clear()
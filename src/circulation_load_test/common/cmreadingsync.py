@@ -0,0 +1,253 @@
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Mapping, Optional
+
+import gevent
+
+from circulation_load_test.common.cmbookmarks import (
+    CMBookmark,
+    CMBookmarkBody,
+    CMBookmarkTarget,
+    CMLocator,
+    CMLocatorAudioBookTime,
+    CMLocatorHrefProgression,
+    CMLocatorLegacyCFI,
+    CMLocatorPage,
+    CMMotivation,
+)
+from circulation_load_test.common.cmbookmarkwriter import TYPE_ANNOTATION
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmterms import CMAliasSampler
+from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.cmworkload import CMThinkTime
+from circulation_load_test.common.config import (
+    CMLocatorKind,
+    CMReadingSyncConfiguration,
+)
+
+# The length of each chapter of a simulated audiobook.
+CHAPTER_MS = 20 * 60 * 1000
+
+# The generator used when callers do not supply their own.
+_RANDOM = random.Random()
+
+
+class CMReadingPosition:
+    """
+    The position of a simulated reader in a book, which moves forward through the
+    chapters with each update, and is expressed as a locator of the given kind.
+    """
+
+    def __init__(
+        self,
+        kind: CMLocatorKind,
+        book_id: str,
+        generator: random.Random = _RANDOM,
+    ):
+        self.kind = kind
+        self.book_id = book_id
+        self.generator = generator
+        self.chapter = 1
+        self.progression = 0.0
+        self.page = 1
+
+    def advance(self):
+        """Read on, turning a few pages."""
+        pages = self.generator.randint(1, 5)
+        self.page += pages
+        self.progression += pages * 0.02
+        if self.progression >= 1.0:
+            self.chapter += 1
+            self.progression = 0.0
+
+    def locator(self) -> CMLocator:
+        chapter = self.chapter
+        progression = round(self.progression, 4)
+        if self.kind == CMLocatorKind.PAGE:
+            return CMLocatorPage(self.page)
+        if self.kind == CMLocatorKind.HREF_PROGRESSION:
+            return CMLocatorHrefProgression(
+                f"/OEBPS/chapter{chapter:03d}.xhtml", progression
+            )
+        if self.kind == CMLocatorKind.LEGACY_CFI:
+            paragraph = int(progression * 100) + 1
+            return CMLocatorLegacyCFI(
+                f"chapter{chapter:03d}", f"/4/2/{2 * paragraph}/1:0", progression
+            )
+        return CMLocatorAudioBookTime(
+            part=0,
+            chapter=chapter,
+            title=f"Chapter {chapter}",
+            duration=CHAPTER_MS,
+            time_ms=float(int(progression * CHAPTER_MS)),
+            id=self.book_id,
+        )
+
+
+class CMReadingSync:
+    """
+    Simulates an app synchronizing a patron's reading position while the patron
+    reads a loaned book, which is where most of the load on a CM's annotation service
+    comes from. The reader's locator kind is drawn from the configured mix, since it
+    depends on the book's format and the app. The app fetches the annotations when
+    the book is opened, then upserts the reading position (an annotation with the
+    idling motivation) 'updates' times, pausing for the 'update_interval' between
+    updates, and adds a bookmark at the current position with probability
+    'bookmark_probability' at each update. The annotations are read again after
+    every 'read_every' updates, and when reading stops.
+
+    Each read is checked: the book must have exactly one reading position, at the
+    position last sent, and every bookmark added must be listed. The outcome of each
+    check is reported to Locust as a "reading_sync" request named "verify".
+    """
+
+    def __init__(self, config: Optional[CMReadingSyncConfiguration] = None):
+        self.config = config or CMReadingSyncConfiguration()
+        self.kinds = list(self.config.locator_weights)
+        self.sampler = CMAliasSampler.create(list(self.config.locator_weights.values()))
+        self.interval = CMThinkTime(self.config.update_interval)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def execute(self, user: CMHTTPUser, annotations_link: str, book_id: str):
+        """Read the given book, synchronizing with the given annotations service."""
+        config = self.config
+        kind = self.kinds[self.sampler.sample()]
+        position = CMReadingPosition(kind, book_id)
+        device_id = str(uuid.uuid4())
+        bookmarks: List[Optional[str]] = []
+        self.logger.info(f"reading {book_id} with {kind.value} locators")
+
+        self._read(user, annotations_link)
+        for update in range(1, config.updates + 1):
+            gevent.sleep(self.interval())
+            position.advance()
+            locator = position.locator()
+            self._write(
+                user, annotations_link, book_id, device_id, locator, CMMotivation.IDLING
+            )
+            if _RANDOM.random() < config.bookmark_probability:
+                bookmarks.append(
+                    self._write(
+                        user,
+                        annotations_link,
+                        book_id,
+                        device_id,
+                        locator,
+                        CMMotivation.BOOKMARKING,
+                    )
+                )
+            if update % config.read_every == 0 or update == config.updates:
+                items = self._read(user, annotations_link)
+                self._verify(user, items, book_id, locator, bookmarks)
+
+    def _write(
+        self,
+        user: CMHTTPUser,
+        annotations_link: str,
+        book_id: str,
+        device_id: str,
+        locator: CMLocator,
+        motivation: CMMotivation,
+    ) -> Optional[str]:
+        bookmark = CMBookmark(
+            id=str(uuid.uuid4()),
+            target=CMBookmarkTarget(locator=locator, source=book_id),
+            motivation=motivation,
+            body=CMBookmarkBody(
+                device_id=device_id,
+                time=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                others={},
+            ),
+        )
+        headers = {"content-type": TYPE_ANNOTATION}
+        headers.update(user.authentication.headers_required())
+        response = user.client.post(
+            annotations_link,
+            data=json.dumps(bookmark.to_json_dict()).encode("utf-8"),
+            headers=headers,
+            name=CMRequestNames.name(annotations_link),
+        )
+        if response.status_code >= 400:
+            self.logger.error(f"{response.text}")
+        user.raise_for_status(response)
+        try:
+            return json.loads(response.content).get("id")
+        except (ValueError, AttributeError):
+            return None
+
+    def _read(self, user: CMHTTPUser, annotations_link: str) -> List[Dict[str, Any]]:
+        response = user.client.get(
+            annotations_link,
+            headers=user.authentication.headers_required(),
+            name=CMRequestNames.name(annotations_link),
+        )
+        user.raise_for_status(response)
+        return self.items(json.loads(response.content))
+
+    @staticmethod
+    def items(collection: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        """The annotations listed in an annotation collection."""
+        page = collection.get("first") or {}
+        return list(page.get("items") or collection.get("items") or [])
+
+    @staticmethod
+    def mismatch(
+        items: List[Dict[str, Any]],
+        book_id: str,
+        locator: CMLocator,
+        bookmarks: List[Optional[str]],
+    ) -> Optional[str]:
+        """
+        Describe how the annotations fail to match what was sent for the book, or
+        return None if they match.
+        """
+        positions = [
+            item
+            for item in items
+            if item.get("motivation") == CMMotivation.IDLING.value
+            and (item.get("target") or {}).get("source") == book_id
+        ]
+        if len(positions) != 1:
+            return (
+                f"expected one reading position for {book_id}, found {len(positions)}"
+            )
+        try:
+            selector = positions[0]["target"]["selector"]["value"]
+            found = json.loads(selector)
+        except (KeyError, TypeError, ValueError):
+            return f"the reading position for {book_id} has no readable locator"
+        if found != locator.to_json_dict():
+            return f"the reading position for {book_id} is {found}"
+
+        listed = {item.get("id") for item in items}
+        missing = [id for id in bookmarks if id is not None and id not in listed]
+        if missing:
+            return f"{len(missing)} bookmarks for {book_id} are not listed"
+        return None
+
+    def _verify(
+        self,
+        user: CMHTTPUser,
+        items: List[Dict[str, Any]],
+        book_id: str,
+        locator: CMLocator,
+        bookmarks: List[Optional[str]],
+    ):
+        problem = self.mismatch(items, book_id, locator, bookmarks)
+        if problem is not None:
+            self.logger.error(problem)
+        user.environment.events.request.fire(
+            request_type="reading_sync",
+            name="verify",
+            response_time=0,
+            response_length=len(items),
+            exception=ValueError(problem) if problem is not None else None,
+            context={},
+        )
+
+    @staticmethod
+    def create(config: CMReadingSyncConfiguration) -> "CMReadingSync":
+        return CMReadingSync(config)
@@ -0,0 +1,336 @@
+import gzip
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+import gevent
+from gevent.queue import Queue
+
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmuser import CMAuthenticationBasic, CMHTTPUser
+from circulation_load_test.common.config import CMReplayConfiguration, Configurations
+
+# A header value that is replaced with the Basic credentials of the replaying patron.
+AUTHORIZATION_TEMPLATE = "{authorization}"
+
+
+@dataclass
+class CMReplayRecord:
+    """
+    A request in a replay log: its time in seconds relative to the start of the log,
+    method, path, headers, optional body, the key of the patron session that made it,
+    and an optional name under which it is reported to Locust.
+    """
+
+    time: float
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Optional[str] = None
+    patron: Optional[str] = None
+    name: Optional[str] = None
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "t": self.time,
+            "method": self.method,
+            "path": self.path,
+            "headers": self.headers,
+        }
+        if self.body is not None:
+            result["body"] = self.body
+        if self.patron is not None:
+            result["patron"] = self.patron
+        if self.name is not None:
+            result["name"] = self.name
+        return result
+
+    @staticmethod
+    def parse(data: Any) -> "CMReplayRecord":
+        if not isinstance(data, dict):
+            raise ValueError(
+                "A replay record must be an object (got " + str(data) + ")"
+            )
+
+        moment = data.get("t")
+        if not isinstance(moment, (int, float)) or moment < 0:
+            raise ValueError(
+                "'t' must be a non-negative number (got " + str(moment) + ")"
+            )
+
+        method = data.get("method", "GET")
+        if not isinstance(method, str) or not method:
+            raise ValueError("'method' must be a string (got " + str(method) + ")")
+
+        path = data.get("path")
+        if not isinstance(path, str) or not path.startswith("/"):
+            raise ValueError("'path' must be an absolute path (got " + str(path) + ")")
+
+        headers = data.get("headers", {})
+        if not isinstance(headers, dict) or not all(
+            isinstance(value, str) for value in headers.values()
+        ):
+            raise ValueError(
+                "'headers' must be an object of strings (got " + str(headers) + ")"
+            )
+
+        body = data.get("body")
+        if body is not None and not isinstance(body, str):
+            raise ValueError("'body' must be a string (got " + str(body) + ")")
+
+        patron = data.get("patron")
+        if patron is not None and not isinstance(patron, str):
+            raise ValueError("'patron' must be a string (got " + str(patron) + ")")
+
+        name = data.get("name")
+        if name is not None and not isinstance(name, str):
+            raise ValueError("'name' must be a string (got " + str(name) + ")")
+
+        return CMReplayRecord(
+            float(moment), method.upper(), path, headers, body, patron, name
+        )
+
+
+class CMReplayLog:
+    """
+    A replay log: a file of JSON replay records, one per line, in order of time. The
+    file may be gzip-compressed, in which case its name must end in '.gz'. The file
+    is read as it is iterated, so logs of any size can be replayed.
+    """
+
+    def __init__(self, path: str):
+        assert isinstance(path, str)
+        self.path = path
+
+    def _open(self) -> IO[bytes]:
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, "rb")
+        return open(self.path, "rb")
+
+    def __iter__(self) -> Iterator[CMReplayRecord]:
+        with self._open() as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield CMReplayRecord.parse(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"{self.path}:{number}: {e}") from e
+
+
+class CMReplayChannel:
+    """The queue of records waiting to be replayed by one simulated user."""
+
+    def __init__(self, queue_size: int):
+        self.queue: Queue = Queue(queue_size)
+        self.closed = False
+
+    def get(self) -> Optional[Tuple[float, CMReplayRecord]]:
+        """
+        Wait for the next record, returning the time at which it was due and the
+        record, or None when the log is finished.
+        """
+        return self.queue.get()
+
+
+class CMReplayer:
+    """
+    Schedules the records of a replay log against the simulated users of a worker.
+    A single greenlet reads the log as it goes, waits until each record is due, and
+    hands it to a user's channel. The times in the log are divided by 'speed', so a
+    speed of 2 replays the log twice as fast, and a speed of 0.5 at half speed.
+
+    Records of the same patron session are always handed to the same user, so that
+    they share its login and connections; records without a patron are handed to the
+    users in turn. When a user's channel is full, the reader waits for it, and the
+    records that follow start late. With 'loop', the log is replayed again when it is
+    finished; otherwise each user is told that the replay is over.
+    """
+
+    def __init__(
+        self,
+        log: CMReplayLog,
+        speed: float = 1.0,
+        loop: bool = False,
+        queue_size: int = 1000,
+        clock=time.monotonic,
+    ):
+        assert speed > 0
+        self.log = log
+        self.speed = speed
+        self.loop = loop
+        self.queue_size = queue_size
+        self.clock = clock
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.finished = False
+        self.replayed = 0
+        self._channels: List[CMReplayChannel] = []
+        self._affinity: Dict[str, CMReplayChannel] = {}
+        self._next = itertools.count()
+        self._reader: Optional[gevent.Greenlet] = None
+
+    def register(self) -> CMReplayChannel:
+        """Add a user to the replay, starting the replay if it is the first."""
+        channel = CMReplayChannel(self.queue_size)
+        if self.finished:
+            channel.queue.put(None)
+            return channel
+        self._channels.append(channel)
+        if self._reader is None:
+            self._reader = gevent.spawn(self._run)
+        return channel
+
+    def unregister(self, channel: CMReplayChannel):
+        """
+        Remove a user from the replay. Its patrons move to other users. The replay
+        stops when the last user is removed.
+        """
+        if channel.closed:
+            return
+        channel.closed = True
+        if channel in self._channels:
+            self._channels.remove(channel)
+        while not channel.queue.empty():
+            channel.queue.get_nowait()
+        if not self._channels:
+            self.stop()
+
+    def stop(self):
+        if self._reader is not None:
+            self._reader.kill()
+            self._reader = None
+        self._affinity.clear()
+
+    def _route(self, record: CMReplayRecord) -> Optional[CMReplayChannel]:
+        if not self._channels:
+            return None
+        if record.patron is not None:
+            channel = self._affinity.get(record.patron)
+            if channel is not None and not channel.closed:
+                return channel
+        channel = self._channels[next(self._next) % len(self._channels)]
+        if record.patron is not None:
+            self._affinity[record.patron] = channel
+        return channel
+
+    def _run(self):
+        try:
+            self._replay()
+        except Exception as e:
+            self.logger.error(f"unable to replay {self.log.path}: {e}")
+        finally:
+            self.finished = True
+            self._reader = None
+            for channel in self._channels:
+                channel.queue.put(None)
+
+    def _replay(self):
+        start = self.clock()
+        offset = 0.0
+        while True:
+            last = 0.0
+            for record in self.log:
+                last = record.time
+                due = start + (offset + record.time) / self.speed
+                delay = due - self.clock()
+                if delay > 0:
+                    gevent.sleep(delay)
+                channel = self._route(record)
+                if channel is None:
+                    return
+                channel.queue.put((due, record))
+                self.replayed += 1
+            if not self.loop or last == 0.0:
+                break
+            offset += last
+            self._affinity.clear()
+        self.logger.info(f"replayed {self.replayed} requests from {self.log.path}")
+
+    @staticmethod
+    def create(config: CMReplayConfiguration) -> "CMReplayer":
+        assert config.log is not None
+        return CMReplayer(
+            CMReplayLog(config.log), config.speed, config.loop, config.queue_size
+        )
+
+
+class CMReplayers:
+    """
+    The worker-wide replayer. This is None unless the configuration names a replay
+    log.
+    """
+
+    _replayer: Optional[CMReplayer] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[CMReplayer]:
+        if cls._initialized:
+            return cls._replayer
+        config = Configurations.get().circulation_manager.replay
+        cls._replayer = CMReplayer.create(config) if config.log is not None else None
+        cls._initialized = True
+        return cls._replayer
+
+    @classmethod
+    def clear(cls):
+        if cls._replayer is not None:
+            cls._replayer.stop()
+        cls._replayer = None
+        cls._initialized = False
+
+
+class CMReplay:
+    """
+    Replays the records handed to a user's channel. The time by which each record
+    starts after it was due is reported to Locust as a "replay" request named "lag".
+    """
+
+    def __init__(self, channel: CMReplayChannel, clock=time.monotonic):
+        self.channel = channel
+        self.clock = clock
+
+    @staticmethod
+    def headers(user: CMHTTPUser, record: CMReplayRecord) -> Dict[str, str]:
+        result = {}
+        for header, value in record.headers.items():
+            if AUTHORIZATION_TEMPLATE in value:
+                patron = user.patron
+                credentials = CMAuthenticationBasic._basic_auth(
+                    patron.name, patron.password
+                )
+                value = value.replace(AUTHORIZATION_TEMPLATE, credentials)
+            result[header] = value
+        return result
+
+    def execute(self, user: CMHTTPUser) -> bool:
+        """Replay the next record, returning False when the replay is finished."""
+        item = self.channel.get()
+        if item is None:
+            return False
+
+        due, record = item
+        lag = self.clock() - due
+        if lag > 0:
+            user.environment.events.request.fire(
+                request_type="replay",
+                name="lag",
+                response_time=lag * 1000.0,
+                response_length=0,
+                exception=None,
+                context={},
+            )
+
+        body = record.body.encode("utf-8") if record.body is not None else None
+        user.client.request(
+            record.method,
+            user.host.rstrip("/") + record.path,
+            headers=self.headers(user, record),
+            data=body,
+            name=record.name or CMRequestNames.name(record.path),
+        )
+        return True
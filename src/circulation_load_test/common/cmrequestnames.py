@@ -0,0 +1,118 @@
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from circulation_load_test.common.config import (
+    CMConfiguration,
+    CMRequestNamesConfiguration,
+    Configurations,
+)
+
+# The rules that turn the paths of Circulation Manager URLs into endpoint names,
+# applied in order after any configured rules.
+DEFAULT_RULES: List[Tuple[str, str]] = [
+    (r"/(groups|feed)/[^/]+", r"/\1/[lane]"),
+    (r"/works/(contributor|series)/[^/]+(/.*)?$", r"/works/\1/[name]"),
+    (
+        # The work id, which may be preceded by its identifier type...
+        r"/works/(?!contributor/|series/)[^/]+(?:/[^/]+)??"
+        # ...followed by one of the actions on a work, or by the end of the path.
+        r"(?=/(?:borrow|fulfill|annotations|related_books|recommendations|report)"
+        r"(?:/|$)|/?$)",
+        r"/works/[work]",
+    ),
+    (r"/(loans|annotations)/[^/]+", r"/\1/[id]"),
+    (r"/[0-9]+(?=/|$)", r"/[id]"),
+    (r"/[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}(?=/|$)", r"/[id]"),
+]
+
+
+class CMRequestNamer:
+    """
+    Turns request URLs into a bounded set of endpoint names for the Locust
+    statistics, so that each lane, book, search query, and page does not get a row
+    of its own. The library identifier at the start of a path becomes '[library]',
+    each rule replaces matches of its pattern in the path, and the values of query
+    parameters become '*' unless they are listed in 'query_values'. Query parameters
+    are sorted, so that later pages of results are named apart from the first. The
+    scheme and host are dropped for URLs on the base host.
+    """
+
+    def __init__(
+        self,
+        base: str,
+        libraries: Iterable[str],
+        rules: Iterable[Tuple[str, str]],
+        query_values: Set[str],
+        cache_size: int = 10000,
+    ):
+        self.host = urlsplit(base).netloc
+        self.query_values = query_values
+        self.cache_size = cache_size
+        self._cache: Dict[str, str] = {}
+        self._rules: List[Tuple[Pattern, str]] = []
+
+        identifiers = sorted(libraries, key=len, reverse=True)
+        if identifiers:
+            alternatives = "|".join(re.escape(identifier) for identifier in identifiers)
+            self._rules.append(
+                (re.compile(f"^/(?:{alternatives})(?=/|$)"), "/[library]")
+            )
+        for pattern, replacement in rules:
+            self._rules.append((re.compile(pattern), replacement))
+
+    def name(self, url: str) -> str:
+        name = self._cache.get(url)
+        if name is not None:
+            return name
+
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        for pattern, replacement in self._rules:
+            path = pattern.sub(replacement, path)
+
+        name = path
+        if parts.query:
+            parameters = sorted(
+                f"{key}={value if key in self.query_values else '*'}"
+                for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            )
+            name = f"{path}?{'&'.join(parameters)}"
+        if parts.netloc and parts.netloc != self.host:
+            name = f"{parts.netloc}{name}"
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[url] = name
+        return name
+
+    @staticmethod
+    def create(config: CMConfiguration) -> "CMRequestNamer":
+        names: CMRequestNamesConfiguration = config.request_names
+        rules = [(rule.pattern, rule.replacement) for rule in names.rules]
+        if names.default_rules:
+            rules.extend(DEFAULT_RULES)
+        return CMRequestNamer(
+            config.address, config.library_identifiers, rules, names.query_values
+        )
+
+
+class CMRequestNames:
+    """The worker-wide request namer, created from the current configuration."""
+
+    _namer: Optional[CMRequestNamer] = None
+
+    @classmethod
+    def get(cls) -> CMRequestNamer:
+        if cls._namer is None:
+            cls._namer = CMRequestNamer.create(Configurations.get().circulation_manager)
+        return cls._namer
+
+    @classmethod
+    def name(cls, url: str) -> str:
+        """The name under which a request for the given URL is reported."""
+        return cls.get().name(url)
+
+    @classmethod
+    def clear(cls):
+        cls._namer = None
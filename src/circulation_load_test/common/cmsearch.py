@@ -1,67 +1,143 @@
 import logging
-from typing import Optional
+import time
+from typing import Any, Optional, Tuple
 
-import atoma
-from atoma.atom import AtomFeed
+import gevent
 
+from circulation_load_test.common.cminstrumentation import CMInstrumentations
+from circulation_load_test.common.cmopds import CMOPDSFeed, CMOPDSParser
+from circulation_load_test.common.cmopensearch import (
+    CMOpenSearchTemplate,
+    CMSearchTemplates,
+)
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmterms import CMAliasSampler
 from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.cmworkload import CMThinkTime
+from circulation_load_test.common.config import CMSearchPaginationConfiguration
 from circulation_load_test.common.words import Words
 
+# Pages at this index or deeper are reported together in the page statistics.
+PAGE_STATS_LIMIT = 20
+
+
+class CMSearchDepth:
+    """
+    Draws the number of result pages that a patron reads: the n-th depth weight is
+    the relative frequency with which exactly n pages are read. With no weights,
+    every page is read. The depth is never more than 'maximum_pages'.
+    """
+
+    def __init__(self, config: CMSearchPaginationConfiguration):
+        self.config = config
+        self._sampler = (
+            CMAliasSampler.create(config.depth_weights)
+            if config.depth_weights
+            else None
+        )
+
+    def __call__(self) -> Optional[int]:
+        depth = self._sampler.sample() + 1 if self._sampler is not None else None
+        maximum = self.config.maximum_pages
+        if maximum is None:
+            return depth
+        return maximum if depth is None else min(depth, maximum)
+
 
 class CMSearch:
-    """A class to walk through search results."""
+    """
+    A class to walk through search results. The number of pages read is drawn from the
+    configured page depth distribution, and the patron looks at each page for the
+    'page_think_time' before moving on. With 'prefetch', the next page is requested as
+    soon as its link is known, while the current page is processed and looked at, as the
+    apps do when a patron scrolls. With 'page_stats', the response time of each page is
+    also reported to Locust as a "search_page" request named after its index, since deep
+    pages are where search backends slow down.
+    """
 
-    def __init__(self, search: str):
-        assert isinstance(search, str)
+    def __init__(
+        self,
+        search: CMOpenSearchTemplate,
+        pagination: Optional[CMSearchPaginationConfiguration] = None,
+    ):
+        assert isinstance(search, CMOpenSearchTemplate)
         self.search = search
+        self.pagination = pagination or CMSearchPaginationConfiguration()
+        self.depth = CMSearchDepth(self.pagination)
+        self.page_think_time = CMThinkTime(self.pagination.page_think_time)
+        self.pages = 0
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def execute(self, user: CMHTTPUser):
         """Search, and walk through the results."""
         term = Words.get()
-        query = f"{self.search}&q={term}"
+        query = self.search.expand(term)
         self.logger.info(f"search {query}")
 
-        response = user.client.get(query)
-        response.raise_for_status()
-
+        depth = self.depth()
+        self.pages = 0
+        response, measurement = self._fetch(user, query, 1)
         content_type = response.headers.get("content-type")
         self.logger.info(f"{content_type}")
-        if content_type.startswith("application/atom+xml"):
-            return self._handle_atom_feed(user, response)
-
-    def _handle_atom_feed(self, user: CMHTTPUser, response):
-        feed = atoma.parse_atom_bytes(response.text.encode("utf-8"))
-        current = feed
-        while True:
-            self.logger.info(f"current {feed.id_}")
-            current = self._process_atom_feed(user, current)
-            if not current:
-                break
+        if not content_type.startswith("application/atom+xml"):
+            return
 
-        self.logger.info(f"finished")
+        pending: Optional[gevent.Greenlet] = None
+        try:
+            while True:
+                feed = self._parse(response.content)
+                measurement.parsed()
+                self.pages += 1
+                link = feed.link("next")
+                more = link is not None and (depth is None or self.pages < depth)
+                if more and self.pagination.prefetch:
+                    pending = gevent.spawn(self._fetch, user, link.href, self.pages + 1)
+                    # Yield, so that the request is sent before the page is processed.
+                    gevent.sleep(0)
+
+                self.logger.info(f"current {feed.id}")
+                measurement.finish()
+                if not more:
+                    break
 
-    def _process_atom_feed(
-        self, user: CMHTTPUser, feed: AtomFeed
-    ) -> Optional[AtomFeed]:
-        for link in feed.links:
-            if link.rel == "next":
+                gevent.sleep(self.page_think_time())
                 self.logger.info(f"next {link.href}")
-                response_next = user.client.get(link.href)
-                response_next.raise_for_status()
-                return atoma.parse_atom_bytes(response_next.text.encode("utf-8"))
-        return None
+                if pending is not None:
+                    response, measurement = pending.get()
+                    pending = None
+                    measurement.resume()
+                else:
+                    response, measurement = self._fetch(user, link.href, self.pages + 1)
+        finally:
+            if pending is not None:
+                pending.kill()
 
-    @classmethod
-    def find_search_link(cls, user: CMHTTPUser, url: str) -> Optional[str]:
-        response = user.client.get(url)
-        response.raise_for_status()
+        self.logger.info(f"finished")
 
-        content_type = response.headers.get("content-type")
-        if content_type.startswith("application/atom+xml"):
-            feed = atoma.parse_atom_bytes(response.text.encode("utf-8"))
-            for link in feed.links:
-                if link.rel == "search":
-                    return link.href
+    def _fetch(self, user: CMHTTPUser, url: str, page: int) -> Tuple[Any, Any]:
+        measurement = CMInstrumentations.measure(user, "search")
+        start = time.perf_counter()
+        response = user.conditional_get(url, name=CMRequestNames.name(url))
+        response_time = (time.perf_counter() - start) * 1000.0
+        user.raise_for_status(response)
+        measurement.received(response)
 
-        return None
+        if self.pagination.page_stats:
+            name = str(page) if page < PAGE_STATS_LIMIT else f"{PAGE_STATS_LIMIT}+"
+            user.environment.events.request.fire(
+                request_type="search_page",
+                name=name,
+                response_time=response_time,
+                response_length=len(response.content or b""),
+                exception=None,
+                context={},
+            )
+        return response, measurement
+
+    @staticmethod
+    def _parse(data: bytes) -> CMOPDSFeed:
+        return CMOPDSParser.parse(data, feed_rels={"next"}, entry_rels=())
+
+    @classmethod
+    def find_search_link(cls, user: CMHTTPUser, url: str) -> Optional[str]:
+        return CMSearchTemplates.find_search_link(user, url)
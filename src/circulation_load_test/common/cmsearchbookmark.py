@@ -1,23 +1,26 @@
-import json
 import logging
-import time
-import uuid
 from dataclasses import dataclass
-from typing import Optional
-
-import atoma
-from atoma.atom import AtomFeed
-
-from circulation_load_test.common.cmbookmarks import (
-    CMBookmark,
-    CMBookmarkBody,
-    CMBookmarkTarget,
-    CMLocatorPage,
-    CMMotivation,
+from typing import Optional, Union
+
+from circulation_load_test.common.cmbookmarkwriter import CMBookmarkWriter
+from circulation_load_test.common.cmcatalog import CMCatalogLibrary
+from circulation_load_test.common.cminstrumentation import CMInstrumentations
+from circulation_load_test.common.cmloanpool import CMLoan, CMLoanPools
+from circulation_load_test.common.cmopds import CMOPDSFeed, CMOPDSParser
+from circulation_load_test.common.cmopensearch import (
+    CMOpenSearchTemplate,
+    CMSearchTemplates,
 )
+from circulation_load_test.common.cmreadingsync import CMReadingSync
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmshard import CMShards
 from circulation_load_test.common.cmuser import CMAuthenticationLinkType, CMHTTPUser
 from circulation_load_test.common.words import Words
 
+REL_BORROW = "http://opds-spec.org/acquisition/borrow"
+REL_REVOKE = "http://librarysimplified.org/terms/rel/revoke"
+REL_ANNOTATION_SERVICE = "http://www.w3.org/ns/oa#annotationService"
+
 
 @dataclass
 class CMBook:
@@ -30,58 +33,146 @@ class CMBook:
 @dataclass
 class CMSearchAndBookmarkResults:
     book: Optional[CMBook]
-    next_feed: Optional[AtomFeed]
+    next_feed: Optional[CMOPDSFeed]
 
 
 class CMSearchAndBookmark:
     """Search for a book that we can borrow, and read/write bookmarks for it."""
 
-    def __init__(self, search: str):
-        assert isinstance(search, str)
+    def __init__(
+        self,
+        search: CMOpenSearchTemplate,
+        writer: Optional[Union[CMBookmarkWriter, CMReadingSync]] = None,
+        books: Optional[CMCatalogLibrary] = None,
+        root: Optional[str] = None,
+    ):
+        """
+        The 'writer' writes the annotations for the borrowed book: a burst of
+        bookmarks, or a simulated reading session. If 'books' is given, books are
+        chosen from that catalog index (resolving its links against the catalog
+        'root') instead of being found by searching.
+        """
+        assert isinstance(search, CMOpenSearchTemplate)
+        assert books is None or root is not None
         self.search = search
+        self.writer = writer or CMBookmarkWriter()
+        self.books = books
+        self.root = root
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def execute(self, user: CMHTTPUser):
         """Search, and walk through the results."""
+        pool = CMLoanPools.get()
+        if pool is None:
+            return self._process_book(user, self._find_book_repeatedly(user))
+
+        patron = user.patron.name
+        loan = pool.checkout(patron)
+        if loan is None:
+            loan = self.create_loan(user)
+
+        try:
+            self._process_book_write_bookmarks(user, loan)
+        except Exception:
+            self.revoke(user, loan.revoke_link)
+            raise
+
+        pool.checkin(patron, loan)
+        for retired in pool.retired(patron):
+            self.revoke(user, retired.revoke_link)
+
+    def _find_book_repeatedly(self, user: CMHTTPUser) -> CMBook:
+        if self.books is not None and len(self.books) > 0:
+            assert self.root is not None
+            entry = self.books.random(self.root)
+            self.logger.info(f"chose indexed book {entry.book_id}")
+            return CMBook(
+                borrow_link=entry.borrow_link,
+                book_id=entry.book_id,
+                revoke_link=None,
+                annotations_link=None,
+            )
+
         for attempt in range(1, 100):
             book = self._find_book(user)
             if book is not None:
-                return self._process_book(user, book)
+                return book
 
         raise Exception("Unable to find a suitable book to bookmark.")
 
+    def create_loan(self, user: CMHTTPUser) -> CMLoan:
+        """Find a book, borrow it, and find the annotation service for the loan."""
+        book = self._find_book_repeatedly(user)
+        self._process_book_create_loan(user, book)
+        if book.annotations_link is None:
+            self.revoke(user, book.revoke_link)
+            raise ValueError("The loans feed does not link to an annotation service.")
+        return CMLoan(
+            book_id=book.book_id,
+            revoke_link=book.revoke_link,
+            annotations_link=book.annotations_link,
+            uses=1,
+        )
+
     def _process_book(self, user: CMHTTPUser, book: CMBook):
         self._process_book_create_loan(user, book)
 
         try:
             self._process_book_write_bookmarks(user, book)
         finally:
-            self._process_book_revoke(user, book)
+            self.revoke(user, book.revoke_link)
 
-    def _process_book_revoke(self, user: CMHTTPUser, book: CMBook):
-        if book.revoke_link is None:
+    @classmethod
+    def revoke(cls, user: CMHTTPUser, revoke_link: Optional[str]):
+        """Return a loan, if it has a revocation link."""
+        if revoke_link is None:
             return
 
-        self.logger.info(f"revoking loan {book.revoke_link}")
+        logging.getLogger(cls.__name__).info(f"revoking loan {revoke_link}")
         response0 = user.client.get(
-            book.revoke_link, headers=user.authentication.headers_required()
+            revoke_link,
+            headers=user.authentication.headers_required(),
+            name=CMRequestNames.name(revoke_link),
         )
-        response0.raise_for_status()
+        user.raise_for_status(response0)
+
+    @classmethod
+    def revoke_pooled_loans(cls, user: CMHTTPUser):
+        """Revoke all of the pooled loans of the user's patron."""
+        pool = CMLoanPools.get()
+        if pool is None or user.auth_document is None:
+            return
+
+        for loan in pool.drain(user.patron.name):
+            try:
+                cls.revoke(user, loan.revoke_link)
+            except Exception as e:
+                logging.getLogger(cls.__name__).warning(
+                    f"unable to revoke {loan.revoke_link}: {e}"
+                )
 
     def _process_book_create_loan(self, user: CMHTTPUser, book: CMBook):
         self.logger.info(f"loan {book.borrow_link}")
 
         # Hit the borrow link. The server will return an OPDS feed entry containing that book.
         headers = user.authentication.headers_required()
-        response0 = user.client.get(book.borrow_link, headers=headers)
-        response0.raise_for_status()
+        response0 = user.client.get(
+            book.borrow_link,
+            headers=headers,
+            name=CMRequestNames.name(book.borrow_link),
+        )
+        user.raise_for_status(response0)
 
         # Find the revocation link so that we can clean up the loan at the end of the test.
-        book_entry = atoma.parse_atom_bytes(bytes(response0.text, "utf-8"))
-        for link in book_entry.links:
-            if link.rel == "http://librarysimplified.org/terms/rel/revoke":
-                self.logger.info(f"found revocation link {link.href}")
-                book.revoke_link = link.href
+        book_entry = CMOPDSParser.parse(
+            response0.content, feed_rels={REL_REVOKE}, entry_rels={REL_REVOKE}
+        )
+        revoke_links = list(book_entry.links)
+        for entry in book_entry.entries:
+            revoke_links.extend(entry.links)
+        for link in revoke_links:
+            self.logger.info(f"found revocation link {link.href}")
+            book.revoke_link = link.href
 
         if not book.revoke_link:
             self.logger.warn("could not find a revocation link for the loan")
@@ -90,68 +181,49 @@ class CMSearchAndBookmark:
         auth = user.auth_document
         assert auth
         shelf = auth.links.get(CMAuthenticationLinkType.SHELF)
-        response1 = user.client.get(shelf, headers=headers)
-        response1.raise_for_status()
-
-        loans_feed = atoma.parse_atom_bytes(bytes(response1.text, "utf-8"))
-        for link in loans_feed.links:
-            if link.rel == "http://www.w3.org/ns/oa#annotationService":
-                book.annotations_link = link.href
-
-    def _process_book_write_bookmarks(self, user: CMHTTPUser, book: CMBook):
-        bookmark_id = uuid.uuid4()
-        source = uuid.uuid4()
-        device = uuid.uuid4()
-
-        post_headers = {}
-        post_headers[
-            "content-type"
-        ] = 'application/ld+json; profile="http://www.w3.org/ns/anno.jsonld"'
-        for key, value in user.authentication.headers_required().items():
-            post_headers[key] = value
-
-        self.logger.info("writing lots of bookmarks")
-        for write in range(1, 100):
-            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
-            bookmark = CMBookmark(
-                id=str(bookmark_id),
-                target=CMBookmarkTarget(
-                    locator=CMLocatorPage(write), source=book.book_id
-                ),
-                motivation=CMMotivation.BOOKMARKING,
-                body=CMBookmarkBody(device_id=str(device), time=timestamp, others={}),
-            )
+        response1 = user.client.get(
+            shelf, headers=headers, name=CMRequestNames.name(shelf)
+        )
+        user.raise_for_status(response1)
 
-            response = user.client.post(
-                book.annotations_link,
-                data=json.dumps(bookmark.to_json_dict()),
-                headers=post_headers,
-            )
+        loans_feed = CMOPDSParser.parse(
+            response1.content, feed_rels={REL_ANNOTATION_SERVICE}, entry_rels=()
+        )
+        annotation_service = loans_feed.link(REL_ANNOTATION_SERVICE)
+        if annotation_service:
+            book.annotations_link = annotation_service.href
 
-            if response.status_code >= 400:
-                self.logger.error(f"{response.text}")
-                response.raise_for_status()
+    def _process_book_write_bookmarks(
+        self, user: CMHTTPUser, book: Union[CMBook, CMLoan]
+    ):
+        if book.annotations_link is None:
+            raise ValueError("The loans feed does not link to an annotation service.")
+        self.writer.execute(user, book.annotations_link, book.book_id)
 
     def _find_book(self, user: CMHTTPUser) -> Optional[CMBook]:
         term = Words.get()
-        query = f"{self.search}&q={term}"
+        query = self.search.expand(term)
         self.logger.info(f"search {query}")
 
-        response = user.client.get(query)
-        response.raise_for_status()
+        measurement = CMInstrumentations.measure(user, "book_search")
+        response = user.conditional_get(query, name=CMRequestNames.name(query))
+        user.raise_for_status(response)
+        measurement.received(response)
 
         content_type = response.headers.get("content-type")
         self.logger.info(f"{content_type}")
         if content_type.startswith("application/atom+xml"):
-            return self._handle_atom_feed(user, response)
+            feed = self._parse(response.content)
+            measurement.parsed()
+            measurement.finish()
+            return self._handle_atom_feed(user, feed)
 
         return None
 
-    def _handle_atom_feed(self, user: CMHTTPUser, response) -> Optional[CMBook]:
-        feed = atoma.parse_atom_bytes(response.text.encode("utf-8"))
+    def _handle_atom_feed(self, user: CMHTTPUser, feed: CMOPDSFeed) -> Optional[CMBook]:
         current = feed
         while True:
-            self.logger.info(f"current {feed.id_}")
+            self.logger.info(f"current {current.id}")
             search_results = self._process_atom_feed(user, current)
             if search_results.book is not None:
                 self.logger.info(f"found a book: {search_results.book.borrow_link}")
@@ -162,47 +234,48 @@ class CMSearchAndBookmark:
             current = search_results.next_feed
         return None
 
+    @staticmethod
+    def _parse(data: bytes) -> CMOPDSFeed:
+        return CMOPDSParser.parse(data, feed_rels={"next"}, entry_rels={REL_BORROW})
+
     def _process_atom_feed(
-        self, user: CMHTTPUser, feed: AtomFeed
+        self, user: CMHTTPUser, feed: CMOPDSFeed
     ) -> CMSearchAndBookmarkResults:
+        # Only books in this worker's shard are borrowed, so that the workers of a
+        # distributed test do not compete for the same licenses.
+        shard = CMShards.get()
         for entry in feed.entries:
             for link in entry.links:
-                if link.rel == "http://opds-spec.org/acquisition/borrow":
-                    self.logger.info(f"found borrowable book {entry.id_}")
-                    return CMSearchAndBookmarkResults(
-                        book=CMBook(
-                            borrow_link=link.href,
-                            book_id=entry.id_,
-                            revoke_link=None,
-                            annotations_link=None,
-                        ),
-                        next_feed=None,
-                    )
-
-        for link in feed.links:
-            if link.rel == "next":
-                self.logger.info(f"next {link.href}")
-                response_next = user.client.get(link.href)
-                response_next.raise_for_status()
+                book_id = entry.id or link.href
+                if not shard.owns(book_id):
+                    continue
+                self.logger.info(f"found borrowable book {entry.id}")
                 return CMSearchAndBookmarkResults(
-                    book=None,
-                    next_feed=atoma.parse_atom_bytes(
-                        response_next.text.encode("utf-8")
+                    book=CMBook(
+                        borrow_link=link.href,
+                        book_id=book_id,
+                        revoke_link=None,
+                        annotations_link=None,
                     ),
+                    next_feed=None,
                 )
 
+        link = feed.link("next")
+        if link:
+            self.logger.info(f"next {link.href}")
+            measurement = CMInstrumentations.measure(user, "book_search")
+            response_next = user.conditional_get(
+                link.href, name=CMRequestNames.name(link.href)
+            )
+            user.raise_for_status(response_next)
+            measurement.received(response_next)
+            next_feed = self._parse(response_next.content)
+            measurement.parsed()
+            measurement.finish()
+            return CMSearchAndBookmarkResults(book=None, next_feed=next_feed)
+
         return CMSearchAndBookmarkResults(book=None, next_feed=None)
 
     @classmethod
     def find_search_link(cls, user: CMHTTPUser, url: str) -> Optional[str]:
-        response = user.client.get(url)
-        response.raise_for_status()
-
-        content_type = response.headers.get("content-type")
-        if content_type.startswith("application/atom+xml"):
-            feed = atoma.parse_atom_bytes(response.text.encode("utf-8"))
-            for link in feed.links:
-                if link.rel == "search":
-                    return link.href
-
-        return None
+        return CMSearchTemplates.find_search_link(user, url)
@@ -0,0 +1,49 @@
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from circulation_load_test.common.cmuser import (
+        CMAuthDocument,
+        CMAuthentication,
+        CMPatronUserProfile,
+    )
+
+
+@dataclass
+class CMSession:
+    """The state produced by a successful login."""
+
+    auth_document: "CMAuthDocument"
+    authentication: Optional["CMAuthentication"]
+    user_profile: Optional["CMPatronUserProfile"]
+    created: float = field(default_factory=time.monotonic)
+
+
+class CMSessionCache:
+    """
+    A per-user cache of the most recent login session. Sessions expire after a
+    configurable time-to-live, and can be explicitly invalidated (for example, when
+    the CM rejects the cached credentials).
+    """
+
+    def __init__(self, ttl: float):
+        assert isinstance(ttl, (int, float))
+        self.ttl = ttl
+        self._session: Optional[CMSession] = None
+
+    def get(self) -> Optional[CMSession]:
+        session = self._session
+        if session is None:
+            return None
+        if time.monotonic() - session.created >= self.ttl:
+            self._session = None
+            return None
+        return session
+
+    def put(self, session: CMSession):
+        assert isinstance(session, CMSession)
+        self._session = session
+
+    def invalidate(self):
+        self._session = None
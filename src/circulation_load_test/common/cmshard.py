@@ -0,0 +1,91 @@
+import zlib
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, TypeVar
+
+from circulation_load_test.common.config import Configurations
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CMShard:
+    """
+    One of 'count' disjoint slices of the patrons, libraries, and books used by a
+    test. In a distributed test, each worker is given its own shard; otherwise the
+    single shard holds everything.
+    """
+
+    index: int = 0
+    count: int = 1
+
+    def __post_init__(self):
+        if not isinstance(self.count, int) or self.count < 1:
+            raise ValueError(
+                "'count' must be a positive integer (got " + str(self.count) + ")"
+            )
+        if not isinstance(self.index, int) or not 0 <= self.index < self.count:
+            raise ValueError(
+                "'index' must be in [0, count) (got " + str(self.index) + ")"
+            )
+
+    def size(self, total: int) -> int:
+        """The number of the items 0 .. total - 1 that belong to this shard."""
+        return max(0, (total - self.index + self.count - 1) // self.count)
+
+    def item(self, position: int) -> int:
+        """The index of the given item of this shard among all of the items."""
+        return self.index + position * self.count
+
+    def select(self, items: Sequence[T]) -> Sequence[T]:
+        return items[self.index :: self.count]
+
+    def owns(self, key: str) -> bool:
+        """Whether the item with the given key, such as a book id, is in this shard."""
+        if self.count == 1:
+            return True
+        return zlib.crc32(key.encode("utf-8")) % self.count == self.index
+
+    def to_json_dict(self) -> dict:
+        return {"index": self.index, "count": self.count}
+
+    @staticmethod
+    def parse(data: dict) -> "CMShard":
+        return CMShard(data.get("index", 0), data.get("count", 1))
+
+
+class CMShards:
+    """The shard of this worker, as assigned by the master."""
+
+    _shard: CMShard = CMShard()
+    _libraries: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def get(cls) -> CMShard:
+        return cls._shard
+
+    @classmethod
+    def set(cls, shard: CMShard):
+        assert isinstance(shard, CMShard)
+        cls._shard = shard
+        cls._libraries = None
+
+    @classmethod
+    def libraries(cls) -> Tuple[str, ...]:
+        """
+        The configured library identifiers in this shard. If there are fewer
+        libraries than shards, shards share libraries.
+        """
+        if cls._libraries is None:
+            identifiers = sorted(
+                Configurations.get().circulation_manager.library_identifiers
+            )
+            selected = tuple(cls._shard.select(identifiers))
+            if not selected and identifiers:
+                selected = (identifiers[cls._shard.index % len(identifiers)],)
+            cls._libraries = selected
+        return cls._libraries
+
+    @classmethod
+    def clear(cls):
+        cls._shard = CMShard()
+        cls._libraries = None
@@ -0,0 +1,317 @@
+import random
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Union, overload
+
+from circulation_load_test.common.config import CMQueryShape, CMSearchTermsConfiguration
+
+_MAGIC = b"CMTERMS\x00"
+_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+
+# The generator used when callers do not supply their own.
+_RANDOM = random.Random()
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class CMAliasSampler:
+    """
+    Samples indices in proportion to the given weights in constant time, using
+    Vose's alias method. The tables take linear time to build, and can be saved and
+    restored with 'probabilities' and 'aliases'.
+    """
+
+    def __init__(self, probabilities: array, aliases: array):
+        assert len(probabilities) == len(aliases) > 0
+        self.probabilities = probabilities
+        self.aliases = aliases
+        self._size = len(probabilities)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def sample(self, generator: random.Random = _RANDOM) -> int:
+        position = generator.random() * self._size
+        index = int(position)
+        if position - index < self.probabilities[index]:
+            return index
+        return self.aliases[index]
+
+    @staticmethod
+    def create(weights: Sequence[float]) -> "CMAliasSampler":
+        size = len(weights)
+        if size == 0:
+            raise ValueError("Cannot sample from an empty set of weights")
+        total = float(sum(weights))
+        if total <= 0 or any(weight < 0 for weight in weights):
+            raise ValueError("Weights must be non-negative, with a positive total")
+
+        probabilities = array("d", [0.0]) * size
+        aliases = array("I", [0]) * size
+        scaled = [weight * size / total for weight in weights]
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        for index in large + small:
+            probabilities[index] = 1.0
+            aliases[index] = index
+        return CMAliasSampler(probabilities, aliases)
+
+
+def zipf_weights(frequencies: Sequence[float], exponent: float) -> List[float]:
+    """
+    Replace the given frequencies with a Zipf distribution over their ranks: the
+    term with the n-th highest frequency gets weight 1/n^exponent. Ties keep their
+    original order. An exponent of 0 gives a uniform distribution.
+    """
+    order = sorted(range(len(frequencies)), key=lambda index: -frequencies[index])
+    weights = [0.0] * len(frequencies)
+    for rank, index in enumerate(order, start=1):
+        weights[index] = 1.0 / rank**exponent
+    return weights
+
+
+class CMTermTable(Sequence[str]):
+    """
+    The terms of a corpus, held as one UTF-8 buffer and an array of offsets into it
+    rather than as a list of strings. This takes a fraction of the memory, and holds
+    no objects whose reference counts change when terms are sampled, so a table that
+    is loaded before Locust forks its worker processes stays shared between them.
+    """
+
+    def __init__(self, data: bytes, offsets: array):
+        assert len(offsets) >= 1 and offsets[-1] == len(data)
+        self.data = data
+        self.offsets = offsets
+        self._size = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @overload
+    def __getitem__(self, index: int) -> str:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[str]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("term index out of range")
+        start = self.offsets[index]
+        return self.data[start : self.offsets[index + 1]].decode("utf-8")
+
+    @staticmethod
+    def create(terms: Sequence[str]) -> "CMTermTable":
+        text = "".join(terms)
+        if text.isascii():
+            data = text.encode("ascii")
+            lengths = [len(term) for term in terms]
+        else:
+            encoded = [term.encode("utf-8") for term in terms]
+            data = b"".join(encoded)
+            lengths = [len(term) for term in encoded]
+        offsets = array("I", [0])
+        offsets.extend(accumulate(lengths))
+        return CMTermTable(data, offsets)
+
+
+class CMTermCorpus:
+    """
+    A weighted corpus of search terms. A corpus is read from a text file with one
+    term per line, optionally followed by a tab and the term's frequency (terms
+    without a frequency have frequency 1), or from a binary file written by
+    'compile', which also holds the precomputed sampling tables. Blank lines and
+    lines starting with '#' are ignored.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        frequencies: Sequence[float],
+        sampler: Optional[CMAliasSampler] = None,
+    ):
+        assert len(terms) == len(frequencies)
+        self.terms = terms
+        self.frequencies = frequencies
+        self.sampler = sampler or CMAliasSampler.create(frequencies)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def sample(self, generator: random.Random = _RANDOM) -> str:
+        return self.terms[self.sampler.sample(generator)]
+
+    def with_zipf(self, exponent: float) -> "CMTermCorpus":
+        """Return this corpus with its frequencies replaced by a Zipf distribution."""
+        weights = zipf_weights(self.frequencies, exponent)
+        return CMTermCorpus(self.terms, array("d", weights))
+
+    @staticmethod
+    def parse_text(lines: Sequence[str]) -> "CMTermCorpus":
+        terms: List[str] = []
+        frequencies = array("d")
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            term, separator, frequency = line.partition("\t")
+            term = term.strip()
+            if not term:
+                continue
+            try:
+                value = float(frequency) if separator else 1.0
+            except ValueError:
+                raise ValueError(f"Malformed term frequency: {line}")
+            if value < 0:
+                raise ValueError(f"Negative term frequency: {line}")
+            terms.append(term)
+            frequencies.append(value)
+        return CMTermCorpus(CMTermTable.create(terms), frequencies)
+
+    @staticmethod
+    def load(path: str) -> "CMTermCorpus":
+        with open(path, "rb") as f:
+            data = f.read()
+        if data.startswith(_MAGIC):
+            return CMTermCorpus._parse_binary(data, path)
+        return CMTermCorpus.parse_text(data.decode("utf-8").splitlines())
+
+    def compile(self, path: str):
+        """Write this corpus, and its sampling tables, in the binary format."""
+        table = self.terms
+        if not isinstance(table, CMTermTable):
+            table = CMTermTable.create(table)
+        with open(path, "wb") as f:
+            f.write(_PREAMBLE.pack(_MAGIC, _VERSION, len(self.terms)))
+            f.write(_little_endian(array("d", self.frequencies)))
+            f.write(_little_endian(self.sampler.probabilities))
+            f.write(_little_endian(self.sampler.aliases))
+            f.write(_little_endian(table.offsets))
+            f.write(table.data)
+
+    @staticmethod
+    def _parse_binary(data: bytes, path: str) -> "CMTermCorpus":
+        try:
+            magic, version, count = _PREAMBLE.unpack_from(data, 0)
+        except struct.error as e:
+            raise ValueError(f"Unable to read term corpus {path}: {e}") from e
+        if version != _VERSION:
+            raise ValueError(f"Unsupported term corpus version {version} in {path}")
+
+        position = _PREAMBLE.size
+        sections: Dict[str, array] = {}
+        for name, typecode, size in [
+            ("frequencies", "d", count),
+            ("probabilities", "d", count),
+            ("aliases", "I", count),
+            ("offsets", "I", count + 1),
+        ]:
+            length = array(typecode).itemsize * size
+            if position + length > len(data):
+                raise ValueError(f"Truncated term corpus {path}")
+            sections[name] = _from_little_endian(
+                typecode, data[position : position + length]
+            )
+            position += length
+
+        offsets = sections["offsets"]
+        if offsets[-1] != len(data) - position:
+            raise ValueError(f"Truncated term corpus {path}")
+        try:
+            data[position:].decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Unable to read term corpus {path}: {e}") from e
+        terms = CMTermTable(data[position:], offsets)
+        sampler = CMAliasSampler(sections["probabilities"], sections["aliases"])
+        return CMTermCorpus(terms, sections["frequencies"], sampler)
+
+
+class CMQueryGenerator:
+    """
+    Generates search queries of the configured shapes: single terms, several terms
+    drawn independently from the corpus, author names, or titles.
+    """
+
+    def __init__(
+        self,
+        words: CMTermCorpus,
+        shapes: Dict[CMQueryShape, float],
+        multiword_terms: int = 3,
+        authors: Optional[CMTermCorpus] = None,
+        titles: Optional[CMTermCorpus] = None,
+    ):
+        assert multiword_terms >= 2
+        self.words = words
+        self.multiword_terms = multiword_terms
+        self.corpora = {
+            CMQueryShape.AUTHOR: authors,
+            CMQueryShape.TITLE: titles,
+        }
+        self.shapes = [shape for shape, weight in shapes.items() if weight > 0]
+        for shape in self.shapes:
+            if shape in self.corpora and self.corpora[shape] is None:
+                raise ValueError(f"Query shape '{shape.value}' requires a corpus")
+        self._shape_sampler = CMAliasSampler.create(
+            [shapes[shape] for shape in self.shapes]
+        )
+
+    def query(self, generator: random.Random = _RANDOM) -> str:
+        shape = self.shapes[self._shape_sampler.sample(generator)]
+        if shape == CMQueryShape.WORD:
+            return self.words.sample(generator)
+        if shape == CMQueryShape.MULTIWORD:
+            count = generator.randint(2, self.multiword_terms)
+            return " ".join(self.words.sample(generator) for _ in range(count))
+        corpus = self.corpora[shape]
+        assert corpus is not None
+        return corpus.sample(generator)
+
+    @staticmethod
+    def create(
+        config: CMSearchTermsConfiguration, default_corpus: str
+    ) -> "CMQueryGenerator":
+        def load(path: Optional[str]) -> Optional[CMTermCorpus]:
+            if path is None:
+                return None
+            corpus = CMTermCorpus.load(path)
+            if config.zipf_exponent is not None:
+                corpus = corpus.with_zipf(config.zipf_exponent)
+            return corpus
+
+        words = load(config.corpus or default_corpus)
+        assert words is not None
+        return CMQueryGenerator(
+            words,
+            config.shapes,
+            config.multiword_terms,
+            authors=load(config.authors),
+            titles=load(config.titles),
+        )
@@ -8,7 +8,12 @@ from typing import Any, Mapping, Optional
 from locust import FastHttpUser
 from locust.env import Environment
 
-from circulation_load_test.common.config import Configurations
+from circulation_load_test.common.cmconnection import CMHTTPClientPool
+from circulation_load_test.common.cmhttpcache import CMHTTPCache, CMHTTPCaches
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmsession import CMSession, CMSessionCache
+from circulation_load_test.common.cmuserpool import CMUserLease, CMUserPools
+from circulation_load_test.common.config import CMUser, Configurations
 
 REL_USER_PROFILE = "http://librarysimplified.org/terms/rel/user-profile"
 
@@ -47,17 +52,19 @@ class CMAuthenticationBasic(CMAuthentication):
         return f"Basic {token}"
 
     def authenticate(self, user: "CMHTTPUser"):
-        cm_config = Configurations.get().circulation_manager
-        cm_user = cm_config.user_primary()
+        cm_user = user.patron
 
         #
         # Fetch the user profile. This "logs in" by checking the credentials.
         #
         self.auth_header = self._basic_auth(cm_user.name, cm_user.password)
         headers0 = {"Authorization": self.auth_header}
-        response0 = user.client.get(self._user_profile_link, headers=headers0)
-        if response0.status_code >= 400:
-            response0.raise_for_status()
+        response0 = user.client.get(
+            self._user_profile_link,
+            headers=headers0,
+            name=CMRequestNames.name(self._user_profile_link),
+        )
+        user.raise_for_status(response0)
 
         #
         # Save the authentication scheme
@@ -68,24 +75,29 @@ class CMAuthenticationBasic(CMAuthentication):
         # Update the patron settings to enable annotations.
         #
         post_settings = {"settings": {"simplified:synchronize_annotations": True}}
-        post_data = json.dumps(post_settings)
+        post_data = json.dumps(post_settings).encode("utf-8")
         headers1 = {
             "Authorization": self.auth_header,
             "Content-Type": "vnd.librarysimplified/user-profile+json",
         }
         response1 = user.client.put(
-            self._user_profile_link, data=post_data, headers=headers1
+            self._user_profile_link,
+            data=post_data,
+            headers=headers1,
+            name=CMRequestNames.name(self._user_profile_link),
         )
-        if response1.status_code >= 400:
-            response1.raise_for_status()
+        user.raise_for_status(response1)
 
         #
         # Fetch the user profile again.
         #
         headers2 = {"Authorization": self.auth_header}
-        response2 = user.client.get(self._user_profile_link, headers=headers2)
-        if response2.status_code >= 400:
-            response2.raise_for_status()
+        response2 = user.client.get(
+            self._user_profile_link,
+            headers=headers2,
+            name=CMRequestNames.name(self._user_profile_link),
+        )
+        user.raise_for_status(response2)
 
         data = json.loads(response2.text)
         user.user_profile = CMPatronUserProfile(data)
@@ -149,13 +161,36 @@ class CMHTTPUser(FastHttpUser):
 
     auth_document: Optional[CMAuthDocument]
     user_profile: Optional[CMPatronUserProfile]
+    session_cache: CMSessionCache
+    http_cache: Optional[CMHTTPCache]
+    connections: Optional[CMHTTPClientPool]
     _authentication: Optional[CMAuthentication]
+    _patron_lease: Optional[CMUserLease]
 
     def __init__(self, environment: Environment):
+        config = Configurations.get().circulation_manager
+        self.concurrency = config.connections.pool_size
         super().__init__(environment=environment)
         self.auth_document = None
         self.user_profile = None
+        self.session_cache = CMSessionCache(config.session_ttl)
+        self.http_cache = CMHTTPCaches.for_user()
+        self.connections = CMHTTPClientPool.install(self, config.connections)
         self._authentication = None
+        self._patron_lease = None
+
+    @property
+    def patron(self) -> CMUser:
+        """The patron as which this user logs in, leased from the user pool."""
+        if self._patron_lease is None:
+            self._patron_lease = CMUserPools.get().lease()
+        return self._patron_lease.user
+
+    def on_stop(self):
+        if self._patron_lease is not None:
+            CMUserPools.get().release(self._patron_lease)
+            self._patron_lease = None
+            self.session_cache.invalidate()
 
     @property
     def authentication(self) -> CMAuthentication:
@@ -167,3 +202,39 @@ class CMHTTPUser(FastHttpUser):
     def authentication(self, value: CMAuthentication):
         assert value is not None
         self._authentication = value
+
+    def session_capture(self) -> CMSession:
+        """Capture the current login state of this user."""
+        assert self.auth_document is not None
+        return CMSession(
+            auth_document=self.auth_document,
+            authentication=self._authentication,
+            user_profile=self.user_profile,
+        )
+
+    def session_restore(self, session: CMSession):
+        """Restore a previously captured login state."""
+        self.auth_document = session.auth_document
+        self.user_profile = session.user_profile
+        self._authentication = session.authentication
+
+    def conditional_get(
+        self, url: str, name: str, headers: Optional[Mapping[str, str]] = None
+    ):
+        """
+        GET the given URL. If the HTTP cache is enabled, a cached copy of the response
+        is revalidated rather than downloaded again.
+        """
+        if self.http_cache is None:
+            return self.client.get(url, headers=headers, name=name)
+        return self.http_cache.get(self, url, name, headers)
+
+    def raise_for_status(self, response):
+        """
+        Raise an exception if the given response indicates an error. If the CM
+        rejected our credentials, the cached session is discarded so that the next
+        task logs in again.
+        """
+        if response.status_code == 401:
+            self.session_cache.invalidate()
+        response.raise_for_status()
@@ -0,0 +1,198 @@
+import csv
+import io
+import random
+from array import array
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Sequence
+
+from circulation_load_test.common.cmshard import CMShard, CMShards
+from circulation_load_test.common.config import (
+    CMConfiguration,
+    CMUser,
+    CMUserAssignmentPolicy,
+    Configurations,
+)
+
+
+class CMUserFile:
+    """
+    A file of patron credentials, one "username,password" row per patron. An optional
+    "username,password" header row is skipped. The file is not held in memory: the
+    first access scans it once to record the byte offset of each row, and rows are
+    then read on demand.
+    """
+
+    def __init__(self, path: str):
+        assert isinstance(path, str)
+        self.path = path
+        self._offsets: Optional[array] = None
+        self._file: Optional[BinaryIO] = None
+
+    def _index(self) -> array:
+        if self._offsets is not None:
+            return self._offsets
+
+        offsets = array("q")
+        with open(self.path, "rb") as f:
+            position = 0
+            first = True
+            for line in f:
+                row = line.strip()
+                if row and not row.startswith(b"#"):
+                    if not (first and row.lower() == b"username,password"):
+                        offsets.append(position)
+                    first = False
+                position += len(line)
+
+        self._offsets = offsets
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def get(self, index: int) -> CMUser:
+        offset = self._index()[index]
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        self._file.seek(offset)
+        line = self._file.readline().decode("utf-8")
+        row = next(csv.reader(io.StringIO(line)))
+        if len(row) < 2:
+            raise ValueError(f"{self.path}: malformed credentials row at {offset}")
+        return CMUser(row[0].strip(), row[1].strip(), False)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+@dataclass
+class CMUserLease:
+    index: int
+    user: CMUser
+
+
+class CMUserPool:
+    """
+    A pool of patrons from which each simulated user leases its credentials. The
+    pool is made up of the users declared inline in the configuration, followed by
+    the users in each configured credentials file. Only the patrons in the given
+    shard are leased, so that the workers of a distributed test use disjoint sets
+    of patrons. If there are fewer patrons than shards, shards share patrons.
+    """
+
+    def __init__(
+        self,
+        users: Sequence[CMUser],
+        files: Sequence[CMUserFile],
+        policy: CMUserAssignmentPolicy,
+        shard: CMShard = CMShard(),
+    ):
+        assert isinstance(policy, CMUserAssignmentPolicy)
+        self.policy = policy
+        self.shard = shard
+        self._users = list(users)
+        self._files = list(files)
+        self._next = 0
+        self._free: List[int] = []
+        self._leased = 0
+
+    def __len__(self) -> int:
+        """The number of patrons in this pool's shard."""
+        total = self.total
+        size = self.shard.size(total)
+        if size == 0 and total > 0:
+            return 1
+        return size
+
+    @property
+    def total(self) -> int:
+        """The number of patrons in all shards."""
+        return len(self._users) + sum(len(file) for file in self._files)
+
+    def get(self, index: int) -> CMUser:
+        """Get a patron by its index among the patrons of all shards."""
+        if index < len(self._users):
+            return self._users[index]
+        index -= len(self._users)
+        for file in self._files:
+            size = len(file)
+            if index < size:
+                return file.get(index)
+            index -= size
+        raise IndexError("User index out of range")
+
+    @property
+    def leased(self) -> int:
+        """The number of patrons currently leased exclusively."""
+        return self._leased
+
+    def lease(self) -> CMUserLease:
+        size = len(self)
+        if size == 0:
+            raise ValueError("No users defined!")
+
+        if self.policy == CMUserAssignmentPolicy.ROUND_ROBIN:
+            index = self._next % size
+            self._next += 1
+        elif self.policy == CMUserAssignmentPolicy.RANDOM:
+            index = random.randrange(size)
+        else:
+            if self._free:
+                index = self._free.pop()
+            elif self._next < size:
+                index = self._next
+                self._next += 1
+            else:
+                raise ValueError(f"All {size} users are already leased!")
+            self._leased += 1
+
+        return CMUserLease(index, self.get(self._item(index)))
+
+    def _item(self, position: int) -> int:
+        total = self.total
+        if self.shard.size(total) == 0:
+            return self.shard.index % total
+        return self.shard.item(position)
+
+    def release(self, lease: CMUserLease):
+        assert isinstance(lease, CMUserLease)
+        if self.policy == CMUserAssignmentPolicy.EXCLUSIVE:
+            self._free.append(lease.index)
+            self._leased -= 1
+
+    def close(self):
+        for file in self._files:
+            file.close()
+
+    @staticmethod
+    def create(config: CMConfiguration, shard: CMShard = CMShard()) -> "CMUserPool":
+        assignment = config.user_assignment
+        return CMUserPool(
+            users=list(config.users.values()),
+            files=[CMUserFile(path) for path in assignment.files],
+            policy=assignment.policy,
+            shard=shard,
+        )
+
+
+class CMUserPools:
+    """The process-wide user pool, created from the current configuration."""
+
+    _pool: Optional[CMUserPool] = None
+
+    @classmethod
+    def get(cls) -> CMUserPool:
+        if cls._pool is not None:
+            return cls._pool
+        cls._pool = CMUserPool.create(
+            Configurations.get().circulation_manager, CMShards.get()
+        )
+        return cls._pool
+
+    @classmethod
+    def clear(cls):
+        if cls._pool is not None:
+            cls._pool.close()
+        cls._pool = None
@@ -0,0 +1,201 @@
+import math
+import random
+import time
+from typing import Callable, Collection, Dict, List, Optional, Type
+
+from locust import User, events
+from locust.env import Environment
+
+from circulation_load_test.common.config import (
+    CMArrivalDistribution,
+    CMArrivalRateConfiguration,
+    CMThinkTimeConfiguration,
+    CMThinkTimeDistribution,
+    CMWorkloadConfiguration,
+)
+
+
+class CMThinkTime:
+    """Draws the pause between the tasks of a simulated user from a distribution."""
+
+    def __init__(self, config: CMThinkTimeConfiguration):
+        self.config = config
+        if config.distribution == CMThinkTimeDistribution.LOGNORMAL and config.mean > 0:
+            self._mu = math.log(config.mean) - config.sigma**2 / 2.0
+        else:
+            self._mu = 0.0
+
+    def __call__(self) -> float:
+        config = self.config
+        distribution = config.distribution
+        if distribution == CMThinkTimeDistribution.NONE:
+            return 0.0
+        if distribution == CMThinkTimeDistribution.CONSTANT:
+            return config.minimum
+        if distribution == CMThinkTimeDistribution.UNIFORM:
+            return random.uniform(config.minimum, config.maximum)
+
+        if config.mean <= 0:
+            return 0.0
+        if distribution == CMThinkTimeDistribution.EXPONENTIAL:
+            value = random.expovariate(1.0 / config.mean)
+        else:
+            value = random.lognormvariate(self._mu, config.sigma)
+        if config.maximum > 0:
+            return min(value, config.maximum)
+        return value
+
+
+class CMArrivals:
+    """
+    A schedule of task arrivals at a fixed rate, shared by all of the users of a user
+    class in a worker (an open workload model). Each user that becomes idle reserves
+    the next arrival and waits until it is due. If every user is busy when an arrival
+    is due, the arrival starts late, and the delay is reported to Locust as an
+    "arrival" request named "lag", so that latency measured at the target rate is not
+    hidden by coordinated omission. Arrivals that are more than 'maximum_lag' seconds
+    late are skipped and reported as "arrival" requests named "dropped"; add users if
+    arrivals are being dropped.
+    """
+
+    def __init__(self, config: CMArrivalRateConfiguration, clock=time.monotonic):
+        self.config = config
+        self.clock = clock
+        self._next: Optional[float] = None
+        self.started = 0
+        self.dropped = 0
+
+    def _interval(self) -> float:
+        if self.config.distribution == CMArrivalDistribution.POISSON:
+            return random.expovariate(self.config.per_second)
+        return 1.0 / self.config.per_second
+
+    def reserve(self) -> float:
+        """
+        Reserve the next arrival, returning the delay until it is due (zero or
+        negative if it is already late).
+        """
+        now = self.clock()
+        if self._next is None:
+            self._next = now
+        while now - self._next > self.config.maximum_lag:
+            self._next += self._interval()
+            self.dropped += 1
+        due = self._next
+        self._next += self._interval()
+        self.started += 1
+        return due - now
+
+    def wait_time(self) -> Callable[[User], float]:
+        """A Locust wait_time function that waits for the next arrival."""
+
+        def wait(user: User) -> float:
+            dropped = self.dropped
+            delay = self.reserve()
+            events = user.environment.events
+            for _ in range(self.dropped - dropped):
+                events.request.fire(
+                    request_type="arrival",
+                    name="dropped",
+                    response_time=0,
+                    response_length=0,
+                    exception=None,
+                    context={},
+                )
+            if delay < 0:
+                events.request.fire(
+                    request_type="arrival",
+                    name="lag",
+                    response_time=-delay * 1000.0,
+                    response_length=0,
+                    exception=None,
+                    context={},
+                )
+            return max(0.0, delay)
+
+        return wait
+
+
+class CMWorkload:
+    """Applies a configured workload model to a Locust user class."""
+
+    @staticmethod
+    def optional(task: Callable) -> Callable:
+        """
+        Mark a task as optional: it only runs when the workload weights give it a
+        weight, or when it is selected by name with Locust's --tags option.
+        """
+        task.cm_optional = True  # type: ignore[attr-defined]
+        return task
+
+    @staticmethod
+    def weighted_tasks(
+        tasks: List[Callable],
+        weights: Dict[str, int],
+        tags: Optional[Collection[str]] = None,
+    ) -> List[Callable]:
+        """
+        Return the given task list with each named task repeated according to its
+        weight, which is how Locust represents task weights. Tasks that are not named
+        keep their declared weight, except for optional tasks that are not in 'tags',
+        which are removed; a weight of 0 removes a task.
+        """
+        declared: Dict[str, int] = {}
+        functions: Dict[str, Callable] = {}
+        for task in tasks:
+            declared[task.__name__] = declared.get(task.__name__, 0) + 1
+            functions.setdefault(task.__name__, task)
+
+        unknown = set(weights) - set(functions)
+        if unknown:
+            raise ValueError(
+                "Unknown tasks in workload weights: " + ", ".join(sorted(unknown))
+            )
+
+        result = []
+        for name, task in functions.items():
+            weight = declared[name]
+            if getattr(task, "cm_optional", False) and name not in (tags or ()):
+                weight = 0
+            result.extend([task] * weights.get(name, weight))
+        if not result:
+            raise ValueError("The workload weights leave no tasks to run")
+        return result
+
+    @staticmethod
+    def apply(
+        user_class: Type[User],
+        config: CMWorkloadConfiguration,
+        tags: Optional[Collection[str]] = None,
+    ):
+        """
+        Set the task weights and wait time of the given user class. The 'tags' are
+        the tags selected with Locust's --tags option, if any.
+        """
+        user_class.tasks = CMWorkload.weighted_tasks(
+            user_class.tasks, config.weights, tags
+        )
+
+        if config.arrival_rate is not None:
+            user_class.wait_time = CMArrivals(config.arrival_rate).wait_time()
+        else:
+            think_time = CMThinkTime(config.think_time)
+            user_class.wait_time = lambda user: think_time()
+
+    @staticmethod
+    def apply_on_init(
+        user_class: Type[User], workload: Callable[[], CMWorkloadConfiguration]
+    ):
+        """
+        Apply the workload returned by 'workload' to the given user class when Locust
+        initializes, which is after the locustfile is imported and any worker
+        processes are forked, and before any users are started.
+        """
+
+        def on_init(environment: Environment, **kwargs):
+            tags = environment.tags
+            if tags is None and environment.parsed_options is not None:
+                tags = getattr(environment.parsed_options, "tags", None)
+            CMWorkload.apply(user_class, workload(), tags)
+
+        events.init.add_listener(on_init)
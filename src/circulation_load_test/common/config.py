@@ -1,6 +1,8 @@
 import json
 import os
-from typing import Any, Dict, Optional, Set
+import re
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Set
 
 
 class CMUser:
@@ -33,34 +35,1406 @@ class CMUser:
         return CMUser(name, data["password"], primary_b)
 
 
+class CMUserAssignmentPolicy(Enum):
+    """The ways in which patrons are assigned to simulated users."""
+
+    ROUND_ROBIN = "round_robin"
+    RANDOM = "random"
+    EXCLUSIVE = "exclusive"
+
+
+class CMUserAssignmentConfiguration:
+    policy: CMUserAssignmentPolicy
+    files: List[str]
+
+    def __init__(self, policy: CMUserAssignmentPolicy, files: List[str]):
+        super().__init__()
+        assert isinstance(policy, CMUserAssignmentPolicy)
+        assert isinstance(files, list)
+        self.policy = policy
+        self.files = files
+
+    @staticmethod
+    def parse(data: Any) -> "CMUserAssignmentConfiguration":
+        policy_in = data.get("policy", CMUserAssignmentPolicy.ROUND_ROBIN.value)
+        try:
+            policy = CMUserAssignmentPolicy(policy_in)
+        except ValueError:
+            raise ValueError(
+                "'policy' must be one of "
+                + ", ".join(p.value for p in CMUserAssignmentPolicy)
+                + " (got "
+                + str(policy_in)
+                + ")"
+            )
+
+        files = data.get("files", [])
+        for file in files:
+            if not isinstance(file, str):
+                raise ValueError("'files' must be a list of file paths")
+
+        return CMUserAssignmentConfiguration(policy, list(files))
+
+
+class CMFeedWalkPolicy(Enum):
+    """The order in which a feed walk visits the links that it has discovered."""
+
+    BREADTH_FIRST = "breadth_first"
+    DEPTH_FIRST = "depth_first"
+    RANDOM = "random"
+
+
+# The most feeds that a feed walk may request at once.
+MAXIMUM_FEED_WALK_CONCURRENCY = 10
+
+
+class CMFeedWalkConfiguration:
+    policy: CMFeedWalkPolicy
+    concurrency: int
+    maximum_visits: int
+    maximum_depth: Optional[int]
+    maximum_bytes: Optional[int]
+
+    def __init__(
+        self,
+        policy: CMFeedWalkPolicy = CMFeedWalkPolicy.DEPTH_FIRST,
+        concurrency: int = 1,
+        maximum_visits: int = 10,
+        maximum_depth: Optional[int] = None,
+        maximum_bytes: Optional[int] = None,
+    ):
+        super().__init__()
+        assert isinstance(policy, CMFeedWalkPolicy)
+        assert isinstance(concurrency, int)
+        assert isinstance(maximum_visits, int)
+        self.policy = policy
+        self.concurrency = concurrency
+        self.maximum_visits = maximum_visits
+        self.maximum_depth = maximum_depth
+        self.maximum_bytes = maximum_bytes
+
+    @staticmethod
+    def parse(data: Any) -> "CMFeedWalkConfiguration":
+        policy_in = data.get("policy", CMFeedWalkPolicy.DEPTH_FIRST.value)
+        try:
+            policy = CMFeedWalkPolicy(policy_in)
+        except ValueError:
+            raise ValueError(
+                "'policy' must be one of "
+                + ", ".join(p.value for p in CMFeedWalkPolicy)
+                + " (got "
+                + str(policy_in)
+                + ")"
+            )
+
+        numbers = {}
+        for name, default in [
+            ("concurrency", 1),
+            ("maximum_visits", 10),
+            ("maximum_depth", None),
+            ("maximum_bytes", None),
+        ]:
+            value = data.get(name, default)
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(
+                    "'" + name + "' must be a positive integer (got " + str(value) + ")"
+                )
+            numbers[name] = value
+
+        if numbers["concurrency"] > MAXIMUM_FEED_WALK_CONCURRENCY:
+            raise ValueError(
+                "'concurrency' must be an integer from 1 to "
+                + str(MAXIMUM_FEED_WALK_CONCURRENCY)
+                + " (got "
+                + str(numbers["concurrency"])
+                + ")"
+            )
+
+        return CMFeedWalkConfiguration(policy, **numbers)
+
+
+class CMLinkGraphConfiguration:
+    enabled: bool
+    capacity: int
+    maximum_links: int
+    ttl: float
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        capacity: int = 10000,
+        maximum_links: int = 100,
+        ttl: float = 600.0,
+    ):
+        super().__init__()
+        assert isinstance(enabled, bool)
+        assert isinstance(capacity, int)
+        assert isinstance(maximum_links, int)
+        assert isinstance(ttl, (int, float))
+        self.enabled = enabled
+        self.capacity = capacity
+        self.maximum_links = maximum_links
+        self.ttl = ttl
+
+    @staticmethod
+    def parse(data: Any) -> "CMLinkGraphConfiguration":
+        discovery = data.get("discovery", "server")
+        if discovery not in {"server", "cache"}:
+            raise ValueError(
+                "'discovery' must be 'server' or 'cache' (got " + str(discovery) + ")"
+            )
+
+        numbers = {}
+        for name, default in [
+            ("capacity", 10000),
+            ("maximum_links", 100),
+            ("ttl_seconds", 600.0),
+        ]:
+            value = data.get(name, default)
+            if not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(
+                    "'" + name + "' must be a positive number (got " + str(value) + ")"
+                )
+            numbers[name] = value
+
+        return CMLinkGraphConfiguration(
+            enabled=discovery == "cache",
+            capacity=int(numbers["capacity"]),
+            maximum_links=int(numbers["maximum_links"]),
+            ttl=numbers["ttl_seconds"],
+        )
+
+
+class CMBookmarkWriteConfiguration:
+    count: int
+    concurrency: int
+    read_back: bool
+
+    def __init__(self, count: int = 99, concurrency: int = 1, read_back: bool = False):
+        super().__init__()
+        assert isinstance(count, int)
+        assert isinstance(concurrency, int)
+        assert isinstance(read_back, bool)
+        self.count = count
+        self.concurrency = concurrency
+        self.read_back = read_back
+
+    @staticmethod
+    def parse(data: Any) -> "CMBookmarkWriteConfiguration":
+        numbers = {}
+        for name, default in [("count", 99), ("concurrency", 1)]:
+            value = data.get(name, default)
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(
+                    "'" + name + "' must be a positive integer (got " + str(value) + ")"
+                )
+            numbers[name] = value
+
+        read_back = data.get("read_back", False)
+        if not isinstance(read_back, bool):
+            raise ValueError(
+                "'read_back' must be a boolean (got " + str(read_back) + ")"
+            )
+
+        return CMBookmarkWriteConfiguration(read_back=read_back, **numbers)
+
+
+class CMLoanPoolConfiguration:
+    loans_per_patron: int
+    maximum_age: float
+    maximum_uses: int
+
+    def __init__(
+        self,
+        loans_per_patron: int = 0,
+        maximum_age: float = 600.0,
+        maximum_uses: int = 100,
+    ):
+        super().__init__()
+        assert isinstance(loans_per_patron, int)
+        assert isinstance(maximum_age, (int, float))
+        assert isinstance(maximum_uses, int)
+        self.loans_per_patron = loans_per_patron
+        self.maximum_age = maximum_age
+        self.maximum_uses = maximum_uses
+
+    @property
+    def enabled(self) -> bool:
+        return self.loans_per_patron > 0
+
+    @staticmethod
+    def parse(data: Any) -> "CMLoanPoolConfiguration":
+        loans_per_patron = data.get("loans_per_patron", 0)
+        if not isinstance(loans_per_patron, int) or loans_per_patron < 0:
+            raise ValueError(
+                "'loans_per_patron' must be a non-negative integer (got "
+                + str(loans_per_patron)
+                + ")"
+            )
+
+        maximum_age = data.get("maximum_age_seconds", 600.0)
+        if not isinstance(maximum_age, (int, float)) or maximum_age <= 0:
+            raise ValueError(
+                "'maximum_age_seconds' must be a positive number (got "
+                + str(maximum_age)
+                + ")"
+            )
+
+        maximum_uses = data.get("maximum_uses", 100)
+        if not isinstance(maximum_uses, int) or maximum_uses < 1:
+            raise ValueError(
+                "'maximum_uses' must be a positive integer (got "
+                + str(maximum_uses)
+                + ")"
+            )
+
+        return CMLoanPoolConfiguration(loans_per_patron, maximum_age, maximum_uses)
+
+
+class CMQueryShape(Enum):
+    """The shape of a search query."""
+
+    WORD = "word"
+    MULTIWORD = "multiword"
+    AUTHOR = "author"
+    TITLE = "title"
+
+
+class CMSearchTermsConfiguration:
+    corpus: Optional[str]
+    zipf_exponent: Optional[float]
+    shapes: Dict[CMQueryShape, float]
+    multiword_terms: int
+    authors: Optional[str]
+    titles: Optional[str]
+
+    def __init__(
+        self,
+        corpus: Optional[str] = None,
+        zipf_exponent: Optional[float] = None,
+        shapes: Optional[Dict[CMQueryShape, float]] = None,
+        multiword_terms: int = 3,
+        authors: Optional[str] = None,
+        titles: Optional[str] = None,
+    ):
+        super().__init__()
+        assert zipf_exponent is None or isinstance(zipf_exponent, (int, float))
+        assert isinstance(multiword_terms, int)
+        self.corpus = corpus
+        self.zipf_exponent = zipf_exponent
+        self.shapes = shapes or {CMQueryShape.WORD: 1.0}
+        self.multiword_terms = multiword_terms
+        self.authors = authors
+        self.titles = titles
+
+    @staticmethod
+    def parse(data: Any) -> "CMSearchTermsConfiguration":
+        files = {}
+        for name in ["corpus", "authors", "titles"]:
+            value = data.get(name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(
+                    "'" + name + "' must be a file name (got " + str(value) + ")"
+                )
+            files[name] = value
+
+        zipf_exponent = data.get("zipf_exponent")
+        if zipf_exponent is not None and (
+            not isinstance(zipf_exponent, (int, float)) or zipf_exponent < 0
+        ):
+            raise ValueError(
+                "'zipf_exponent' must be a non-negative number (got "
+                + str(zipf_exponent)
+                + ")"
+            )
+
+        multiword_terms = data.get("multiword_terms", 3)
+        if not isinstance(multiword_terms, int) or multiword_terms < 2:
+            raise ValueError(
+                "'multiword_terms' must be an integer of at least 2 (got "
+                + str(multiword_terms)
+                + ")"
+            )
+
+        shapes = {}
+        for name, weight in data.get("shapes", {"word": 1.0}).items():
+            try:
+                shape = CMQueryShape(name)
+            except ValueError:
+                raise ValueError(
+                    "Query shapes must be one of "
+                    + ", ".join(s.value for s in CMQueryShape)
+                    + " (got "
+                    + str(name)
+                    + ")"
+                )
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise ValueError(
+                    "The weight of query shape '"
+                    + name
+                    + "' must be a non-negative number (got "
+                    + str(weight)
+                    + ")"
+                )
+            shapes[shape] = weight
+
+        if sum(shapes.values()) <= 0:
+            raise ValueError("At least one query shape must have a positive weight")
+        for shape, name in [
+            (CMQueryShape.AUTHOR, "authors"),
+            (CMQueryShape.TITLE, "titles"),
+        ]:
+            if shapes.get(shape, 0) > 0 and files[name] is None:
+                raise ValueError(
+                    "Query shape '"
+                    + shape.value
+                    + "' requires an '"
+                    + name
+                    + "' corpus"
+                )
+
+        return CMSearchTermsConfiguration(
+            corpus=files["corpus"],
+            zipf_exponent=zipf_exponent,
+            shapes=shapes,
+            multiword_terms=multiword_terms,
+            authors=files["authors"],
+            titles=files["titles"],
+        )
+
+
+class CMThinkTimeDistribution(Enum):
+    """The distribution of the pause between the tasks of a simulated user."""
+
+    NONE = "none"
+    CONSTANT = "constant"
+    UNIFORM = "uniform"
+    EXPONENTIAL = "exponential"
+    LOGNORMAL = "lognormal"
+
+
+class CMThinkTimeConfiguration:
+    distribution: CMThinkTimeDistribution
+    minimum: float
+    maximum: float
+    mean: float
+    sigma: float
+
+    def __init__(
+        self,
+        distribution: CMThinkTimeDistribution = CMThinkTimeDistribution.NONE,
+        minimum: float = 0.0,
+        maximum: float = 0.0,
+        mean: float = 0.0,
+        sigma: float = 1.0,
+    ):
+        super().__init__()
+        assert isinstance(distribution, CMThinkTimeDistribution)
+        self.distribution = distribution
+        self.minimum = minimum
+        self.maximum = maximum
+        self.mean = mean
+        self.sigma = sigma
+
+    @staticmethod
+    def parse(data: Any) -> "CMThinkTimeConfiguration":
+        distribution_in = data.get("distribution", CMThinkTimeDistribution.NONE.value)
+        try:
+            distribution = CMThinkTimeDistribution(distribution_in)
+        except ValueError:
+            raise ValueError(
+                "'distribution' must be one of "
+                + ", ".join(d.value for d in CMThinkTimeDistribution)
+                + " (got "
+                + str(distribution_in)
+                + ")"
+            )
+
+        numbers = {}
+        for name, default in [
+            ("seconds", 0.0),
+            ("minimum_seconds", 0.0),
+            ("maximum_seconds", 0.0),
+            ("mean_seconds", 0.0),
+            ("sigma", 1.0),
+        ]:
+            value = data.get(name, default)
+            if not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(
+                    "'"
+                    + name
+                    + "' must be a non-negative number (got "
+                    + str(value)
+                    + ")"
+                )
+            numbers[name] = value
+
+        if distribution == CMThinkTimeDistribution.CONSTANT:
+            return CMThinkTimeConfiguration(
+                distribution, minimum=numbers["seconds"], maximum=numbers["seconds"]
+            )
+        if distribution == CMThinkTimeDistribution.UNIFORM:
+            if numbers["maximum_seconds"] < numbers["minimum_seconds"]:
+                raise ValueError(
+                    "'maximum_seconds' must not be less than 'minimum_seconds'"
+                )
+            return CMThinkTimeConfiguration(
+                distribution,
+                minimum=numbers["minimum_seconds"],
+                maximum=numbers["maximum_seconds"],
+            )
+        return CMThinkTimeConfiguration(
+            distribution,
+            maximum=numbers["maximum_seconds"],
+            mean=numbers["mean_seconds"],
+            sigma=numbers["sigma"],
+        )
+
+
+class CMArrivalDistribution(Enum):
+    """The spacing of task arrivals in the open workload model."""
+
+    CONSTANT = "constant"
+    POISSON = "poisson"
+
+
+class CMArrivalRateConfiguration:
+    per_second: float
+    distribution: CMArrivalDistribution
+    maximum_lag: float
+
+    def __init__(
+        self,
+        per_second: float,
+        distribution: CMArrivalDistribution = CMArrivalDistribution.CONSTANT,
+        maximum_lag: float = 1.0,
+    ):
+        super().__init__()
+        assert isinstance(per_second, (int, float)) and per_second > 0
+        assert isinstance(distribution, CMArrivalDistribution)
+        self.per_second = per_second
+        self.distribution = distribution
+        self.maximum_lag = maximum_lag
+
+    @staticmethod
+    def parse(data: Any) -> "CMArrivalRateConfiguration":
+        per_second = data.get("per_second")
+        if not isinstance(per_second, (int, float)) or per_second <= 0:
+            raise ValueError(
+                "'per_second' must be a positive number (got " + str(per_second) + ")"
+            )
+
+        distribution_in = data.get("distribution", CMArrivalDistribution.CONSTANT.value)
+        try:
+            distribution = CMArrivalDistribution(distribution_in)
+        except ValueError:
+            raise ValueError(
+                "'distribution' must be one of "
+                + ", ".join(d.value for d in CMArrivalDistribution)
+                + " (got "
+                + str(distribution_in)
+                + ")"
+            )
+
+        maximum_lag = data.get("maximum_lag_seconds", 1.0)
+        if not isinstance(maximum_lag, (int, float)) or maximum_lag < 0:
+            raise ValueError(
+                "'maximum_lag_seconds' must be a non-negative number (got "
+                + str(maximum_lag)
+                + ")"
+            )
+
+        return CMArrivalRateConfiguration(per_second, distribution, maximum_lag)
+
+
+class CMWorkloadConfiguration:
+    weights: Dict[str, int]
+    think_time: CMThinkTimeConfiguration
+    arrival_rate: Optional[CMArrivalRateConfiguration]
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, int]] = None,
+        think_time: Optional[CMThinkTimeConfiguration] = None,
+        arrival_rate: Optional[CMArrivalRateConfiguration] = None,
+    ):
+        super().__init__()
+        self.weights = weights or {}
+        self.think_time = think_time or CMThinkTimeConfiguration()
+        self.arrival_rate = arrival_rate
+
+    @staticmethod
+    def parse(data: Any) -> "CMWorkloadConfiguration":
+        weights = {}
+        for name, weight in data.get("weights", {}).items():
+            if not isinstance(weight, int) or weight < 0:
+                raise ValueError(
+                    "The weight of task '"
+                    + name
+                    + "' must be a non-negative integer (got "
+                    + str(weight)
+                    + ")"
+                )
+            weights[name] = weight
+
+        if "think_time" in data and "arrival_rate" in data:
+            raise ValueError("Only one of 'think_time' and 'arrival_rate' may be set")
+
+        think_time = CMThinkTimeConfiguration.parse(data.get("think_time", {}))
+        arrival_rate = None
+        if "arrival_rate" in data:
+            arrival_rate = CMArrivalRateConfiguration.parse(data["arrival_rate"])
+
+        return CMWorkloadConfiguration(weights, think_time, arrival_rate)
+
+
+class CMJourneyStep(Enum):
+    """A step in a patron's journey through the app."""
+
+    OPEN = "open"
+    BROWSE = "browse"
+    SEARCH = "search"
+    BORROW = "borrow"
+    READ = "read"
+    RETURN = "return"
+    END = "end"
+
+
+# The default transition weights of a journey: from each step, the relative
+# likelihood of each following step.
+DEFAULT_JOURNEY_TRANSITIONS: Dict[CMJourneyStep, Dict[CMJourneyStep, float]] = {
+    CMJourneyStep.OPEN: {
+        CMJourneyStep.BROWSE: 0.5,
+        CMJourneyStep.SEARCH: 0.4,
+        CMJourneyStep.END: 0.1,
+    },
+    CMJourneyStep.BROWSE: {
+        CMJourneyStep.BROWSE: 0.4,
+        CMJourneyStep.SEARCH: 0.3,
+        CMJourneyStep.BORROW: 0.2,
+        CMJourneyStep.END: 0.1,
+    },
+    CMJourneyStep.SEARCH: {
+        CMJourneyStep.SEARCH: 0.2,
+        CMJourneyStep.BROWSE: 0.2,
+        CMJourneyStep.BORROW: 0.4,
+        CMJourneyStep.END: 0.2,
+    },
+    CMJourneyStep.BORROW: {CMJourneyStep.READ: 1.0},
+    CMJourneyStep.READ: {
+        CMJourneyStep.READ: 0.5,
+        CMJourneyStep.RETURN: 0.3,
+        CMJourneyStep.BROWSE: 0.1,
+        CMJourneyStep.END: 0.1,
+    },
+    CMJourneyStep.RETURN: {
+        CMJourneyStep.BROWSE: 0.3,
+        CMJourneyStep.SEARCH: 0.3,
+        CMJourneyStep.END: 0.4,
+    },
+}
+
+
+# The number of reading position updates in each read step of a journey.
+JOURNEY_READ_UPDATES = 3
+
+
+class CMJourneyConfiguration:
+    transitions: Dict[CMJourneyStep, Dict[CMJourneyStep, float]]
+    maximum_steps: int
+    step_think_time: CMThinkTimeConfiguration
+    weight: int
+    read: "CMReadingSyncConfiguration"
+
+    def __init__(
+        self,
+        transitions: Optional[Dict[CMJourneyStep, Dict[CMJourneyStep, float]]] = None,
+        maximum_steps: int = 20,
+        step_think_time: Optional[CMThinkTimeConfiguration] = None,
+        weight: int = 0,
+        read: Optional["CMReadingSyncConfiguration"] = None,
+    ):
+        super().__init__()
+        assert isinstance(maximum_steps, int)
+        assert isinstance(weight, int) and weight >= 0
+        self.transitions = transitions or DEFAULT_JOURNEY_TRANSITIONS
+        self.maximum_steps = maximum_steps
+        self.step_think_time = step_think_time or CMThinkTimeConfiguration()
+        self.weight = weight
+        self.read = read or CMReadingSyncConfiguration(
+            updates=JOURNEY_READ_UPDATES, read_every=JOURNEY_READ_UPDATES
+        )
+
+    @staticmethod
+    def _step(name: Any) -> CMJourneyStep:
+        try:
+            return CMJourneyStep(name)
+        except ValueError:
+            raise ValueError(
+                "Journey steps must be one of "
+                + ", ".join(s.value for s in CMJourneyStep)
+                + " (got "
+                + str(name)
+                + ")"
+            )
+
+    @staticmethod
+    def parse(data: Any) -> "CMJourneyConfiguration":
+        transitions = dict(DEFAULT_JOURNEY_TRANSITIONS)
+        for source_name, targets_in in data.get("transitions", {}).items():
+            source = CMJourneyConfiguration._step(source_name)
+            if source == CMJourneyStep.END:
+                raise ValueError("The 'end' step cannot have transitions")
+            targets = {}
+            for target_name, weight in targets_in.items():
+                target = CMJourneyConfiguration._step(target_name)
+                if target == CMJourneyStep.OPEN:
+                    raise ValueError("No step can transition to the 'open' step")
+                if not isinstance(weight, (int, float)) or weight < 0:
+                    raise ValueError(
+                        "The weight of the transition from '"
+                        + source_name
+                        + "' to '"
+                        + target_name
+                        + "' must be a non-negative number (got "
+                        + str(weight)
+                        + ")"
+                    )
+                targets[target] = weight
+            if sum(targets.values()) <= 0:
+                raise ValueError(
+                    "The '" + source_name + "' step must have a possible next step"
+                )
+            transitions[source] = targets
+
+        maximum_steps = data.get("maximum_steps", 20)
+        if not isinstance(maximum_steps, int) or maximum_steps < 1:
+            raise ValueError(
+                "'maximum_steps' must be a positive integer (got "
+                + str(maximum_steps)
+                + ")"
+            )
+
+        step_think_time = CMThinkTimeConfiguration.parse(
+            data.get("step_think_time", {})
+        )
+
+        weight = data.get("weight", 1)
+        if not isinstance(weight, int) or weight < 0:
+            raise ValueError(
+                "'weight' must be a non-negative integer (got " + str(weight) + ")"
+            )
+
+        read = CMReadingSyncConfiguration.parse(
+            data.get("read", {}),
+            updates=JOURNEY_READ_UPDATES,
+            read_every=JOURNEY_READ_UPDATES,
+        )
+        return CMJourneyConfiguration(
+            transitions, maximum_steps, step_think_time, weight, read
+        )
+
+
+class CMReplayConfiguration:
+    log: Optional[str]
+    speed: float
+    loop: bool
+    queue_size: int
+
+    def __init__(
+        self,
+        log: Optional[str] = None,
+        speed: float = 1.0,
+        loop: bool = False,
+        queue_size: int = 1000,
+    ):
+        super().__init__()
+        assert isinstance(speed, (int, float)) and speed > 0
+        assert isinstance(loop, bool)
+        assert isinstance(queue_size, int) and queue_size > 0
+        self.log = log
+        self.speed = speed
+        self.loop = loop
+        self.queue_size = queue_size
+
+    @staticmethod
+    def parse(data: Any) -> "CMReplayConfiguration":
+        log = data.get("log")
+        if log is not None and not isinstance(log, str):
+            raise ValueError("'log' must be a file name (got " + str(log) + ")")
+
+        speed = data.get("speed", 1.0)
+        if not isinstance(speed, (int, float)) or speed <= 0:
+            raise ValueError(
+                "'speed' must be a positive number (got " + str(speed) + ")"
+            )
+
+        loop = data.get("loop", False)
+        if not isinstance(loop, bool):
+            raise ValueError("'loop' must be a boolean (got " + str(loop) + ")")
+
+        queue_size = data.get("queue_size", 1000)
+        if not isinstance(queue_size, int) or queue_size < 1:
+            raise ValueError(
+                "'queue_size' must be a positive integer (got " + str(queue_size) + ")"
+            )
+
+        return CMReplayConfiguration(log, speed, loop, queue_size)
+
+
+class CMInstrumentationConfiguration:
+    enabled: bool
+    export: Optional[str]
+
+    def __init__(self, enabled: bool = False, export: Optional[str] = None):
+        super().__init__()
+        assert isinstance(enabled, bool)
+        self.enabled = enabled
+        self.export = export
+
+    @staticmethod
+    def parse(data: Any) -> "CMInstrumentationConfiguration":
+        enabled = data.get("enabled", False)
+        if not isinstance(enabled, bool):
+            raise ValueError("'enabled' must be a boolean (got " + str(enabled) + ")")
+
+        export = data.get("export")
+        if export is not None and not isinstance(export, str):
+            raise ValueError("'export' must be a file name (got " + str(export) + ")")
+
+        return CMInstrumentationConfiguration(enabled, export)
+
+
+# The query parameters of CM feeds that take a small set of values (the entry point
+# and facets), and so are kept in request names.
+DEFAULT_QUERY_VALUES = ["entrypoint", "order", "available", "collection", "distributor"]
+
+
+class CMRequestNameRule:
+    pattern: str
+    replacement: str
+
+    def __init__(self, pattern: str, replacement: str):
+        super().__init__()
+        assert isinstance(pattern, str)
+        assert isinstance(replacement, str)
+        self.pattern = pattern
+        self.replacement = replacement
+
+    @staticmethod
+    def parse(data: Any) -> "CMRequestNameRule":
+        if not isinstance(data, dict):
+            raise ValueError(
+                "A request name rule must be an object (got " + str(data) + ")"
+            )
+
+        pattern = data.get("pattern")
+        if not isinstance(pattern, str):
+            raise ValueError("'pattern' must be a string (got " + str(pattern) + ")")
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(
+                "'pattern' must be a regular expression (got "
+                + pattern
+                + ": "
+                + str(e)
+                + ")"
+            )
+
+        replacement = data.get("replacement")
+        if not isinstance(replacement, str):
+            raise ValueError(
+                "'replacement' must be a string (got " + str(replacement) + ")"
+            )
+
+        return CMRequestNameRule(pattern, replacement)
+
+
+class CMRequestNamesConfiguration:
+    rules: List[CMRequestNameRule]
+    default_rules: bool
+    query_values: Set[str]
+
+    def __init__(
+        self,
+        rules: Optional[List[CMRequestNameRule]] = None,
+        default_rules: bool = True,
+        query_values: Optional[Set[str]] = None,
+    ):
+        super().__init__()
+        assert isinstance(default_rules, bool)
+        self.rules = rules or []
+        self.default_rules = default_rules
+        if query_values is None:
+            query_values = set(DEFAULT_QUERY_VALUES)
+        self.query_values = query_values
+
+    @staticmethod
+    def parse(data: Any) -> "CMRequestNamesConfiguration":
+        rules_in = data.get("rules", [])
+        if not isinstance(rules_in, list):
+            raise ValueError("'rules' must be a list (got " + str(rules_in) + ")")
+        rules = [CMRequestNameRule.parse(rule) for rule in rules_in]
+
+        default_rules = data.get("default_rules", True)
+        if not isinstance(default_rules, bool):
+            raise ValueError(
+                "'default_rules' must be a boolean (got " + str(default_rules) + ")"
+            )
+
+        query_values = data.get("query_values", DEFAULT_QUERY_VALUES)
+        if not isinstance(query_values, list) or not all(
+            isinstance(name, str) for name in query_values
+        ):
+            raise ValueError(
+                "'query_values' must be a list of strings (got "
+                + str(query_values)
+                + ")"
+            )
+
+        return CMRequestNamesConfiguration(rules, default_rules, set(query_values))
+
+
+class CMHistogramConfiguration:
+    enabled: bool
+    export: Optional[str]
+    interval: float
+    significant_figures: int
+    highest: float
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        export: Optional[str] = None,
+        interval: float = 10.0,
+        significant_figures: int = 3,
+        highest: float = 3600.0,
+    ):
+        super().__init__()
+        assert isinstance(enabled, bool)
+        assert isinstance(interval, (int, float)) and interval > 0
+        assert isinstance(significant_figures, int) and 1 <= significant_figures <= 5
+        assert isinstance(highest, (int, float)) and highest > 0
+        self.enabled = enabled
+        self.export = export
+        self.interval = interval
+        self.significant_figures = significant_figures
+        self.highest = highest
+
+    @staticmethod
+    def parse(data: Any) -> "CMHistogramConfiguration":
+        enabled = data.get("enabled", False)
+        if not isinstance(enabled, bool):
+            raise ValueError("'enabled' must be a boolean (got " + str(enabled) + ")")
+
+        export = data.get("export")
+        if export is not None and not isinstance(export, str):
+            raise ValueError("'export' must be a file name (got " + str(export) + ")")
+
+        interval = data.get("interval_seconds", 10.0)
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError(
+                "'interval_seconds' must be a positive number (got "
+                + str(interval)
+                + ")"
+            )
+
+        significant_figures = data.get("significant_figures", 3)
+        if (
+            not isinstance(significant_figures, int)
+            or not 1 <= significant_figures <= 5
+        ):
+            raise ValueError(
+                "'significant_figures' must be an integer in [1, 5] (got "
+                + str(significant_figures)
+                + ")"
+            )
+
+        highest = data.get("highest_seconds", 3600.0)
+        if not isinstance(highest, (int, float)) or highest <= 0:
+            raise ValueError(
+                "'highest_seconds' must be a positive number (got " + str(highest) + ")"
+            )
+
+        return CMHistogramConfiguration(
+            enabled, export, interval, significant_figures, highest
+        )
+
+
+class CMHTTPCacheConfiguration:
+    enabled: bool
+    shared: bool
+    maximum_bytes: int
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        shared: bool = False,
+        maximum_bytes: int = 16 * 1024 * 1024,
+    ):
+        super().__init__()
+        assert isinstance(enabled, bool)
+        assert isinstance(shared, bool)
+        assert isinstance(maximum_bytes, int) and maximum_bytes > 0
+        self.enabled = enabled
+        self.shared = shared
+        self.maximum_bytes = maximum_bytes
+
+    @staticmethod
+    def parse(data: Any) -> "CMHTTPCacheConfiguration":
+        enabled = data.get("enabled", False)
+        if not isinstance(enabled, bool):
+            raise ValueError("'enabled' must be a boolean (got " + str(enabled) + ")")
+
+        shared = data.get("shared", False)
+        if not isinstance(shared, bool):
+            raise ValueError("'shared' must be a boolean (got " + str(shared) + ")")
+
+        maximum_bytes = data.get("maximum_bytes", 16 * 1024 * 1024)
+        if not isinstance(maximum_bytes, int) or maximum_bytes <= 0:
+            raise ValueError(
+                "'maximum_bytes' must be a positive integer (got "
+                + str(maximum_bytes)
+                + ")"
+            )
+
+        return CMHTTPCacheConfiguration(enabled, shared, maximum_bytes)
+
+
+class CMConnectionPolicy(Enum):
+    """When a simulated user replaces its connections with new ones."""
+
+    PERSISTENT = "persistent"
+    SESSION = "session"
+    REQUESTS = "requests"
+
+
+class CMConnectionConfiguration:
+    policy: CMConnectionPolicy
+    idle_seconds: float
+    requests_per_connection: int
+    pool_size: int
+    timing: bool
+
+    def __init__(
+        self,
+        policy: CMConnectionPolicy = CMConnectionPolicy.PERSISTENT,
+        idle_seconds: float = 30.0,
+        requests_per_connection: int = 100,
+        pool_size: int = 10,
+        timing: bool = False,
+    ):
+        super().__init__()
+        assert isinstance(policy, CMConnectionPolicy)
+        assert isinstance(idle_seconds, (int, float)) and idle_seconds >= 0
+        assert isinstance(requests_per_connection, int) and requests_per_connection >= 1
+        assert isinstance(pool_size, int) and pool_size >= 1
+        assert isinstance(timing, bool)
+        self.policy = policy
+        self.idle_seconds = idle_seconds
+        self.requests_per_connection = requests_per_connection
+        self.pool_size = pool_size
+        self.timing = timing
+
+    @staticmethod
+    def parse(data: Any) -> "CMConnectionConfiguration":
+        policy_in = data.get("policy", CMConnectionPolicy.PERSISTENT.value)
+        try:
+            policy = CMConnectionPolicy(policy_in)
+        except ValueError:
+            raise ValueError(
+                "'policy' must be one of "
+                + ", ".join(p.value for p in CMConnectionPolicy)
+                + " (got "
+                + str(policy_in)
+                + ")"
+            )
+
+        idle_seconds = data.get("idle_seconds", 30.0)
+        if not isinstance(idle_seconds, (int, float)) or idle_seconds < 0:
+            raise ValueError(
+                "'idle_seconds' must be a non-negative number (got "
+                + str(idle_seconds)
+                + ")"
+            )
+
+        numbers = {}
+        for name, default in [("requests_per_connection", 100), ("pool_size", 10)]:
+            value = data.get(name, default)
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(
+                    "'" + name + "' must be a positive integer (got " + str(value) + ")"
+                )
+            numbers[name] = value
+
+        timing = data.get("timing", False)
+        if not isinstance(timing, bool):
+            raise ValueError("'timing' must be a boolean (got " + str(timing) + ")")
+
+        return CMConnectionConfiguration(policy, idle_seconds, timing=timing, **numbers)
+
+
+class CMSearchPaginationConfiguration:
+    depth_weights: List[float]
+    maximum_pages: Optional[int]
+    prefetch: bool
+    page_stats: bool
+    page_think_time: CMThinkTimeConfiguration
+
+    def __init__(
+        self,
+        depth_weights: Optional[List[float]] = None,
+        maximum_pages: Optional[int] = None,
+        prefetch: bool = False,
+        page_stats: bool = False,
+        page_think_time: Optional[CMThinkTimeConfiguration] = None,
+    ):
+        super().__init__()
+        assert maximum_pages is None or maximum_pages >= 1
+        assert isinstance(prefetch, bool)
+        assert isinstance(page_stats, bool)
+        self.depth_weights = depth_weights or []
+        self.maximum_pages = maximum_pages
+        self.prefetch = prefetch
+        self.page_stats = page_stats
+        self.page_think_time = page_think_time or CMThinkTimeConfiguration()
+
+    @staticmethod
+    def parse(data: Any) -> "CMSearchPaginationConfiguration":
+        depth_weights = data.get("depth_weights", [])
+        if (
+            not isinstance(depth_weights, list)
+            or not all(
+                isinstance(weight, (int, float)) and weight >= 0
+                for weight in depth_weights
+            )
+            or (depth_weights and sum(depth_weights) <= 0)
+        ):
+            raise ValueError(
+                "'depth_weights' must be a list of non-negative numbers with a "
+                "positive total (got " + str(depth_weights) + ")"
+            )
+
+        maximum_pages = data.get("maximum_pages")
+        if maximum_pages is not None and (
+            not isinstance(maximum_pages, int) or maximum_pages < 1
+        ):
+            raise ValueError(
+                "'maximum_pages' must be a positive integer (got "
+                + str(maximum_pages)
+                + ")"
+            )
+
+        prefetch = data.get("prefetch", False)
+        if not isinstance(prefetch, bool):
+            raise ValueError("'prefetch' must be a boolean (got " + str(prefetch) + ")")
+
+        page_stats = data.get("page_stats", False)
+        if not isinstance(page_stats, bool):
+            raise ValueError(
+                "'page_stats' must be a boolean (got " + str(page_stats) + ")"
+            )
+
+        page_think_time = CMThinkTimeConfiguration.parse(
+            data.get("page_think_time", {})
+        )
+
+        return CMSearchPaginationConfiguration(
+            [float(weight) for weight in depth_weights],
+            maximum_pages,
+            prefetch,
+            page_stats,
+            page_think_time,
+        )
+
+
+class CMLocatorKind(Enum):
+    """The kind of locator with which an app records a reading position."""
+
+    PAGE = "page"
+    HREF_PROGRESSION = "href_progression"
+    LEGACY_CFI = "legacy_cfi"
+    AUDIOBOOK_TIME = "audiobook_time"
+
+
+# The default mix of locators: most positions are synchronized by the EPUB readers of
+# the current apps, then by audiobook and PDF players, and a few by legacy apps.
+DEFAULT_LOCATOR_WEIGHTS: Dict[CMLocatorKind, float] = {
+    CMLocatorKind.HREF_PROGRESSION: 60.0,
+    CMLocatorKind.AUDIOBOOK_TIME: 20.0,
+    CMLocatorKind.PAGE: 15.0,
+    CMLocatorKind.LEGACY_CFI: 5.0,
+}
+
+
+class CMReadingSyncConfiguration:
+    locator_weights: Dict[CMLocatorKind, float]
+    updates: int
+    update_interval: CMThinkTimeConfiguration
+    bookmark_probability: float
+    read_every: int
+
+    def __init__(
+        self,
+        locator_weights: Optional[Dict[CMLocatorKind, float]] = None,
+        updates: int = 20,
+        update_interval: Optional[CMThinkTimeConfiguration] = None,
+        bookmark_probability: float = 0.05,
+        read_every: int = 10,
+    ):
+        super().__init__()
+        assert isinstance(updates, int) and updates >= 1
+        assert 0.0 <= bookmark_probability <= 1.0
+        assert isinstance(read_every, int) and read_every >= 1
+        self.locator_weights = locator_weights or DEFAULT_LOCATOR_WEIGHTS
+        self.updates = updates
+        self.update_interval = update_interval or CMThinkTimeConfiguration(
+            CMThinkTimeDistribution.CONSTANT, minimum=30.0, maximum=30.0
+        )
+        self.bookmark_probability = bookmark_probability
+        self.read_every = read_every
+
+    @staticmethod
+    def parse(
+        data: Any, updates: int = 20, read_every: int = 10
+    ) -> "CMReadingSyncConfiguration":
+        locator_weights = {}
+        for name, weight in data.get("locator_weights", {}).items():
+            try:
+                kind = CMLocatorKind(name)
+            except ValueError:
+                raise ValueError(
+                    "Locator kinds must be one of "
+                    + ", ".join(k.value for k in CMLocatorKind)
+                    + " (got "
+                    + str(name)
+                    + ")"
+                )
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise ValueError(
+                    "The weight of locator '"
+                    + name
+                    + "' must be a non-negative number (got "
+                    + str(weight)
+                    + ")"
+                )
+            locator_weights[kind] = float(weight)
+        if locator_weights and sum(locator_weights.values()) <= 0:
+            raise ValueError("'locator_weights' must have a positive total")
+
+        numbers = {}
+        for name, default in [("updates", updates), ("read_every", read_every)]:
+            value = data.get(name, default)
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(
+                    "'" + name + "' must be a positive integer (got " + str(value) + ")"
+                )
+            numbers[name] = value
+
+        bookmark_probability = data.get("bookmark_probability", 0.05)
+        if (
+            not isinstance(bookmark_probability, (int, float))
+            or not 0 <= bookmark_probability <= 1
+        ):
+            raise ValueError(
+                "'bookmark_probability' must be a number from 0 to 1 (got "
+                + str(bookmark_probability)
+                + ")"
+            )
+
+        update_interval = None
+        if "update_interval" in data:
+            update_interval = CMThinkTimeConfiguration.parse(data["update_interval"])
+
+        return CMReadingSyncConfiguration(
+            locator_weights or None,
+            update_interval=update_interval,
+            bookmark_probability=float(bookmark_probability),
+            **numbers,
+        )
+
+
+class RDocumentFetch(Enum):
+    """The authentication documents that the app fetches when it opens."""
+
+    ALL = "all"
+    NEARBY = "nearby"
+    SELECTED = "selected"
+
+
+class RAppOpenConfiguration:
+    pool_size: int
+    fetch: RDocumentFetch
+    nearby: int
+    selected: int
+    document_ttl: float
+    document_cache_bytes: int
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        fetch: RDocumentFetch = RDocumentFetch.ALL,
+        nearby: int = 20,
+        selected: int = 1,
+        document_ttl: float = 0.0,
+        document_cache_bytes: int = 16 * 1024 * 1024,
+    ):
+        super().__init__()
+        assert isinstance(pool_size, int) and pool_size >= 1
+        assert isinstance(fetch, RDocumentFetch)
+        assert isinstance(nearby, int) and nearby >= 1
+        assert isinstance(selected, int) and selected >= 1
+        assert isinstance(document_ttl, (int, float)) and document_ttl >= 0
+        assert isinstance(document_cache_bytes, int) and document_cache_bytes > 0
+        self.pool_size = pool_size
+        self.fetch = fetch
+        self.nearby = nearby
+        self.selected = selected
+        self.document_ttl = document_ttl
+        self.document_cache_bytes = document_cache_bytes
+
+    @staticmethod
+    def parse(data: Any) -> "RAppOpenConfiguration":
+        fetch_in = data.get("fetch", RDocumentFetch.ALL.value)
+        try:
+            fetch = RDocumentFetch(fetch_in)
+        except ValueError:
+            raise ValueError(
+                "'fetch' must be one of "
+                + ", ".join(f.value for f in RDocumentFetch)
+                + " (got "
+                + str(fetch_in)
+                + ")"
+            )
+
+        numbers = {}
+        for name, default in [
+            ("pool_size", 10),
+            ("nearby", 20),
+            ("selected", 1),
+            ("document_cache_bytes", 16 * 1024 * 1024),
+        ]:
+            value = data.get(name, default)
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(
+                    "'" + name + "' must be a positive integer (got " + str(value) + ")"
+                )
+            numbers[name] = value
+
+        document_ttl = data.get("document_ttl_seconds", 0.0)
+        if not isinstance(document_ttl, (int, float)) or document_ttl < 0:
+            raise ValueError(
+                "'document_ttl_seconds' must be a non-negative number (got "
+                + str(document_ttl)
+                + ")"
+            )
+
+        return RAppOpenConfiguration(fetch=fetch, document_ttl=document_ttl, **numbers)
+
+
 class RConfiguration:
     address: str
+    workload: CMWorkloadConfiguration
+    app_open: RAppOpenConfiguration
 
-    def __init__(self, address: str):
+    def __init__(
+        self,
+        address: str,
+        workload: Optional[CMWorkloadConfiguration] = None,
+        app_open: Optional[RAppOpenConfiguration] = None,
+    ):
         super().__init__()
         assert isinstance(address, str)
         self.address = address
+        self.workload = workload or CMWorkloadConfiguration()
+        self.app_open = app_open or RAppOpenConfiguration()
 
     @staticmethod
     def parse(data: Any) -> "RConfiguration":
         address = data["host"]
-        return RConfiguration(address)
+        workload = CMWorkloadConfiguration.parse(data.get("workload", {}))
+        app_open = RAppOpenConfiguration.parse(data.get("app_open", {}))
+        return RConfiguration(address, workload, app_open)
 
 
 class CMConfiguration:
     address: str
     users: Dict[str, CMUser]
     library_identifiers: Set[str]
+    session_ttl: float
+    user_assignment: CMUserAssignmentConfiguration
+    feed_walk: CMFeedWalkConfiguration
+    link_graph: CMLinkGraphConfiguration
+    search_template_ttl: float
+    bookmarks: CMBookmarkWriteConfiguration
+    loan_pool: CMLoanPoolConfiguration
+    catalog_index: Optional[str]
+    search_terms: CMSearchTermsConfiguration
+    workload: CMWorkloadConfiguration
+    journey: CMJourneyConfiguration
+    replay: CMReplayConfiguration
+    instrumentation: CMInstrumentationConfiguration
+    request_names: CMRequestNamesConfiguration
+    histograms: CMHistogramConfiguration
+    http_cache: CMHTTPCacheConfiguration
+    connections: CMConnectionConfiguration
+    search_pagination: CMSearchPaginationConfiguration
+    reading_sync: CMReadingSyncConfiguration
 
     def __init__(
-        self, address: str, users: Dict[str, CMUser], library_identifiers: Set[str]
+        self,
+        address: str,
+        users: Dict[str, CMUser],
+        library_identifiers: Set[str],
+        session_ttl: float = 300.0,
+        user_assignment: Optional[CMUserAssignmentConfiguration] = None,
+        feed_walk: Optional[CMFeedWalkConfiguration] = None,
+        link_graph: Optional[CMLinkGraphConfiguration] = None,
+        search_template_ttl: float = 600.0,
+        bookmarks: Optional[CMBookmarkWriteConfiguration] = None,
+        loan_pool: Optional[CMLoanPoolConfiguration] = None,
+        catalog_index: Optional[str] = None,
+        search_terms: Optional[CMSearchTermsConfiguration] = None,
+        workload: Optional[CMWorkloadConfiguration] = None,
+        journey: Optional[CMJourneyConfiguration] = None,
+        replay: Optional[CMReplayConfiguration] = None,
+        instrumentation: Optional[CMInstrumentationConfiguration] = None,
+        request_names: Optional[CMRequestNamesConfiguration] = None,
+        histograms: Optional[CMHistogramConfiguration] = None,
+        http_cache: Optional[CMHTTPCacheConfiguration] = None,
+        connections: Optional[CMConnectionConfiguration] = None,
+        search_pagination: Optional[CMSearchPaginationConfiguration] = None,
+        reading_sync: Optional[CMReadingSyncConfiguration] = None,
     ):
         super().__init__()
         assert isinstance(address, str)
         assert isinstance(users, dict)
+        assert isinstance(session_ttl, (int, float))
         self.address = address
         self.users = users
         self.library_identifiers = library_identifiers
+        self.session_ttl = session_ttl
+        self.user_assignment = user_assignment or CMUserAssignmentConfiguration(
+            CMUserAssignmentPolicy.ROUND_ROBIN, []
+        )
+        self.feed_walk = feed_walk or CMFeedWalkConfiguration()
+        self.link_graph = link_graph or CMLinkGraphConfiguration()
+        self.search_template_ttl = search_template_ttl
+        self.bookmarks = bookmarks or CMBookmarkWriteConfiguration()
+        self.loan_pool = loan_pool or CMLoanPoolConfiguration()
+        self.catalog_index = catalog_index
+        self.search_terms = search_terms or CMSearchTermsConfiguration()
+        self.workload = workload or CMWorkloadConfiguration()
+        self.journey = journey or CMJourneyConfiguration()
+        self.replay = replay or CMReplayConfiguration()
+        self.instrumentation = instrumentation or CMInstrumentationConfiguration()
+        self.request_names = request_names or CMRequestNamesConfiguration()
+        self.histograms = histograms or CMHistogramConfiguration()
+        self.http_cache = http_cache or CMHTTPCacheConfiguration()
+        self.connections = connections or CMConnectionConfiguration()
+        self.search_pagination = search_pagination or CMSearchPaginationConfiguration()
+        self.reading_sync = reading_sync or CMReadingSyncConfiguration()
 
     def user_primary(self) -> CMUser:
         for name in self.users.keys():
@@ -69,6 +1443,15 @@ class CMConfiguration:
 
         raise ValueError("No users defined!")
 
+    @staticmethod
+    def _parse_seconds(data: Any, name: str, default: float) -> float:
+        value = data.get(name, default)
+        if not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(
+                "'" + name + "' must be a non-negative number (got " + str(value) + ")"
+            )
+        return value
+
     @staticmethod
     def parse(data: Any) -> "CMConfiguration":
         address = data["host"]
@@ -91,7 +1474,69 @@ class CMConfiguration:
         if not users_primary:
             raise ValueError("Exactly one primary user must be defined!")
 
-        return CMConfiguration(address, users, library_ids)
+        session_ttl = CMConfiguration._parse_seconds(data, "session_ttl_seconds", 300.0)
+        search_template_ttl = CMConfiguration._parse_seconds(
+            data, "search_template_ttl_seconds", 600.0
+        )
+
+        user_assignment = CMUserAssignmentConfiguration.parse(
+            data.get("user_assignment", {})
+        )
+
+        feed_walk = CMFeedWalkConfiguration.parse(data.get("feed_walk", {}))
+        link_graph = CMLinkGraphConfiguration.parse(data.get("link_graph", {}))
+        bookmarks = CMBookmarkWriteConfiguration.parse(data.get("bookmarks", {}))
+        loan_pool = CMLoanPoolConfiguration.parse(data.get("loan_pool", {}))
+
+        catalog_index = data.get("catalog_index")
+        if catalog_index is not None and not isinstance(catalog_index, str):
+            raise ValueError(
+                "'catalog_index' must be a file name (got " + str(catalog_index) + ")"
+            )
+
+        search_terms = CMSearchTermsConfiguration.parse(data.get("search_terms", {}))
+        workload = CMWorkloadConfiguration.parse(data.get("workload", {}))
+        # Journeys only run when they are configured.
+        journey = CMJourneyConfiguration()
+        if "journey" in data:
+            journey = CMJourneyConfiguration.parse(data["journey"])
+        replay = CMReplayConfiguration.parse(data.get("replay", {}))
+        instrumentation = CMInstrumentationConfiguration.parse(
+            data.get("instrumentation", {})
+        )
+        request_names = CMRequestNamesConfiguration.parse(data.get("request_names", {}))
+        histograms = CMHistogramConfiguration.parse(data.get("histograms", {}))
+        http_cache = CMHTTPCacheConfiguration.parse(data.get("http_cache", {}))
+        connections = CMConnectionConfiguration.parse(data.get("connections", {}))
+        search_pagination = CMSearchPaginationConfiguration.parse(
+            data.get("search_pagination", {})
+        )
+        reading_sync = CMReadingSyncConfiguration.parse(data.get("reading_sync", {}))
+
+        return CMConfiguration(
+            address,
+            users,
+            library_ids,
+            session_ttl,
+            user_assignment,
+            feed_walk,
+            link_graph,
+            search_template_ttl,
+            bookmarks,
+            loan_pool,
+            catalog_index,
+            search_terms,
+            workload,
+            journey,
+            replay,
+            instrumentation,
+            request_names,
+            histograms,
+            http_cache,
+            connections,
+            search_pagination,
+            reading_sync,
+        )
 
 
 class Configuration:
@@ -137,3 +1582,17 @@ class Configurations:
     @classmethod
     def clear(cls):
         cls._configuration = None
+
+
+class Configured:
+    """
+    A class attribute whose value is read from the configuration each time it is
+    used, rather than once when the class is defined, so that importing a module
+    that defines Locust users does not load the configuration file.
+    """
+
+    def __init__(self, read: Callable[[Configuration], Any]):
+        self.read = read
+
+    def __get__(self, instance: Any, owner: Any) -> Any:
+        return self.read(Configurations.get())
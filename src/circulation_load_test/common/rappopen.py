@@ -0,0 +1,284 @@
+import codecs
+import json
+import logging
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from gevent.pool import Pool
+
+from circulation_load_test.common.cmhttpcache import CMHTTPCache
+from circulation_load_test.common.cmuser import CMHTTPUser
+from circulation_load_test.common.config import (
+    Configurations,
+    RAppOpenConfiguration,
+    RDocumentFetch,
+)
+
+TYPE_AUTH_DOCUMENT = "application/vnd.opds.authentication.v1.0+json"
+
+# The number of bytes of the library list read at a time.
+CHUNK_SIZE = 64 * 1024
+
+_CATALOGS_START = re.compile(r'"catalogs"\s*:\s*\[')
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+class RCatalogStream:
+    """
+    Parses the catalogs of a registry's library list as the list arrives, so that
+    only the catalog being parsed and the current chunk are held in memory rather
+    than the whole document. Feed it the bytes of the document in chunks; each call
+    returns the catalogs that were completed by the chunk.
+    """
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._in_catalogs = False
+        self.finished = False
+        self.count = 0
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        self._buffer += self._text.decode(data)
+        return self._drain(final=False)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Parse the rest of the document, which must have completed the catalogs."""
+        self._buffer += self._text.decode(b"", final=True)
+        catalogs = self._drain(final=True)
+        if not self.finished:
+            raise ValueError("The library list has no complete 'catalogs' array")
+        return catalogs
+
+    def _drain(self, final: bool) -> List[Dict[str, Any]]:
+        catalogs: List[Dict[str, Any]] = []
+        if self.finished:
+            self._buffer = ""
+            return catalogs
+
+        if not self._in_catalogs:
+            match = _CATALOGS_START.search(self._buffer)
+            if match is None:
+                # Keep enough of the text for the key to be found if it is split.
+                self._buffer = self._buffer[-64:]
+                return catalogs
+            self._buffer = self._buffer[match.end() :]
+            self._in_catalogs = True
+
+        buffer = self._buffer
+        position = 0
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                self.finished = True
+                position = len(buffer)
+                break
+            try:
+                catalog, position = self._json.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if final:
+                    raise ValueError(f"Malformed catalog in the library list: {e}")
+                break
+            catalogs.append(catalog)
+        self._buffer = buffer[position:]
+        self.count += len(catalogs)
+        return catalogs
+
+    @staticmethod
+    def authentication_document(catalog: Dict[str, Any]) -> Optional[str]:
+        """The link to the authentication document of a catalog, if it has one."""
+        for link in catalog.get("links", ()):
+            if link.get("type") == TYPE_AUTH_DOCUMENT and "href" in link:
+                return link["href"]
+        return None
+
+
+class RAuthDocumentCache:
+    """
+    The authentication documents fetched by the users of a worker, as the app keeps
+    them between launches. A document fetched less than 'ttl' seconds ago is not
+    fetched again; an older one is revalidated with a conditional GET, so that an
+    unchanged document costs the registry's libraries a 304 rather than a download.
+    """
+
+    def __init__(self, ttl: float, maximum_bytes: int, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.http = CMHTTPCache(maximum_bytes)
+        self.fresh = 0
+        self._fetched: Dict[str, float] = {}
+
+    def fetch(self, user: CMHTTPUser, url: str, name: str):
+        fetched = self._fetched.get(url)
+        if fetched is not None and self.clock() - fetched < self.ttl:
+            self.fresh += 1
+            return
+        response = self.http.get(user, url, name)
+        if response.status_code == 200:
+            self._fetched[url] = self.clock()
+        else:
+            self._fetched.pop(url, None)
+
+
+class RAuthDocumentCaches:
+    """
+    The worker-wide authentication document cache. This is None unless the
+    configuration gives documents a TTL.
+    """
+
+    _cache: Optional[RAuthDocumentCache] = None
+    _initialized: bool = False
+
+    @classmethod
+    def get(cls) -> Optional[RAuthDocumentCache]:
+        if cls._initialized:
+            return cls._cache
+        config = Configurations.get().registry.app_open
+        if config.document_ttl > 0:
+            cls._cache = RAuthDocumentCache(
+                config.document_ttl, config.document_cache_bytes
+            )
+        else:
+            cls._cache = None
+        cls._initialized = True
+        return cls._cache
+
+    @classmethod
+    def clear(cls):
+        cls._cache = None
+        cls._initialized = False
+
+
+class RAppOpen:
+    """
+    Simulates the registry traffic of a patron opening the app: the library list is
+    fetched and parsed as it arrives, and then authentication documents are fetched
+    with up to 'pool_size' requests in flight. With 'all', every listed library's
+    document is fetched, as on a first launch; with 'nearby', only the first
+    'nearby' libraries' documents, as shown in the library picker; with 'selected',
+    only the documents of the 'selected' libraries that the user chose on its first
+    launch. The time taken to receive and parse the library list is reported to
+    Locust as a "registry" request named "libraries".
+    """
+
+    def __init__(self, config: RAppOpenConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @staticmethod
+    def document_name(url: str) -> str:
+        return f"{urlparse(url).hostname}/[library]/authentication_document"
+
+    def execute(self, user: CMHTTPUser, selected: List[str]):
+        """
+        Open the app. 'selected' holds the documents of the libraries that the user
+        has chosen; it is filled in on the first launch.
+        """
+        documents = self.libraries(user, selected)
+        cache = RAuthDocumentCaches.get()
+        pool = Pool(size=self.config.pool_size)
+        for href in documents:
+            pool.spawn(self.fetch, user, cache, href)
+        pool.join()
+
+    def fetch(self, user: CMHTTPUser, cache: Optional[RAuthDocumentCache], url: str):
+        name = self.document_name(url)
+        if cache is None:
+            user.client.get(url, name=name)
+        else:
+            cache.fetch(user, url, name)
+
+    def libraries(self, user: CMHTTPUser, selected: List[str]) -> List[str]:
+        """
+        Fetch the library list, returning the authentication documents to fetch.
+        """
+        config = self.config
+        documents: List[str] = []
+        seen = 0
+        choose = config.fetch == RDocumentFetch.SELECTED and not selected
+
+        def visit(catalog: Dict[str, Any]):
+            nonlocal seen
+            href = RCatalogStream.authentication_document(catalog)
+            if href is None:
+                return
+            seen += 1
+            if config.fetch == RDocumentFetch.ALL:
+                documents.append(href)
+            elif config.fetch == RDocumentFetch.NEARBY:
+                if len(documents) < config.nearby:
+                    documents.append(href)
+            elif choose:
+                # Choose the user's libraries uniformly with reservoir sampling.
+                if len(documents) < config.selected:
+                    documents.append(href)
+                else:
+                    index = random.randrange(seen)
+                    if index < config.selected:
+                        documents[index] = href
+
+        start = time.perf_counter()
+        received = 0
+        exception: Optional[Exception] = None
+        try:
+            received = self._stream(user, visit)
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            user.environment.events.request.fire(
+                request_type="registry",
+                name="libraries",
+                response_time=(time.perf_counter() - start) * 1000.0,
+                response_length=received,
+                exception=exception,
+                context={},
+            )
+
+        if config.fetch != RDocumentFetch.SELECTED:
+            return documents
+        if choose:
+            selected.extend(documents)
+        return list(selected)
+
+    @staticmethod
+    def _stream(user: CMHTTPUser, visit) -> int:
+        # Brotli cannot be decompressed incrementally with the standard library.
+        response = user.client.get(
+            "/libraries",
+            name="/libraries",
+            stream=True,
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        response.raise_for_status()
+
+        encoding = (response.headers.get("content-encoding") or "identity").lower()
+        decompressor = (
+            zlib.decompressobj(zlib.MAX_WBITS | 32)
+            if encoding in {"gzip", "deflate"}
+            else None
+        )
+        stream = RCatalogStream()
+        received = 0
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            for catalog in stream.feed(chunk):
+                visit(catalog)
+        if decompressor is not None:
+            for catalog in stream.feed(decompressor.flush()):
+                visit(catalog)
+        for catalog in stream.close():
+            visit(catalog)
+        return received
@@ -1,23 +1,40 @@
 import os
-import random
 from pathlib import Path
-from typing import List
+from typing import Optional
+
+from circulation_load_test.common.cmterms import CMQueryGenerator
+from circulation_load_test.common.config import Configurations
+
+DEFAULT_CORPUS = os.path.join(Path(__file__).parent, "words.txt")
 
 
 class Words:
-    """Access to random english words."""
+    """
+    Access to random search queries, drawn from the configured term corpus. The
+    corpus is loaded by the first query, unless it is preloaded.
+    """
 
-    _words: List[str] = []
+    _generator: Optional[CMQueryGenerator] = None
 
     @classmethod
-    def _initialize(cls):
-        if cls._words == []:
-            file = os.path.join(Path(__file__).parent, "words.txt")
-            with open(file) as f:
-                cls._words = f.readlines()
-                random.shuffle(cls._words)
+    def _initialize(cls) -> CMQueryGenerator:
+        if cls._generator is None:
+            config = Configurations.get().circulation_manager.search_terms
+            cls._generator = CMQueryGenerator.create(config, DEFAULT_CORPUS)
+        return cls._generator
 
     @classmethod
     def get(cls) -> str:
+        return cls._initialize().query()
+
+    @classmethod
+    def preload(cls):
+        """
+        Load the corpus now. When this is done before Locust forks its worker
+        processes, the processes share one copy of the corpus.
+        """
         cls._initialize()
-        return random.choice(cls._words)
+
+    @classmethod
+    def clear(cls):
+        cls._generator = None
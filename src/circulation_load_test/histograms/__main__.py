@@ -0,0 +1,69 @@
+import argparse
+from typing import Dict, List, Optional
+
+from circulation_load_test.common.cmhistogram import (
+    PERCENTILES,
+    CMHistogram,
+    export_totals,
+    summarize,
+)
+
+
+def _columns() -> List[str]:
+    return ["count", "mean_ms"] + [f"p{p:g}_ms" for p in PERCENTILES] + ["max_ms"]
+
+
+def _format(value: float, baseline: Optional[float]) -> str:
+    text = f"{value:g}"
+    if baseline is None:
+        return text
+    if baseline == 0:
+        return text + " (new)"
+    return text + f" ({(value - baseline) * 100.0 / baseline:+.1f}%)"
+
+
+def report(run: Dict[str, CMHistogram], baseline: Dict[str, CMHistogram]) -> str:
+    """
+    A table of the percentiles of each endpoint of a run, with the change from a
+    baseline run if one is given.
+    """
+    columns = _columns()
+    rows = [["name"] + columns]
+    for name in sorted(set(run) | set(baseline)):
+        current = summarize(run[name]) if name in run else None
+        previous = summarize(baseline[name]) if name in baseline else None
+        row = [name]
+        for column in columns:
+            if current is None:
+                row.append("-")
+                continue
+            before = previous[column] if previous is not None else None
+            row.append(_format(current[column], before))
+        rows.append(row)
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns) + 1)]
+    lines = []
+    for row in rows:
+        cells = [row[0].ljust(widths[0])]
+        cells.extend(cell.rjust(width) for cell, width in zip(row[1:], widths[1:]))
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m circulation_load_test.histograms",
+        description="Report the latency percentiles of a histogram export.",
+    )
+    parser.add_argument("export", help="The histogram export of the run to report")
+    parser.add_argument(
+        "baseline", nargs="?", help="The histogram export of a run to compare against"
+    )
+    args = parser.parse_args()
+
+    baseline = export_totals(args.baseline) if args.baseline else {}
+    print(report(export_totals(args.export), baseline))
+
+
+if __name__ == "__main__":
+    main()
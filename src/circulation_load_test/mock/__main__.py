@@ -0,0 +1,73 @@
+import argparse
+
+from circulation_load_test.mock.server import CMMockSettings, serve
+
+
+def main():
+    defaults = CMMockSettings()
+    parser = argparse.ArgumentParser(
+        prog="python -m circulation_load_test.mock",
+        description="Serve a mock Circulation Manager and Library Registry.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6500)
+    parser.add_argument(
+        "--libraries",
+        default=",".join(defaults.libraries),
+        help="Comma-separated library identifiers; the first is the default library",
+    )
+    parser.add_argument("--lanes", type=int, default=defaults.lanes)
+    parser.add_argument(
+        "--feed-entries",
+        type=int,
+        default=defaults.feed_entries,
+        help="Entries per feed page",
+    )
+    parser.add_argument(
+        "--search-pages",
+        type=int,
+        default=defaults.search_pages,
+        help="Pages of results returned for every search",
+    )
+    parser.add_argument(
+        "--borrowable-fraction",
+        type=float,
+        default=defaults.borrowable_fraction,
+        help="Fraction of entries that have a borrow link",
+    )
+    parser.add_argument(
+        "--registry-libraries",
+        type=int,
+        default=defaults.registry_libraries,
+        help="Catalogs listed by the registry",
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=defaults.latency_ms,
+        help="Delay added to every response",
+    )
+    parser.add_argument(
+        "--latency-jitter-ms",
+        type=float,
+        default=defaults.latency_jitter_ms,
+        help="Maximum random delay added on top of --latency-ms",
+    )
+    args = parser.parse_args()
+
+    settings = CMMockSettings(
+        libraries=[id.strip() for id in args.libraries.split(",") if id.strip()],
+        lanes=args.lanes,
+        feed_entries=args.feed_entries,
+        search_pages=args.search_pages,
+        borrowable_fraction=args.borrowable_fraction,
+        registry_libraries=args.registry_libraries,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+    )
+    print(f"Serving on http://{args.host}:{args.port}/")
+    serve(settings, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
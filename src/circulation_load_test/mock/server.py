@@ -0,0 +1,413 @@
+import json
+import random
+import zlib
+from base64 import b64decode
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, quote
+from xml.sax.saxutils import escape
+
+import gevent
+
+TYPE_ATOM_FEED = "application/atom+xml;profile=opds-catalog;kind=acquisition"
+TYPE_ATOM_NAVIGATION = "application/atom+xml;profile=opds-catalog;kind=navigation"
+TYPE_ATOM_ENTRY = "application/atom+xml;type=entry;profile=opds-catalog"
+TYPE_AUTH_DOCUMENT = "application/vnd.opds.authentication.v1.0+json"
+TYPE_OPENSEARCH = "application/opensearchdescription+xml"
+TYPE_PROFILE = "vnd.librarysimplified/user-profile+json"
+TYPE_ANNOTATIONS = 'application/ld+json; profile="http://www.w3.org/ns/anno.jsonld"'
+TYPE_REGISTRY = "application/opds+json"
+
+_TYPE_ANNOTATIONS_ATTRIBUTE = escape(TYPE_ANNOTATIONS, {'"': "&quot;"})
+
+REL_AUTH_DOCUMENT = "http://opds-spec.org/auth/document"
+REL_BORROW = "http://opds-spec.org/acquisition/borrow"
+REL_REVOKE = "http://librarysimplified.org/terms/rel/revoke"
+REL_USER_PROFILE = "http://librarysimplified.org/terms/rel/user-profile"
+REL_ANNOTATION_SERVICE = "http://www.w3.org/ns/oa#annotationService"
+
+OPDS_NS = "http://opds-spec.org/2010/catalog"
+
+# The media types of the books in the catalog, chosen by work number.
+MEDIA_TYPES = [
+    "application/epub+zip",
+    "application/pdf",
+    "application/audiobook+json",
+]
+
+Response = Tuple[int, str, bytes]
+StartResponse = Callable[[str, List[Tuple[str, str]]], object]
+
+
+@dataclass
+class CMMockSettings:
+    """The shape of the catalog served by the mock server."""
+
+    libraries: List[str] = field(default_factory=lambda: ["HAZELNUT", "WALNUT"])
+    lanes: int = 10
+    feed_entries: int = 20
+    search_pages: int = 5
+    borrowable_fraction: float = 1.0
+    registry_libraries: int = 100
+    annotations_kept: int = 100
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+
+
+def _status(code: int) -> str:
+    return {
+        200: "200 OK",
+        201: "201 Created",
+        304: "304 Not Modified",
+        400: "400 Bad Request",
+        401: "401 Unauthorized",
+        404: "404 Not Found",
+        405: "405 Method Not Allowed",
+    }[code]
+
+
+class CMMockServer:
+    """
+    A WSGI application that imitates the parts of a Circulation Manager and a Library
+    Registry that the load tests use. The catalog is synthetic: every library has the
+    same configurable number of lanes, feed sizes and search result pages, and every
+    request may be delayed by a configurable latency. Any credentials are accepted,
+    but endpoints that require authentication reject requests without credentials.
+    """
+
+    def __init__(self, settings: CMMockSettings):
+        assert isinstance(settings, CMMockSettings)
+        assert len(settings.libraries) > 0
+        self.settings = settings
+        self._annotations: Dict[Tuple[str, str], List[dict]] = {}
+        self._render_feed = lru_cache(maxsize=4096)(self._render_feed_uncached)
+
+    def __call__(self, environ: dict, start_response: StartResponse) -> Iterable[bytes]:
+        settings = self.settings
+        if settings.latency_ms > 0 or settings.latency_jitter_ms > 0:
+            delay = settings.latency_ms + random.uniform(0, settings.latency_jitter_ms)
+            gevent.sleep(delay / 1000.0)
+
+        code, content_type, body = self.handle(environ)
+        headers = [("Content-Type", content_type)]
+        if code == 401:
+            headers.append(("WWW-Authenticate", 'Basic realm="Library card"'))
+        if code == 200 and environ.get("REQUEST_METHOD", "GET") == "GET":
+            # Responses are validated by a hash of their content, so that clients
+            # that revalidate their caches receive 304 until the content changes.
+            etag = f'"{zlib.crc32(body):08x}"'
+            headers.append(("ETag", etag))
+            if etag in environ.get("HTTP_IF_NONE_MATCH", ""):
+                code, body = 304, b""
+        headers.append(("Content-Length", str(len(body))))
+        start_response(_status(code), headers)
+        return [body]
+
+    def handle(self, environ: dict) -> Response:
+        method = environ.get("REQUEST_METHOD", "GET")
+        path = [
+            segment for segment in environ.get("PATH_INFO", "/").split("/") if segment
+        ]
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        base = self._base(environ)
+
+        if path == ["libraries"]:
+            return 200, TYPE_REGISTRY, self._render_registry(base)
+
+        if not path:
+            library = self.settings.libraries[0]
+            rest: List[str] = []
+        elif path[0] in self.settings.libraries:
+            library = path[0]
+            rest = path[1:]
+        else:
+            return 404, "text/plain", b"Not found"
+
+        root = f"{base}/{library}"
+        if not rest or rest == ["groups"]:
+            return 200, TYPE_ATOM_NAVIGATION, self._render_feed(root, "groups", 0, "")
+        if rest[0] == "groups" and len(rest) == 2:
+            return 200, TYPE_ATOM_FEED, self._render_feed(root, rest[1], 0, "")
+        if rest == ["authentication_document"]:
+            return 200, TYPE_AUTH_DOCUMENT, self._render_auth_document(root, library)
+        if rest == ["search"]:
+            return self._search(root, query)
+        if rest[0] == "works" and len(rest) >= 2:
+            return self._work(environ, root, rest[1], rest[2:])
+
+        if rest[0] not in {"patrons", "loans", "annotations"}:
+            return 404, "text/plain", b"Not found"
+        patron = self._patron(environ)
+        if patron is None:
+            return 401, "application/problem+json", b'{"status": 401}'
+
+        if rest == ["patrons", "me"]:
+            if method == "PUT":
+                return 200, "text/plain", b""
+            settings = {"settings": {"simplified:synchronize_annotations": True}}
+            return 200, TYPE_PROFILE, json.dumps(settings).encode("utf-8")
+        if rest == ["loans"]:
+            return 200, TYPE_ATOM_FEED, self._render_shelf(root)
+        if rest[0] == "loans" and len(rest) == 3 and rest[2] == "revoke":
+            return 200, TYPE_ATOM_ENTRY, self._render_entry_document(root, rest[1])
+        if rest[0] == "annotations":
+            return self._annotations_endpoint(environ, root, library, patron)
+
+        return 404, "text/plain", b"Not found"
+
+    @staticmethod
+    def _base(environ: dict) -> str:
+        scheme = environ.get("wsgi.url_scheme", "http")
+        host = environ.get("HTTP_HOST") or (
+            f"{environ.get('SERVER_NAME', 'localhost')}:"
+            f"{environ.get('SERVER_PORT', '80')}"
+        )
+        return f"{scheme}://{host}"
+
+    @staticmethod
+    def _patron(environ: dict) -> Optional[str]:
+        header = environ.get("HTTP_AUTHORIZATION", "")
+        if not header.startswith("Basic "):
+            return None
+        try:
+            decoded = b64decode(header[6:]).decode("utf-8")
+        except ValueError:
+            return None
+        return decoded.partition(":")[0] or None
+
+    def _search(self, root: str, query: Dict[str, List[str]]) -> Response:
+        terms = query.get("q")
+        if not terms:
+            return 200, TYPE_OPENSEARCH, self._render_opensearch(root)
+        try:
+            after = int(query.get("after", ["0"])[0])
+        except ValueError:
+            return 400, "application/problem+json", b'{"status": 400}'
+        page = after // max(1, self.settings.feed_entries)
+        term = terms[0]
+        return 200, TYPE_ATOM_FEED, self._render_feed(root, "search", page, term)
+
+    def _work(self, environ: dict, root: str, work: str, rest: List[str]) -> Response:
+        if not rest:
+            return 200, TYPE_ATOM_ENTRY, self._render_entry_document(root, work)
+        if rest == ["related_books"]:
+            return (
+                200,
+                TYPE_ATOM_FEED,
+                self._render_feed(root, f"related-{work}", 0, ""),
+            )
+        if rest == ["borrow"]:
+            if self._patron(environ) is None:
+                return 401, "application/problem+json", b'{"status": 401}'
+            return 201, TYPE_ATOM_ENTRY, self._render_entry_document(root, work)
+        return 404, "text/plain", b"Not found"
+
+    def _annotations_endpoint(
+        self, environ: dict, root: str, library: str, patron: str
+    ) -> Response:
+        key = (library, patron)
+        annotations = self._annotations.setdefault(key, [])
+        method = environ.get("REQUEST_METHOD", "GET")
+        if method == "POST":
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            try:
+                annotation = json.loads(environ["wsgi.input"].read(length))
+            except ValueError:
+                return 400, "application/problem+json", b'{"status": 400}'
+            if not isinstance(annotation, dict) or "target" not in annotation:
+                return 400, "application/problem+json", b'{"status": 400}'
+
+            motivation = annotation.get("motivation")
+            source = annotation["target"].get("source")
+            if motivation == "http://www.w3.org/ns/oa#idling":
+                # Reading positions are upserted: there is one per patron and book.
+                annotations[:] = [
+                    a
+                    for a in annotations
+                    if not (
+                        a.get("motivation") == motivation
+                        and a["target"].get("source") == source
+                    )
+                ]
+            annotation["id"] = f"{root}/annotations/{random.getrandbits(48)}"
+            annotations.append(annotation)
+            del annotations[: -self.settings.annotations_kept]
+            return 200, TYPE_ANNOTATIONS, json.dumps(annotation).encode("utf-8")
+        if method == "GET":
+            url = f"{root}/annotations/"
+            collection = {
+                "@context": [
+                    "http://www.w3.org/ns/anno.jsonld",
+                    "http://www.w3.org/ns/ldp.jsonld",
+                ],
+                "id": url,
+                "type": ["BasicContainer", "AnnotationCollection"],
+                "total": len(annotations),
+                "first": {"type": "AnnotationPage", "id": url, "items": annotations},
+            }
+            return 200, TYPE_ANNOTATIONS, json.dumps(collection).encode("utf-8")
+        return 405, "text/plain", b"Method not allowed"
+
+    def _render_registry(self, base: str) -> bytes:
+        catalogs = []
+        libraries = self.settings.libraries
+        for index in range(self.settings.registry_libraries):
+            library = libraries[index % len(libraries)]
+            catalogs.append(
+                {
+                    "metadata": {
+                        "id": f"urn:uuid:{index:08d}-0000-0000-0000-000000000000",
+                        "title": f"{library} {index}",
+                    },
+                    "links": [
+                        {
+                            "href": f"{base}/{library}/authentication_document",
+                            "rel": REL_AUTH_DOCUMENT,
+                            "type": TYPE_AUTH_DOCUMENT,
+                        },
+                        {"href": f"{base}/{library}/", "rel": "start"},
+                    ],
+                }
+            )
+        return json.dumps({"catalogs": catalogs}).encode("utf-8")
+
+    @staticmethod
+    def _render_auth_document(root: str, library: str) -> bytes:
+        document = {
+            "id": f"{root}/authentication_document",
+            "title": library,
+            "authentication": [
+                {
+                    "type": "http://opds-spec.org/auth/basic",
+                    "description": "Library Barcode",
+                    "labels": {"login": "Barcode", "password": "PIN"},
+                }
+            ],
+            "links": [
+                {"rel": "start", "href": f"{root}/", "type": TYPE_ATOM_NAVIGATION},
+                {
+                    "rel": "http://opds-spec.org/shelf",
+                    "href": f"{root}/loans/",
+                    "type": TYPE_ATOM_FEED,
+                },
+                {
+                    "rel": REL_USER_PROFILE,
+                    "href": f"{root}/patrons/me/",
+                    "type": TYPE_PROFILE,
+                },
+            ],
+        }
+        return json.dumps(document).encode("utf-8")
+
+    @staticmethod
+    def _render_opensearch(root: str) -> bytes:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<OpenSearchDescription xmlns="http://a9.com/-/spec/opensearch/1.1/">'
+            "<ShortName>Search</ShortName>"
+            "<Description>Search</Description>"
+            f'<Url type="{TYPE_ATOM_FEED}" '
+            f'template="{root}/search/?entrypoint=All&amp;q={{searchTerms}}"/>'
+            "</OpenSearchDescription>"
+        ).encode("utf-8")
+
+    def _feed_links(self, root: str, self_url: str) -> List[str]:
+        return [
+            f'<link rel="self" href="{escape(self_url)}"/>',
+            f'<link rel="start" href="{root}/"/>',
+            f'<link rel="search" href="{root}/search/?entrypoint=All" '
+            f'type="{TYPE_OPENSEARCH}"/>',
+            f'<link rel="{REL_AUTH_DOCUMENT}" href="{root}/authentication_document" '
+            f'type="{TYPE_AUTH_DOCUMENT}"/>',
+        ]
+
+    def _render_entry(self, root: str, work: str, borrowable: bool) -> str:
+        lane = int(work) % max(1, self.settings.lanes)
+        links = [
+            f'<link rel="alternate" href="{root}/works/{work}" '
+            f'type="{TYPE_ATOM_ENTRY}"/>',
+            f'<link rel="related" href="{root}/works/{work}/related_books" '
+            f'type="{TYPE_ATOM_FEED}"/>',
+            f'<link rel="collection" href="{root}/groups/{lane}" title="Lane {lane}"/>',
+        ]
+        if borrowable:
+            media_type = MEDIA_TYPES[int(work) % len(MEDIA_TYPES)]
+            links.append(
+                f'<link rel="{REL_BORROW}" href="{root}/works/{work}/borrow" '
+                f'type="{TYPE_ATOM_ENTRY}">'
+                f'<opds:indirectAcquisition type="{media_type}"/></link>'
+            )
+        return (
+            f"<entry><id>urn:librarysimplified.org/terms/id/Mock/{work}</id>"
+            f"<title>Book {work}</title>"
+            f"<author><name>Author {int(work) % 997}</name></author>"
+            "<updated>2023-01-01T00:00:00Z</updated>"
+            f"{''.join(links)}</entry>"
+        )
+
+    def _render_feed_uncached(
+        self, root: str, lane: str, page: int, term: str
+    ) -> bytes:
+        settings = self.settings
+        size = settings.feed_entries
+        seed = sum(lane.encode("utf-8")) + sum(term.encode("utf-8")) * 31
+        if lane == "search":
+            self_url = (
+                f"{root}/search/?entrypoint=All&q={quote(term)}&after={page * size}"
+            )
+        else:
+            self_url = f"{root}/groups/{lane}"
+
+        links = self._feed_links(root, self_url)
+        if lane == "search" and page + 1 < settings.search_pages:
+            after = (page + 1) * size
+            next_url = f"{root}/search/?entrypoint=All&q={quote(term)}&after={after}"
+            links.append(f'<link rel="next" href="{escape(next_url)}"/>')
+
+        entries = []
+        generator = random.Random(seed * 7919 + page)
+        for index in range(size):
+            work = str((seed * 1009 + page * size + index) % 1000003)
+            borrowable = generator.random() < settings.borrowable_fraction
+            entries.append(self._render_entry(root, work, borrowable))
+
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" '
+            f'xmlns:opds="{OPDS_NS}">'
+            f"<id>{escape(self_url)}</id><title>{escape(lane)}</title>"
+            "<updated>2023-01-01T00:00:00Z</updated>"
+            f"{''.join(links)}{''.join(entries)}</feed>"
+        ).encode("utf-8")
+
+    @staticmethod
+    def _render_entry_document(root: str, work: str) -> bytes:
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<entry xmlns="http://www.w3.org/2005/Atom">'
+            f"<id>urn:librarysimplified.org/terms/id/Mock/{work}</id>"
+            f"<title>Book {work}</title><updated>2023-01-01T00:00:00Z</updated>"
+            f'<link rel="{REL_REVOKE}" href="{root}/loans/{work}/revoke"/>'
+            "</entry>"
+        ).encode("utf-8")
+
+    def _render_shelf(self, root: str) -> bytes:
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<id>{root}/loans/</id><title>Active loans and holds</title>"
+            "<updated>2023-01-01T00:00:00Z</updated>"
+            f'<link rel="self" href="{root}/loans/"/>'
+            f'<link rel="{REL_ANNOTATION_SERVICE}" href="{root}/annotations/" '
+            f'type="{_TYPE_ANNOTATIONS_ATTRIBUTE}"/>'
+            "</feed>"
+        ).encode("utf-8")
+
+
+def serve(settings: CMMockSettings, host: str, port: int):
+    """Serve the mock application until interrupted."""
+    from gevent.pywsgi import WSGIServer
+
+    server = WSGIServer((host, port), CMMockServer(settings), log=None)
+    server.serve_forever()
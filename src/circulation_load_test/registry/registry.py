@@ -1,20 +1,22 @@
-from urllib.parse import urlparse
+from typing import List
 
-from gevent.pool import Pool
 from locust import task
+from locust.env import Environment
 
 from circulation_load_test.common.cmuser import CMHTTPUser
-from circulation_load_test.common.config import Configurations
+from circulation_load_test.common.cmworkload import CMWorkload
+from circulation_load_test.common.config import Configurations, Configured
+from circulation_load_test.common.rappopen import RAppOpen
 
 
 class RegistryTests(CMHTTPUser):
 
-    host = Configurations.get().registry.address
+    host = Configured(lambda config: config.registry.address.rstrip("/"))
 
-    def fetch(self, url):
-        parsed = urlparse(url)
-        name = f"{parsed.hostname}/[library]/authentication_document"
-        self.client.get(url, name=name)
+    def __init__(self, environment: Environment):
+        super().__init__(environment)
+        self.app_open = RAppOpen(Configurations.get().registry.app_open)
+        self.selected_libraries: List[str] = []
 
     @task
     def first_open_app(self):
@@ -23,22 +25,7 @@ class RegistryTests(CMHTTPUser):
         after the cache has expired. Based on testing with iOS app version 1.0.25
         using MITMProxy to see what requests are made.
         """
-        response = self.client.get("/libraries")
-        json = response.json()
-        if "catalogs" not in json:
-            response.failure("No catalogs key")
-
-        authentication_documents = []
-        for catalog in json["catalogs"]:
-            for link in catalog["links"]:
-                if (
-                    "type" in link
-                    and link["type"] == "application/vnd.opds.authentication.v1.0+json"
-                ):
-                    authentication_documents.append(link["href"])
-
-        # Concurrently fetch 10 documents at once
-        pool = Pool(size=10)
-        for href in authentication_documents:
-            pool.spawn(self.fetch, href)
-        pool.join()
+        self.app_open.execute(self, self.selected_libraries)
+
+
+CMWorkload.apply_on_init(RegistryTests, lambda: Configurations.get().registry.workload)
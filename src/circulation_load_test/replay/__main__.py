@@ -0,0 +1,68 @@
+import argparse
+import gzip
+import json
+import sys
+from typing import IO
+
+from circulation_load_test.replay.importer import (
+    CMAccessLogFormat,
+    CMAccessLogImporter,
+    CMAccessLogParser,
+)
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m circulation_load_test.replay",
+        description="Convert an nginx or ALB access log into a replay log.",
+    )
+    parser.add_argument(
+        "input", help="The access log to read ('-' for standard input, or .gz)"
+    )
+    parser.add_argument(
+        "output", help="The replay log to write ('-' for standard output, or .gz)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=[format.value for format in CMAccessLogFormat],
+        default=CMAccessLogFormat.NGINX.value,
+        help="The format of the access log",
+    )
+    parser.add_argument(
+        "--reorder-window",
+        type=float,
+        default=60.0,
+        help="Seconds by which log entries may be out of order",
+    )
+    args = parser.parse_args()
+
+    importer = CMAccessLogImporter(
+        CMAccessLogParser(CMAccessLogFormat(args.format)), args.reorder_window
+    )
+    source = _open(args.input, "r")
+    target = _open(args.output, "w")
+    try:
+        for record in importer.convert(source):
+            target.write(json.dumps(record.to_json_dict(), separators=(",", ":")))
+            target.write("\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print(
+        f"Imported {importer.imported} requests ({importer.skipped} lines skipped)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
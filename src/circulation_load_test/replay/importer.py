@@ -0,0 +1,159 @@
+import hashlib
+import heapq
+import itertools
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from circulation_load_test.common.cmreplay import AUTHORIZATION_TEMPLATE, CMReplayRecord
+
+# Paths at which the CM requires patron credentials.
+AUTHENTICATED_PATH = re.compile(
+    r"/(loans|patrons|annotations|borrow|fulfill|revoke)(/|\?|$)"
+)
+
+# The nginx "combined" log format.
+NGINX_PATTERN = re.compile(
+    r'(?P<client>\S+) \S+ (?P<user>\S+) \[(?P<time>[^\]]+)\] "(?P<request>[^"]*)" '
+    r'\d{3} \S+ "[^"]*" "(?P<agent>[^"]*)"'
+)
+
+# The AWS Application Load Balancer access log format, up to the user agent.
+ALB_PATTERN = re.compile(
+    r"\S+ (?P<time>\S+) \S+ (?P<client>[^:\s]+):\d+ \S+ \S+ \S+ \S+ \S+ \S+ \S+ \S+ "
+    r'"(?P<request>[^"]*)" "(?P<agent>[^"]*)"'
+)
+
+
+class CMAccessLogFormat(Enum):
+    NGINX = "nginx"
+    ALB = "alb"
+
+
+@dataclass
+class CMAccessLogEntry:
+    time: float
+    method: str
+    path: str
+    client: str
+    user: Optional[str]
+    agent: str
+
+
+class CMAccessLogParser:
+    """Parses the lines of nginx or ALB access logs."""
+
+    def __init__(self, format: CMAccessLogFormat):
+        assert isinstance(format, CMAccessLogFormat)
+        self.format = format
+        if format == CMAccessLogFormat.NGINX:
+            self._pattern = NGINX_PATTERN
+        else:
+            self._pattern = ALB_PATTERN
+
+    def _time(self, text: str) -> float:
+        if self.format == CMAccessLogFormat.NGINX:
+            return datetime.strptime(text, "%d/%b/%Y:%H:%M:%S %z").timestamp()
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+
+    def parse(self, line: str) -> Optional[CMAccessLogEntry]:
+        """Parse a line, returning None if it is not a well-formed request."""
+        match = self._pattern.match(line)
+        if match is None:
+            return None
+        parts = match.group("request").split(" ")
+        if len(parts) != 3:
+            return None
+        method, target, _ = parts
+
+        # ALB logs record the absolute URL, and nginx logs of proxied requests may.
+        if not target.startswith("/"):
+            url = urlsplit(target)
+            if not url.scheme:
+                return None
+            target = (url.path or "/") + (f"?{url.query}" if url.query else "")
+
+        try:
+            moment = self._time(match.group("time"))
+        except ValueError:
+            return None
+
+        user = match.groupdict().get("user")
+        return CMAccessLogEntry(
+            time=moment,
+            method=method.upper(),
+            path=target,
+            client=match.group("client"),
+            user=user if user and user != "-" else None,
+            agent=match.group("agent"),
+        )
+
+
+class CMAccessLogImporter:
+    """
+    Converts access log entries to replay records. Each record's time is relative to
+    the first request in the log, and its patron is a hash of the authenticated user
+    name, or of the client address and user agent. Requests to paths that require
+    credentials get an Authorization header that is filled in with the credentials of
+    the replaying patron. Access logs do not record request bodies.
+
+    Access logs are written in order of completion rather than arrival, so entries are
+    held back for 'reorder_window' seconds and released in order of time. Entries that
+    arrive later than that are moved to the time of the last released entry.
+    """
+
+    def __init__(self, parser: CMAccessLogParser, reorder_window: float = 60.0):
+        assert reorder_window >= 0
+        self.parser = parser
+        self.reorder_window = reorder_window
+        self.imported = 0
+        self.skipped = 0
+
+    @staticmethod
+    def patron(entry: CMAccessLogEntry) -> str:
+        key = entry.user if entry.user is not None else f"{entry.client} {entry.agent}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def _record(self, entry: CMAccessLogEntry, moment: float) -> CMReplayRecord:
+        headers = {}
+        if entry.user is not None or AUTHENTICATED_PATH.search(entry.path):
+            headers["Authorization"] = AUTHORIZATION_TEMPLATE
+        return CMReplayRecord(
+            time=round(moment, 6),
+            method=entry.method,
+            path=entry.path,
+            headers=headers,
+            patron=self.patron(entry),
+        )
+
+    def convert(self, lines: Iterable[str]) -> Iterator[CMReplayRecord]:
+        pending: List[Tuple[float, int, CMAccessLogEntry]] = []
+        sequence = itertools.count()
+        start: Optional[float] = None
+        last = 0.0
+
+        def release(entry_time: float, entry: CMAccessLogEntry) -> CMReplayRecord:
+            nonlocal start, last
+            if start is None:
+                start = entry_time
+            last = max(last, entry_time - start)
+            self.imported += 1
+            return self._record(entry, last)
+
+        for line in lines:
+            entry = self.parser.parse(line)
+            if entry is None:
+                if line.strip():
+                    self.skipped += 1
+                continue
+            heapq.heappush(pending, (entry.time, next(sequence), entry))
+            while pending and pending[0][0] < entry.time - self.reorder_window:
+                entry_time, _, ready = heapq.heappop(pending)
+                yield release(entry_time, ready)
+
+        while pending:
+            entry_time, _, ready = heapq.heappop(pending)
+            yield release(entry_time, ready)
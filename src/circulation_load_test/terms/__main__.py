@@ -0,0 +1,35 @@
+import argparse
+
+from circulation_load_test.common.cmterms import CMTermCorpus
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m circulation_load_test.terms",
+        description=(
+            "Compile a search term corpus into the binary format, with precomputed "
+            "sampling tables."
+        ),
+    )
+    parser.add_argument(
+        "input",
+        help="A text file of terms, one per line, each optionally followed by a tab "
+        "and its frequency",
+    )
+    parser.add_argument("output", help="The binary corpus file to write")
+    parser.add_argument(
+        "--zipf-exponent",
+        type=float,
+        help="Replace the frequencies with a Zipf distribution over their ranks",
+    )
+    args = parser.parse_args()
+
+    corpus = CMTermCorpus.load(args.input)
+    if args.zipf_exponent is not None:
+        corpus = corpus.with_zipf(args.zipf_exponent)
+    corpus.compile(args.output)
+    print(f"Wrote {len(corpus)} terms to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from circulation_load_test.common.cmcatalog import CMCatalogs
+from circulation_load_test.common.cmhistogram import CMHistograms
+from circulation_load_test.common.cmhttpcache import CMHTTPCaches
+from circulation_load_test.common.cminstrumentation import CMInstrumentations
+from circulation_load_test.common.cmlinkgraph import CMLinkGraphs
+from circulation_load_test.common.cmloanpool import CMLoanPools
+from circulation_load_test.common.cmopensearch import CMSearchTemplates
+from circulation_load_test.common.cmreplay import CMReplayers
+from circulation_load_test.common.cmrequestnames import CMRequestNames
+from circulation_load_test.common.cmshard import CMShards
+from circulation_load_test.common.cmuserpool import CMUserPools
+from circulation_load_test.common.config import Configurations
+from circulation_load_test.common.rappopen import RAuthDocumentCaches
+from circulation_load_test.common.words import Words
+
+
+class LiveMockServerFixture:
+    """A mock CM running on an ephemeral port, and a configuration that targets it."""
+
+    def __init__(self, monkeypatch, tmp_path: Path):
+        from gevent.pywsgi import WSGIServer
+
+        from circulation_load_test.mock.server import CMMockServer, CMMockSettings
+
+        self.settings = CMMockSettings(feed_entries=5, search_pages=3)
+        self.server = WSGIServer(
+            ("127.0.0.1", 0), CMMockServer(self.settings), log=None
+        )
+        self.server.start()
+        self.address = f"http://127.0.0.1:{self.server.server_port}/"
+
+        with open(os.path.join(Path(__file__).parent, "hosts.json")) as f:
+            hosts = json.load(f)
+        hosts["circulation_manager"]["host"] = self.address
+        hosts["registry"]["host"] = self.address
+        self.hosts = hosts
+        self.requests: List[dict] = []
+        self.path = tmp_path / "hosts.json"
+        self.monkeypatch = monkeypatch
+        self.write()
+
+    def user(self, host: Optional[str] = None):
+        """Create a simulated user targeting the mock. Its requests are recorded."""
+        from locust.env import Environment
+
+        from circulation_load_test.common.cmuser import CMHTTPUser
+
+        address = host or self.address
+
+        class User(CMHTTPUser):
+            host = address
+
+        self.requests = []
+        environment = Environment()
+        environment.events.request.add_listener(
+            lambda **kwargs: self.requests.append(kwargs)
+        )
+        return User(environment)
+
+    def write(self):
+        self.path.write_text(json.dumps(self.hosts))
+        self.monkeypatch.setenv("CIRCULATION_LOAD_CONFIGURATION_FILE", str(self.path))
+        self._clear()
+
+    def close(self):
+        self.server.stop()
+        self._clear()
+
+    @staticmethod
+    def _clear():
+        Configurations.clear()
+        CMUserPools.clear()
+        CMCatalogs.clear()
+        CMLinkGraphs.clear()
+        CMLoanPools.clear()
+        CMSearchTemplates.clear()
+        CMReplayers.clear()
+        CMShards.clear()
+        CMInstrumentations.clear()
+        CMRequestNames.clear()
+        CMHistograms.clear()
+        CMHTTPCaches.clear()
+        RAuthDocumentCaches.clear()
+        Words.clear()
+
+
+@pytest.fixture(scope="function")
+def live_mock_server(monkeypatch, tmp_path) -> LiveMockServerFixture:
+    fixture = LiveMockServerFixture(monkeypatch, tmp_path)
+    yield fixture
+    fixture.close()
@@ -4,6 +4,7 @@ from locust.env import Environment
 
 from circulation_load_test.cm.basic import CMTests
 from circulation_load_test.common.cmlogin import CMLogin
+from circulation_load_test.common.cmopensearch import CMSearchTemplates
 from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
 from circulation_load_test.common.cmuser import CMAuthenticationLinkType
 
@@ -22,8 +23,9 @@ def main():
     user = CMTests(env)
     document = CMLogin.login(user)
     root = document.links[CMAuthenticationLinkType.CATALOG]
-    search_link = CMSearchAndBookmark.find_search_link(user, root)
-    search = CMSearchAndBookmark(search_link)
+    template = CMSearchTemplates.find(user, root)
+    assert template is not None
+    search = CMSearchAndBookmark(template)
     search.execute(user)
 
 
@@ -0,0 +1,41 @@
+import json
+
+from circulation_load_test.common.cmbookmarks import (
+    CMBookmark,
+    CMBookmarkBody,
+    CMBookmarkTarget,
+    CMLocatorPage,
+    CMMotivation,
+)
+from circulation_load_test.common.cmbookmarkwriter import CMBookmarkTemplate
+
+
+class TestCMBookmarkTemplate:
+    def test_render(self):
+        template = CMBookmarkTemplate(id="x", source="urn:book", device_id="d")
+        expected = CMBookmark(
+            id="x",
+            target=CMBookmarkTarget(locator=CMLocatorPage(23), source="urn:book"),
+            motivation=CMMotivation.BOOKMARKING,
+            body=CMBookmarkBody(
+                device_id="d", time="2022-10-01T12:00:00+0000", others={}
+            ),
+        )
+        data = template.render(23, "2022-10-01T12:00:00+0000")
+        assert isinstance(data, bytes)
+        assert expected.to_json_dict() == json.loads(data)
+
+    def test_render_pages(self):
+        template = CMBookmarkTemplate(id="x", source="urn:book", device_id="d")
+        for page in (1, 99, 100000):
+            data = json.loads(template.render(page, "t"))
+            selector = json.loads(data["target"]["selector"]["value"])
+            assert {"@type": "LocatorPage", "page": page} == selector
+            assert "t" == data["body"]["http://librarysimplified.org/terms/time"]
+
+    def test_render_motivation(self):
+        template = CMBookmarkTemplate(
+            id="x", source="urn:book", device_id="d", motivation=CMMotivation.IDLING
+        )
+        data = json.loads(template.render(1, "t"))
+        assert "http://www.w3.org/ns/oa#idling" == data["motivation"]
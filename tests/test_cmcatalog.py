@@ -0,0 +1,107 @@
+import pytest
+
+from circulation_load_test.common.cmcatalog import CMCatalogEntry, CMCatalogIndex
+from circulation_load_test.common.cmshard import CMShard
+
+
+def _entries(count: int):
+    return [
+        CMCatalogEntry(
+            book_id=f"urn:book:{index}",
+            borrow_link=f"http://cm.example.com/HAZELNUT/works/{index}/borrow",
+            media_type="application/epub+zip" if index % 2 else None,
+        )
+        for index in range(count)
+    ]
+
+
+class TestCMCatalogIndex:
+    def test_write_read(self, tmp_path):
+        path = str(tmp_path / "catalog.idx")
+        total = CMCatalogIndex.write(
+            path,
+            [
+                ("HAZELNUT", "http://cm.example.com/HAZELNUT/", _entries(3)),
+                ("WALNUT", "http://cm.example.com/WALNUT/", []),
+            ],
+        )
+        assert 3 == total
+
+        index = CMCatalogIndex(path)
+        try:
+            assert {"HAZELNUT", "WALNUT"} == set(index.libraries)
+            library = index.library("HAZELNUT")
+            assert library is not None
+            assert 3 == len(library)
+            assert CMCatalogEntry(
+                "urn:book:1", "/HAZELNUT/works/1/borrow", "application/epub+zip"
+            ) == library.get(1)
+            assert library.get(0).media_type is None
+            with pytest.raises(IndexError):
+                library.get(3)
+
+            assert library is index.library_for_root("http://127.0.0.1:8000/HAZELNUT")
+            assert index.library_for_root("http://cm.example.com/OTHER/") is None
+
+            entry = library.random("http://127.0.0.1:8000/HAZELNUT/")
+            assert entry.borrow_link.startswith("http://127.0.0.1:8000/HAZELNUT/works/")
+            walnut = index.library("WALNUT")
+            assert walnut is not None and 0 == len(walnut)
+        finally:
+            index.close()
+
+    def test_shard(self, tmp_path):
+        path = str(tmp_path / "catalog.idx")
+        root = "http://cm.example.com/HAZELNUT/"
+        CMCatalogIndex.write(path, [("HAZELNUT", root, _entries(10))])
+
+        index = CMCatalogIndex(path, CMShard(1, 3))
+        try:
+            library = index.library("HAZELNUT")
+            assert library is not None
+            books = {library.random(root).book_id for _ in range(200)}
+            assert {"urn:book:1", "urn:book:4", "urn:book:7"} == books
+        finally:
+            index.close()
+
+    def test_not_an_index(self, tmp_path):
+        path = tmp_path / "catalog.idx"
+        path.write_bytes(b"username,password\n")
+        with pytest.raises(ValueError):
+            CMCatalogIndex(str(path))
+
+    def test_crawl(self, live_mock_server, tmp_path):
+        from circulation_load_test.catalog.crawl import CMCatalogCrawler
+        from circulation_load_test.common.cmbookmarkwriter import CMBookmarkWriter
+        from circulation_load_test.common.cmcatalog import CMCatalogs
+        from circulation_load_test.common.cmlogin import CMLogin
+        from circulation_load_test.common.cmopensearch import CMSearchTemplates
+        from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+        from circulation_load_test.common.cmuser import CMAuthenticationLinkType
+
+        root = f"{live_mock_server.address}HAZELNUT/"
+        entries = CMCatalogCrawler(maximum_feeds=4).crawl(root)
+        assert entries
+        assert all(entry.media_type for entry in entries)
+        path = str(tmp_path / "catalog.idx")
+        CMCatalogIndex.write(path, [("HAZELNUT", root, entries)])
+
+        live_mock_server.hosts["circulation_manager"]["catalog_index"] = path
+        live_mock_server.write()
+        user = live_mock_server.user()
+        requests = live_mock_server.requests
+
+        document = CMLogin.login_cached(user)
+        catalog_root = document.links[CMAuthenticationLinkType.CATALOG]
+        template = CMSearchTemplates.find(user, catalog_root)
+        assert template is not None
+        index = CMCatalogs.get()
+        assert index is not None
+        books = index.library_for_root(catalog_root)
+        assert books is not None
+
+        del requests[:]
+        writer = CMBookmarkWriter(count=1)
+        CMSearchAndBookmark(template, writer, books, catalog_root).execute(user)
+        assert not any("/search/" in request["name"] for request in requests)
+        assert all(request["exception"] is None for request in requests)
@@ -0,0 +1,73 @@
+import pytest
+
+from circulation_load_test.common.cmconnection import CMHTTPClientPool
+from circulation_load_test.common.config import (
+    CMConnectionConfiguration,
+    CMConnectionPolicy,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _connects(requests):
+    return [r["name"] for r in requests if r["request_type"] == "connection"]
+
+
+class TestCMHTTPClientPool:
+    def _user(self, live_mock_server, connections: dict):
+        live_mock_server.hosts["circulation_manager"]["connections"] = connections
+        live_mock_server.write()
+        return live_mock_server.user()
+
+    def test_persistent(self, live_mock_server):
+        user = live_mock_server.user()
+        assert user.connections is None
+        assert 10 == user.client.client.clientpool.client_args["concurrency"]
+
+    def test_pool_size(self, live_mock_server):
+        user = self._user(live_mock_server, {"pool_size": 4, "timing": True})
+        assert isinstance(user.connections, CMHTTPClientPool)
+        assert 4 == user.connections.client_args["concurrency"]
+
+    def test_requests(self, live_mock_server):
+        user = self._user(
+            live_mock_server,
+            {"policy": "requests", "requests_per_connection": 2, "timing": True},
+        )
+        for _ in range(5):
+            user.client.get(live_mock_server.address, name="/")
+
+        assert 2 == user.connections.reconnections
+        names = _connects(live_mock_server.requests)
+        assert 3 == names.count("connect") == names.count("dns")
+        assert 0 == names.count("tls")
+
+    def test_session(self, live_mock_server):
+        user = self._user(live_mock_server, {"policy": "session", "idle_seconds": 30})
+        clock = _Clock()
+        user.connections.clock = clock
+        for delay in [0, 10, 10, 31, 5]:
+            clock.now += delay
+            user.client.get(live_mock_server.address, name="/")
+
+        assert 1 == user.connections.reconnections
+        assert [] == _connects(live_mock_server.requests)
+
+    def test_configuration(self):
+        config = CMConnectionConfiguration.parse(
+            {"policy": "requests", "requests_per_connection": 5}
+        )
+        assert CMConnectionPolicy.REQUESTS == config.policy
+        assert 5 == config.requests_per_connection
+        with pytest.raises(ValueError):
+            CMConnectionConfiguration.parse({"policy": "sometimes"})
+        with pytest.raises(ValueError):
+            CMConnectionConfiguration.parse({"pool_size": 0})
+        with pytest.raises(ValueError):
+            CMConnectionConfiguration.parse({"idle_seconds": -1})
@@ -0,0 +1,77 @@
+import pytest
+
+from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+from circulation_load_test.common.cmlogin import CMLogin
+from circulation_load_test.common.config import (
+    CMFeedWalkConfiguration,
+    CMFeedWalkPolicy,
+)
+
+
+class TestCMFeedWalkConfiguration:
+    def test_concurrency(self):
+        assert 1 == CMFeedWalkConfiguration.parse({}).concurrency
+        assert 10 == CMFeedWalkConfiguration.parse({"concurrency": 10}).concurrency
+
+    @pytest.mark.parametrize("concurrency", [0, 11, "4"])
+    def test_concurrency_invalid(self, concurrency):
+        with pytest.raises(ValueError):
+            CMFeedWalkConfiguration.parse({"concurrency": concurrency})
+
+
+class TestCMFeedWalk:
+    def test_visits(self, live_mock_server):
+        user = live_mock_server.user()
+        walk = CMFeedWalk(
+            live_mock_server.address,
+            allowed_link_relations={"collection", "related"},
+            maximum_visits=6,
+        )
+        walk.execute(user)
+        assert 6 == len(walk.visited)
+        assert 6 == len(live_mock_server.requests)
+
+    def test_concurrent_depth(self, live_mock_server):
+        user = live_mock_server.user()
+        walk = CMFeedWalk(
+            live_mock_server.address,
+            allowed_link_relations={"collection"},
+            maximum_visits=100,
+            policy=CMFeedWalkPolicy.BREADTH_FIRST,
+            concurrency=4,
+            maximum_depth=1,
+        )
+        walk.execute(user)
+
+        # The root, and each of the distinct lanes linked from its entries.
+        lanes = {url for url in walk.visited if "/groups/" in url}
+        assert len(walk.visited) == len(lanes) + 1
+        assert 0 < len(lanes) <= live_mock_server.settings.lanes
+        assert all(r["exception"] is None for r in live_mock_server.requests)
+
+    def test_bytes(self, live_mock_server):
+        user = live_mock_server.user()
+        walk = CMFeedWalk(
+            live_mock_server.address,
+            allowed_link_relations={"collection", "related"},
+            maximum_visits=100,
+            policy=CMFeedWalkPolicy.RANDOM,
+            maximum_bytes=1,
+        )
+        walk.execute(user)
+        assert 1 == len(walk.visited)
+
+    def test_unauthorized(self, live_mock_server):
+        user = live_mock_server.user()
+        CMLogin.login_cached(user)
+        assert user.session_cache.get() is not None
+
+        # A rejected request discards the cached session.
+        walk = CMFeedWalk(
+            f"{live_mock_server.address}HAZELNUT/loans/",
+            allowed_link_relations={"collection"},
+            maximum_visits=1,
+        )
+        with pytest.raises(Exception):
+            walk.execute(user)
+        assert user.session_cache.get() is None
@@ -0,0 +1,147 @@
+import random
+
+import pytest
+
+from circulation_load_test.common.cmhistogram import (
+    CMHistogram,
+    CMHistogramCollector,
+    CMHistograms,
+    export_totals,
+    read_export,
+)
+from circulation_load_test.common.config import CMHistogramConfiguration
+from circulation_load_test.histograms.__main__ import report
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCMHistogram:
+    def test_precision(self):
+        histogram = CMHistogram(3_600_000_000, 3)
+        for value in [1, 2, 1000, 2047, 2048, 123_456, 999_999_999, 3_600_000_000]:
+            index = histogram._index(value)
+            assert histogram._value(index) <= value
+            assert value <= histogram._highest_equivalent(index)
+            assert histogram._highest_equivalent(index) - value <= value / 1000.0
+
+    def test_percentiles(self):
+        rng = random.Random(7)
+        values = sorted(rng.randint(1, 10_000_000) for _ in range(20000))
+        histogram = CMHistogram()
+        for value in values:
+            histogram.record(value)
+
+        assert 20000 == histogram.total
+        assert values[0] == histogram.minimum
+        assert values[-1] == histogram.maximum
+        for percentile in [50.0, 99.0, 99.9, 99.99]:
+            expected = values[int(len(values) * percentile / 100.0) - 1]
+            actual = histogram.value_at_percentile(percentile)
+            assert abs(actual - expected) <= expected / 1000.0
+        assert values[-1] == histogram.value_at_percentile(100.0)
+
+    def test_clamped(self):
+        histogram = CMHistogram(1000, 2)
+        histogram.record(0)
+        histogram.record(5000)
+        assert 1 == histogram.minimum
+        assert 1000 == histogram.maximum
+
+    def test_merge_and_parse(self):
+        first = CMHistogram()
+        second = CMHistogram()
+        for value in range(1, 1001):
+            first.record(value)
+            second.record(value * 1000)
+        first.merge(CMHistogram.parse(second.to_json_dict()))
+
+        assert 2000 == first.total
+        assert 1 == first.minimum
+        assert 1_000_000 == first.maximum
+        assert first.value_at_percentile(50.0) == 1000
+
+        with pytest.raises(ValueError):
+            first.merge(CMHistogram(1000, 3))
+
+
+class TestCMHistogramCollector:
+    def test_intervals_and_export(self, tmp_path):
+        path = str(tmp_path / "histograms.jsonl.gz")
+        clock = _Clock()
+        collector = CMHistogramCollector(
+            CMHistogramConfiguration(True, path, interval=10.0), clock
+        )
+        collector.record("GET /groups", 1000)
+        collector.record("GET /groups", 3000)
+        clock.now += 10.0
+        collector.record("GET /groups", 2000)
+        collector.record("GET /search", 500)
+        collector.close()
+
+        records = list(read_export(path))
+        assert [
+            ("interval", "GET /groups"),
+            ("interval", "GET /groups"),
+            ("interval", "GET /search"),
+            ("total", "GET /groups"),
+            ("total", "GET /search"),
+        ] == [(r["kind"], r["name"]) for r in records]
+        assert 2 == records[0]["count"]
+        assert 1000.0 == records[0]["start"] and 1010.0 == records[0]["end"]
+        assert 3 == records[3]["count"]
+        assert 3.0 == records[3]["max_ms"]
+
+        totals = export_totals(path)
+        assert 3 == totals["GET /groups"].total
+        assert "GET /groups" in report(totals, {})
+
+    def test_merge_worker_reports(self):
+        config = CMHistogramConfiguration(True)
+        worker = CMHistogramCollector(config)
+        worker.record("GET /groups", 1000)
+        report_data = worker.snapshot()
+        assert {} == worker.interval
+
+        master = CMHistogramCollector(config)
+        master.merge(report_data)
+        master.merge(report_data)
+        assert 2 == master.interval["GET /groups"].total
+
+    def test_report_compares_runs(self):
+        run = {"GET /groups": CMHistogram()}
+        baseline = {"GET /groups": CMHistogram()}
+        run["GET /groups"].record(2000)
+        baseline["GET /groups"].record(1000)
+        assert "(+100.0%)" in report(run, baseline)
+
+
+class TestCMHistograms:
+    def test_disabled(self, live_mock_server):
+        assert CMHistograms.get() is None
+
+    def test_requests(self, live_mock_server):
+        live_mock_server.hosts["circulation_manager"]["histograms"] = {"enabled": True}
+        live_mock_server.write()
+        user = live_mock_server.user()
+        user.environment.events.request.add_listener(CMHistograms.on_request)
+        user.client.get(live_mock_server.address, name="/")
+
+        collector = CMHistograms.get()
+        assert collector is not None
+        assert 1 == collector.interval["GET /"].total
+
+    def test_configuration(self):
+        config = CMHistogramConfiguration.parse(
+            {"enabled": True, "interval_seconds": 5, "highest_seconds": 60}
+        )
+        assert 5 == config.interval and 60 == config.highest
+        with pytest.raises(ValueError):
+            CMHistogramConfiguration.parse({"significant_figures": 6})
+        with pytest.raises(ValueError):
+            CMHistogramConfiguration.parse({"interval_seconds": 0})
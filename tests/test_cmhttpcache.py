@@ -0,0 +1,116 @@
+from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+from circulation_load_test.common.cmhttpcache import (
+    CMCachedResponse,
+    CMHTTPCache,
+    CMHTTPCacheEntry,
+    CMHTTPCaches,
+)
+
+
+class _Response:
+    def __init__(self, status_code: int, headers: dict, content: bytes = b""):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class _Client:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, headers=None, name=None):
+        self.sent.append(headers)
+        return self.responses.pop(0)
+
+
+class _User:
+    def __init__(self, client: _Client):
+        from locust.env import Environment
+
+        self.client = client
+        self.environment = Environment()
+        self.events = []
+        self.environment.events.request.add_listener(
+            lambda **kwargs: self.events.append(kwargs["name"])
+        )
+
+
+def _entry(size: int) -> CMHTTPCacheEntry:
+    return CMHTTPCacheEntry('"x"', None, b"x" * size, "text/plain")
+
+
+class TestCMHTTPCache:
+    def test_disabled(self, live_mock_server):
+        user = live_mock_server.user()
+        assert user.http_cache is None
+
+    def test_feed_walk_revalidates(self, live_mock_server):
+        live_mock_server.hosts["circulation_manager"]["http_cache"] = {"enabled": True}
+        live_mock_server.write()
+        user = live_mock_server.user()
+        walk = CMFeedWalk(live_mock_server.address, {"collection"}, maximum_visits=3)
+        walk.execute(user)
+        walk.execute(user)
+
+        cache = user.http_cache
+        assert cache is not None
+        assert 1 <= cache.not_modified
+        assert cache.saved_bytes > 0
+        names = [r["name"] for r in live_mock_server.requests]
+        assert cache.not_modified == names.count("not_modified")
+        assert all(r["exception"] is None for r in live_mock_server.requests)
+
+    def test_shared(self, live_mock_server):
+        live_mock_server.hosts["circulation_manager"]["http_cache"] = {
+            "enabled": True,
+            "shared": True,
+        }
+        live_mock_server.write()
+        first = live_mock_server.user()
+        second = live_mock_server.user()
+        assert first.http_cache is second.http_cache is CMHTTPCaches.for_user()
+
+    def test_last_modified(self):
+        modified = "Sun, 01 Jan 2023 00:00:00 GMT"
+        client = _Client(
+            [
+                _Response(200, {"last-modified": modified}, b"feed"),
+                _Response(304, {}),
+                _Response(200, {}, b"new feed"),
+            ]
+        )
+        user = _User(client)
+        cache = CMHTTPCache(1024)
+        cache.get(user, "http://cm/feed", "feed")
+        response = cache.get(user, "http://cm/feed", "feed")
+        assert isinstance(response, CMCachedResponse)
+        assert b"feed" == response.content
+        assert {"If-Modified-Since": modified} == client.sent[1]
+
+        # A response without validators replaces nothing in the cache.
+        assert b"new feed" == cache.get(user, "http://cm/feed", "feed").content
+        assert 0 == len(cache)
+        assert ["not_modified", "modified"] == user.events
+
+    def test_authorization_is_part_of_the_key(self):
+        client = _Client([_Response(200, {"etag": '"a"'}, b"shelf")] * 2)
+        user = _User(client)
+        cache = CMHTTPCache(1024)
+        cache.get(user, "http://cm/loans", "loans", {"Authorization": "Basic a"})
+        cache.get(user, "http://cm/loans", "loans", {"Authorization": "Basic b"})
+        assert {"Authorization": "Basic b"} == client.sent[1]
+        assert 2 == len(cache)
+
+    def test_evicts_least_recently_used(self):
+        cache = CMHTTPCache(100)
+        cache.store(("a", None), _entry(40))
+        cache.store(("b", None), _entry(40))
+        assert cache.lookup(("a", None)) is not None
+        cache.store(("c", None), _entry(40))
+        assert cache.lookup(("b", None)) is None
+        assert cache.lookup(("a", None)) is not None
+        assert 80 == cache.size
+
+        cache.store(("d", None), _entry(101))
+        assert cache.lookup(("d", None)) is None
@@ -0,0 +1,77 @@
+import csv
+import json
+
+from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+from circulation_load_test.common.cminstrumentation import (
+    CMInstrumentation,
+    CMInstrumentations,
+    CMOperationStats,
+)
+from circulation_load_test.common.config import CMInstrumentationConfiguration
+
+
+class TestCMInstrumentation:
+    def test_disabled(self, live_mock_server):
+        user = live_mock_server.user()
+        CMFeedWalk(live_mock_server.address, {"collection"}, maximum_visits=2).execute(
+            user
+        )
+        assert CMInstrumentations.get() is None
+        assert {"GET"} == {r["request_type"] for r in live_mock_server.requests}
+
+    def test_feed_walk(self, live_mock_server, tmp_path):
+        live_mock_server.hosts["circulation_manager"]["instrumentation"] = {
+            "enabled": True
+        }
+        live_mock_server.write()
+        user = live_mock_server.user()
+        CMFeedWalk(live_mock_server.address, {"collection"}, maximum_visits=3).execute(
+            user
+        )
+
+        instrumentation = CMInstrumentations.get()
+        assert instrumentation is not None
+        stats = instrumentation.operations["feed"]
+        assert 3 == stats.count
+        assert stats.received_bytes > 0
+        assert stats.network > 0 and stats.parse > 0
+
+        requests = live_mock_server.requests
+        parses = [r for r in requests if r["request_type"] == "parse"]
+        processes = [r for r in requests if r["request_type"] == "process"]
+        assert 3 == len(parses) == len(processes)
+        assert {"feed"} == {r["name"] for r in parses}
+
+    def test_merge_and_export(self, tmp_path):
+        worker = CMInstrumentation(CMInstrumentationConfiguration(True))
+        worker.record("feed", CMOperationStats(1, 100, 0.01, 0.002, 0.001))
+        worker.record("feed", CMOperationStats(1, 300, 0.03, 0.004, 0.001))
+        report = worker.snapshot()
+        assert {} == worker.operations
+
+        master = CMInstrumentation(CMInstrumentationConfiguration(True))
+        master.merge(report)
+        master.merge(report)
+        assert CMOperationStats(4, 800, 0.08, 0.012, 0.004) == _rounded(
+            master.operations["feed"]
+        )
+
+        master.export(str(tmp_path / "operations.json"))
+        data = json.loads((tmp_path / "operations.json").read_text())
+        assert 20.0 == data["operations"][0]["mean_network_ms"]
+
+        master.export(str(tmp_path / "operations.csv"))
+        with open(tmp_path / "operations.csv") as f:
+            rows = list(csv.DictReader(f))
+        assert "feed" == rows[0]["operation"]
+        assert "800" == rows[0]["received_bytes"]
+
+
+def _rounded(stats: CMOperationStats) -> CMOperationStats:
+    return CMOperationStats(
+        stats.count,
+        stats.received_bytes,
+        round(stats.network, 9),
+        round(stats.parse, 9),
+        round(stats.process, 9),
+    )
@@ -0,0 +1,125 @@
+import pytest
+
+from circulation_load_test.common.config import (
+    DEFAULT_JOURNEY_TRANSITIONS,
+    JOURNEY_READ_UPDATES,
+    CMJourneyConfiguration,
+    CMJourneyStep,
+)
+
+# Read without pausing between reading position updates, and without bookmarks.
+READ = {
+    "updates": 2,
+    "update_interval": {"distribution": "none"},
+    "bookmark_probability": 0,
+}
+
+
+class TestCMJourneyConfiguration:
+    def test_defaults(self):
+        config = CMJourneyConfiguration.parse({})
+        assert DEFAULT_JOURNEY_TRANSITIONS == config.transitions
+        assert 20 == config.maximum_steps
+        assert 1 == config.weight
+        assert JOURNEY_READ_UPDATES == config.read.updates == config.read.read_every
+
+    def test_unconfigured(self, live_mock_server):
+        from circulation_load_test.cm.journey import CMJourneyTests
+
+        # Journey users are left out unless a journey is configured.
+        assert 0 == CMJourneyTests.weight
+        live_mock_server.hosts["circulation_manager"]["journey"] = {}
+        live_mock_server.write()
+        assert 1 == CMJourneyTests.weight
+
+    def test_override(self):
+        config = CMJourneyConfiguration.parse(
+            {
+                "transitions": {"open": {"search": 1}},
+                "maximum_steps": 5,
+                "weight": 3,
+                "read": {"updates": 5},
+            }
+        )
+        assert 3 == config.weight and 5 == config.read.updates
+        assert {CMJourneyStep.SEARCH: 1} == config.transitions[CMJourneyStep.OPEN]
+        assert (
+            DEFAULT_JOURNEY_TRANSITIONS[CMJourneyStep.READ]
+            == config.transitions[CMJourneyStep.READ]
+        )
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"transitions": {"sleep": {"end": 1}}},
+            {"transitions": {"end": {"open": 1}}},
+            {"transitions": {"browse": {"open": 1}}},
+            {"transitions": {"browse": {"end": 0}}},
+            {"maximum_steps": 0},
+            {"weight": -1},
+            {"read": {"updates": 0}},
+        ],
+    )
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            CMJourneyConfiguration.parse(data)
+
+
+class TestCMJourney:
+    def test_journey(self, live_mock_server):
+        from circulation_load_test.common.cmjourney import CMJourney
+        from circulation_load_test.common.config import Configurations
+
+        live_mock_server.hosts["circulation_manager"]["journey"] = {
+            "read": READ,
+            "transitions": {
+                "open": {"browse": 1},
+                "browse": {"search": 1},
+                "search": {"read": 1},
+                "read": {"return": 1},
+                "return": {"end": 1},
+            },
+        }
+        live_mock_server.write()
+        user = live_mock_server.user()
+        requests = live_mock_server.requests
+
+        journey = CMJourney(Configurations.get().circulation_manager)
+        session = journey.execute(user)
+
+        # Reading without a loan borrows a book first, and then continues from the
+        # borrow step.
+        steps = [step.value for step in session.steps]
+        assert ["open", "browse", "search", "borrow", "read", "return"] == steps
+        assert [] == session.loans
+        journey_requests = [
+            r["name"] for r in requests if r["request_type"] == "journey"
+        ]
+        assert steps == journey_requests
+        assert 1 == sum(1 for r in requests if r["name"].endswith("/revoke"))
+        assert all(request["exception"] is None for request in requests)
+
+        # The read step sends a reading position for each update, and reads the
+        # annotations when the book is opened and after the last update.
+        annotations = [r for r in requests if r["name"].endswith("/annotations/")]
+        assert 2 == sum(1 for r in annotations if r["request_type"] == "POST")
+        assert 2 == sum(1 for r in annotations if r["request_type"] == "GET")
+
+    def test_maximum_steps(self, live_mock_server):
+        from circulation_load_test.common.cmjourney import CMJourney
+        from circulation_load_test.common.config import Configurations
+
+        live_mock_server.hosts["circulation_manager"]["journey"] = {
+            "read": READ,
+            "transitions": {"open": {"borrow": 1}, "read": {"read": 1}},
+            "maximum_steps": 4,
+        }
+        live_mock_server.write()
+        user = live_mock_server.user()
+        requests = live_mock_server.requests
+
+        session = CMJourney(Configurations.get().circulation_manager).execute(user)
+        steps = [step.value for step in session.steps]
+        assert ["open", "borrow", "read", "read"] == steps
+        # The loan still held at the end of the journey is returned.
+        assert 1 == sum(1 for r in requests if r["name"].endswith("/revoke"))
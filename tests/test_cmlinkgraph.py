@@ -0,0 +1,91 @@
+import time
+
+from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+from circulation_load_test.common.cmlinkgraph import CMLinkGraph, CMLinkGraphs
+from circulation_load_test.common.cmopds import CMOPDSLink
+from circulation_load_test.common.cmopensearch import CMSearchTemplates
+
+
+def _links(*hrefs: str, rel: str = "collection"):
+    return [CMOPDSLink(rel=rel, href=href, type=None) for href in hrefs]
+
+
+class TestCMLinkGraph:
+    def test_hit_miss(self):
+        graph = CMLinkGraph(capacity=10, maximum_links=10, ttl=60.0)
+        assert graph.get("a") is None
+        graph.put("a", _links("b", "c"))
+        links = graph.get("a")
+        assert links is not None
+        assert ["b", "c"] == [link.href for link in links]
+        assert (1, 1) == (graph.hits, graph.misses)
+
+    def test_capacity(self):
+        graph = CMLinkGraph(capacity=2, maximum_links=1, ttl=60.0)
+        graph.put("a", _links("x", "y"))
+        graph.put("b", _links())
+        assert graph.get("a") is not None
+        graph.put("c", _links())
+        assert 2 == len(graph)
+        assert graph.get("b") is None
+        assert 1 == len(graph.get("a") or [])
+
+    def test_feed_links_kept(self):
+        graph = CMLinkGraph(capacity=10, maximum_links=3, ttl=60.0)
+        feed_links = _links("s", rel="search") + _links("t", rel="start")
+        graph.put("a", _links("x", "y", "z"), feed_links)
+        hrefs = [link.href for link in graph.get("a") or []]
+        assert 3 == len(hrefs)
+        assert ["s", "t"] == hrefs[:2]
+
+        # The feed-level links are kept even when they alone exceed the limit.
+        graph.put("b", _links("x"), feed_links * 2)
+        assert 4 == len(graph.get("b") or [])
+
+    def test_search_link_fallback(self, live_mock_server):
+        user = live_mock_server.user()
+        graph = CMLinkGraph(capacity=10, maximum_links=10, ttl=60.0)
+        CMLinkGraphs._graph = graph
+        CMLinkGraphs._initialized = True
+        graph.put(live_mock_server.address, _links("x"))
+
+        # The cached feed has no search link, so the feed is fetched again.
+        link = CMSearchTemplates.find_search_link(user, live_mock_server.address)
+        assert link is not None
+        assert 1 == len([r for r in live_mock_server.requests if r["name"] == "/"])
+        assert link in [
+            found.href for found in graph.get(live_mock_server.address) or []
+        ]
+
+    def test_ttl(self):
+        graph = CMLinkGraph(capacity=10, maximum_links=10, ttl=60.0)
+        graph.put("a", _links())
+        graph._feeds["a"] = (time.monotonic() - 120.0, [])
+        assert graph.get("a") is None
+        assert 0 == len(graph)
+
+    def test_walk(self, live_mock_server):
+        user = live_mock_server.user()
+        graph = CMLinkGraph(capacity=100, maximum_links=100, ttl=60.0)
+
+        def walk() -> CMFeedWalk:
+            walk = CMFeedWalk(
+                live_mock_server.address,
+                allowed_link_relations={"collection"},
+                maximum_visits=2,
+                link_graph=graph,
+            )
+            walk.execute(user)
+            return walk
+
+        first = walk()
+        assert 2 == first.fetched
+        second = walk()
+        assert 2 == second.fetched
+
+        # The second walk reuses the links of the root feed, and so reaches further.
+        fetched = [r for r in live_mock_server.requests if r["request_type"] == "GET"]
+        assert 4 == len(fetched)
+        assert 1 == len([r for r in fetched if r["name"] == "/"])
+        hits = [r for r in live_mock_server.requests if r["name"] == "hit"]
+        assert 0 < len(hits)
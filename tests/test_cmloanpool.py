@@ -0,0 +1,97 @@
+import time
+
+from circulation_load_test.common.cmloanpool import CMLoan, CMLoanPool
+
+
+def _loan(name: str, **kwargs) -> CMLoan:
+    return CMLoan(
+        book_id=name,
+        revoke_link=f"{name}/revoke",
+        annotations_link=f"{name}/annotations",
+        **kwargs,
+    )
+
+
+class TestCMLoanPool:
+    def test_checkout_checkin(self):
+        pool = CMLoanPool(loans_per_patron=1, maximum_age=60.0, maximum_uses=10)
+        assert pool.checkout("p0") is None
+        loan = _loan("a", uses=1)
+        pool.checkin("p0", loan)
+        assert 1 == len(pool)
+        assert pool.checkout("p1") is None
+        assert loan is pool.checkout("p0")
+        assert 2 == loan.uses
+        assert 0 == len(pool)
+
+    def test_loans_per_patron(self):
+        pool = CMLoanPool(loans_per_patron=1, maximum_age=60.0, maximum_uses=10)
+        pool.checkin("p0", _loan("a"))
+        pool.checkin("p0", _loan("b"))
+        assert ["b"] == [loan.book_id for loan in pool.retired("p0")]
+        assert [] == pool.retired("p0")
+
+    def test_maximum_uses(self):
+        pool = CMLoanPool(loans_per_patron=1, maximum_age=60.0, maximum_uses=2)
+        pool.checkin("p0", _loan("a", uses=1))
+        loan = pool.checkout("p0")
+        assert loan is not None
+        pool.checkin("p0", loan)
+        assert [loan] == pool.retired("p0")
+        assert pool.checkout("p0") is None
+
+    def test_maximum_age(self):
+        pool = CMLoanPool(loans_per_patron=1, maximum_age=60.0, maximum_uses=10)
+        loan = _loan("a", created=time.monotonic() - 120.0)
+        pool._idle["p0"] = [loan]
+        assert pool.checkout("p0") is None
+        assert [loan] == pool.retired("p0")
+
+    def test_drain(self):
+        pool = CMLoanPool(loans_per_patron=1, maximum_age=60.0, maximum_uses=10)
+        pool.checkin("p0", _loan("a"))
+        pool.checkin("p0", _loan("b"))
+        assert ["a", "b"] == [loan.book_id for loan in pool.drain("p0")]
+        assert 0 == len(pool)
+
+    def test_bookmarks(self, live_mock_server):
+        from circulation_load_test.common.cmbookmarkwriter import CMBookmarkWriter
+        from circulation_load_test.common.cmloanpool import CMLoanPools
+        from circulation_load_test.common.cmlogin import CMLogin
+        from circulation_load_test.common.cmopensearch import CMSearchTemplates
+        from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+        from circulation_load_test.common.cmuser import CMAuthenticationLinkType
+
+        live_mock_server.hosts["circulation_manager"]["loan_pool"] = {
+            "loans_per_patron": 1,
+            "maximum_uses": 2,
+        }
+        live_mock_server.write()
+        user = live_mock_server.user()
+        requests = live_mock_server.requests
+
+        document = CMLogin.login_cached(user)
+        root = document.links[CMAuthenticationLinkType.CATALOG]
+        template = CMSearchTemplates.find(user, root)
+        assert template is not None
+        search = CMSearchAndBookmark(template, CMBookmarkWriter(count=2))
+
+        def borrows() -> int:
+            return sum(1 for r in requests if r["name"].endswith("/borrow"))
+
+        def revokes() -> int:
+            return sum(1 for r in requests if r["name"].endswith("/revoke"))
+
+        search.execute(user)
+        assert (1, 0) == (borrows(), revokes())
+        search.execute(user)
+        assert (1, 1) == (borrows(), revokes())
+        search.execute(user)
+        assert (2, 1) == (borrows(), revokes())
+
+        pool = CMLoanPools.get()
+        assert pool is not None and 1 == len(pool)
+        CMSearchAndBookmark.revoke_pooled_loans(user)
+        assert (2, 2) == (borrows(), revokes())
+        assert 0 == len(pool)
+        assert all(request["exception"] is None for request in requests)
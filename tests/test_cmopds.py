@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from circulation_load_test.common.cmopds import CMOPDSParser
+
+REL_BORROW = "http://opds-spec.org/acquisition/borrow"
+
+
+def _feed(name: str) -> bytes:
+    with open(os.path.join(Path(__file__).parent, "feeds", name), "rb") as f:
+        return f.read()
+
+
+class TestCMOPDSParser:
+    def test_all_links(self):
+        feed = CMOPDSParser.parse(_feed("search.xml"))
+        assert "http://cm.example.com/HAZELNUT/search/?q=dog" == feed.id
+        assert 5 == len(feed.links)
+        assert 2 == len(feed.entries)
+        assert (
+            "urn:librarysimplified.org/terms/id/Gutenberg%20ID/1001"
+            == feed.entries[0].id
+        )
+        assert 4 == len(feed.entries[0].links)
+        assert ["alternate"] == [link.rel for link in feed.entries[1].links]
+
+    def test_filtered_links(self):
+        feed = CMOPDSParser.parse(
+            _feed("search.xml"), feed_rels={"next"}, entry_rels={REL_BORROW}
+        )
+        next = feed.link("next")
+        assert next is not None
+        assert (
+            "http://cm.example.com/HAZELNUT/search/?q=dog&after=2&size=2" == next.href
+        )
+        assert feed.link("search") is None
+        assert 1 == len(feed.entries)
+        assert REL_BORROW == feed.entries[0].links[0].rel
+        assert ["application/epub+zip"] == feed.entries[0].links[0].acquisition_types
+
+    def test_skip_entries(self):
+        feed = CMOPDSParser.parse(_feed("search.xml"), entry_rels=set())
+        assert [] == feed.entries
+
+    def test_entry_document(self):
+        data = (
+            b'<entry xmlns="http://www.w3.org/2005/Atom"><id>x</id>'
+            b'<link rel="http://librarysimplified.org/terms/rel/revoke" href="r"/>'
+            b"</entry>"
+        )
+        feed = CMOPDSParser.parse(data)
+        assert "x" == feed.id
+        link = feed.link("http://librarysimplified.org/terms/rel/revoke")
+        assert link is not None
+        assert "r" == link.href
+
+    def test_malformed(self):
+        with pytest.raises(ValueError):
+            CMOPDSParser.parse(b"<feed")
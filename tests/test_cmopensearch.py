@@ -0,0 +1,37 @@
+import pytest
+
+from circulation_load_test.common.cmopensearch import CMOpenSearchTemplate
+
+DESCRIPTION = b"""<?xml version="1.0" encoding="UTF-8"?>
+<OpenSearchDescription xmlns="http://a9.com/-/spec/opensearch/1.1/">
+  <ShortName>Search</ShortName>
+  <Url type="text/html" template="/html?q={searchTerms}"/>
+  <Url type="application/atom+xml;profile=opds-catalog;kind=acquisition"
+       template="/HAZELNUT/search/?entrypoint=All&amp;q={searchTerms}&amp;n={count?}"/>
+</OpenSearchDescription>
+"""
+
+
+class TestCMOpenSearchTemplate:
+    def test_parse(self):
+        template = CMOpenSearchTemplate.parse(
+            DESCRIPTION, "http://cm.example.com/HAZELNUT/search/"
+        )
+        assert (
+            "http://cm.example.com/HAZELNUT/search/?entrypoint=All&q=big+dogs&n="
+            == template.expand("big dogs")
+        )
+
+    def test_parse_missing_template(self):
+        with pytest.raises(ValueError):
+            CMOpenSearchTemplate.parse(
+                b"<OpenSearchDescription "
+                b'xmlns="http://a9.com/-/spec/opensearch/1.1/"/>',
+                "http://cm.example.com/",
+            )
+
+    def test_legacy(self):
+        template = CMOpenSearchTemplate.legacy("http://cm.example.com/search/")
+        assert "http://cm.example.com/search/?q=a%26b" == template.expand("a&b")
+        template = CMOpenSearchTemplate.legacy("http://cm.example.com/search/?x=1")
+        assert "http://cm.example.com/search/?x=1&q=a" == template.expand("a")
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from circulation_load_test.common.cmbookmarks import CMLocatorPage, CMMotivation
+from circulation_load_test.common.cmlogin import CMLogin
+from circulation_load_test.common.cmopensearch import CMSearchTemplates
+from circulation_load_test.common.cmreadingsync import CMReadingPosition, CMReadingSync
+from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+from circulation_load_test.common.cmuser import CMAuthenticationLinkType
+from circulation_load_test.common.config import (
+    DEFAULT_LOCATOR_WEIGHTS,
+    CMLocatorKind,
+    CMReadingSyncConfiguration,
+    CMThinkTimeConfiguration,
+    CMThinkTimeDistribution,
+)
+
+
+def _position(source: str, locator) -> dict:
+    return {
+        "id": "p",
+        "motivation": CMMotivation.IDLING.value,
+        "target": {
+            "source": source,
+            "selector": {"value": json.dumps(locator.to_json_dict())},
+        },
+    }
+
+
+class TestCMReadingSyncConfiguration:
+    def test_defaults(self):
+        config = CMReadingSyncConfiguration.parse({})
+        assert DEFAULT_LOCATOR_WEIGHTS == config.locator_weights
+        assert 20 == config.updates and 10 == config.read_every
+        assert CMThinkTimeDistribution.CONSTANT == config.update_interval.distribution
+        assert 30.0 == config.update_interval.minimum
+
+    def test_override(self):
+        config = CMReadingSyncConfiguration.parse(
+            {
+                "locator_weights": {"page": 1, "audiobook_time": 3},
+                "updates": 5,
+                "read_every": 2,
+                "bookmark_probability": 0.5,
+                "update_interval": {"distribution": "none"},
+            }
+        )
+        assert {
+            CMLocatorKind.PAGE: 1.0,
+            CMLocatorKind.AUDIOBOOK_TIME: 3.0,
+        } == config.locator_weights
+        assert 5 == config.updates and 2 == config.read_every
+        assert 0.5 == config.bookmark_probability
+        assert CMThinkTimeDistribution.NONE == config.update_interval.distribution
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"locator_weights": {"scroll": 1}},
+            {"locator_weights": {"page": -1}},
+            {"locator_weights": {"page": 0}},
+            {"updates": 0},
+            {"read_every": "often"},
+            {"bookmark_probability": 2},
+        ],
+    )
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            CMReadingSyncConfiguration.parse(data)
+
+
+class TestCMReadingPosition:
+    @pytest.mark.parametrize("kind", list(CMLocatorKind))
+    def test_advance(self, kind):
+        position = CMReadingPosition(kind, "urn:book")
+        locators = []
+        for _ in range(60):
+            position.advance()
+            locators.append(json.dumps(position.locator().to_json_dict()))
+        # Every update moves the reader on, and reading passes chapter boundaries.
+        assert len(set(locators)) == len(locators)
+        assert position.chapter > 1
+
+
+class TestCMReadingSync:
+    def test_mismatch(self):
+        locator = CMLocatorPage(7)
+        items = [_position("urn:book", locator), {"id": "b1"}]
+        assert CMReadingSync.mismatch(items, "urn:book", locator, ["b1"]) is None
+        assert "not listed" in CMReadingSync.mismatch(
+            items, "urn:book", locator, ["b2"]
+        )
+        assert "is {" in CMReadingSync.mismatch(items, "urn:book", CMLocatorPage(8), [])
+        assert "found 2" in CMReadingSync.mismatch(
+            items + [_position("urn:book", locator)], "urn:book", locator, []
+        )
+        assert "found 0" in CMReadingSync.mismatch(items, "urn:other", locator, [])
+
+    @pytest.mark.parametrize("kind", list(CMLocatorKind))
+    def test_execute(self, live_mock_server, kind):
+        config = CMReadingSyncConfiguration(
+            {kind: 1.0},
+            updates=5,
+            update_interval=CMThinkTimeConfiguration(),
+            bookmark_probability=1.0,
+            read_every=2,
+        )
+        user = live_mock_server.user()
+        document = CMLogin.login_cached(user)
+        root = document.links[CMAuthenticationLinkType.CATALOG]
+        template = CMSearchTemplates.find(user, root)
+        assert template is not None
+        live_mock_server.requests.clear()
+        CMSearchAndBookmark(template, CMReadingSync(config)).execute(user)
+
+        requests = live_mock_server.requests
+        annotations = [r for r in requests if r["name"].endswith("/annotations/")]
+        # A position and a bookmark for each update, and reads when the book is
+        # opened, after every second update, and after the last.
+        assert 10 == sum(1 for r in annotations if r["request_type"] == "POST")
+        assert 4 == sum(1 for r in annotations if r["request_type"] == "GET")
+        verified = [r for r in requests if r["request_type"] == "reading_sync"]
+        assert 3 == len(verified)
+        assert all(request["exception"] is None for request in requests)
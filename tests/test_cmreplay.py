@@ -0,0 +1,203 @@
+import gzip
+import json
+
+import gevent
+import pytest
+
+from circulation_load_test.common.cmreplay import (
+    AUTHORIZATION_TEMPLATE,
+    CMReplayer,
+    CMReplayLog,
+    CMReplayRecord,
+)
+from circulation_load_test.common.config import CMReplayConfiguration
+from circulation_load_test.replay.importer import (
+    CMAccessLogFormat,
+    CMAccessLogImporter,
+    CMAccessLogParser,
+)
+
+NGINX_LINES = [
+    '10.0.0.1 - - [18/Oct/2026:10:00:02 +0000] "GET /HAZELNUT/groups/ HTTP/1.1" '
+    '200 512 "-" "SimplyE/3.9"',
+    '10.0.0.2 - - [18/Oct/2026:10:00:00 +0000] "GET /HAZELNUT/loans/ HTTP/1.1" '
+    '200 128 "-" "Palace/1.0"',
+    "not a log line",
+    '10.0.0.1 - - [18/Oct/2026:10:00:05 +0000] "GET /HAZELNUT/search?q=x HTTP/1.1" '
+    '200 64 "-" "SimplyE/3.9"',
+]
+
+ALB_LINE = (
+    "https 2026-10-18T10:00:00.250000Z app/cm/50dc6c495c0c9188 192.168.131.39:2817 "
+    "10.0.0.1:80 0.000 0.001 0.000 200 200 34 366 "
+    '"GET https://cm.example.com:443/HAZELNUT/annotations/ HTTP/1.1" "Palace/1.0" '
+    "ECDHE-RSA-AES128-GCM-SHA256 TLSv1.2 arn:aws:elasticloadbalancing:tg "
+    '"Root=1-58337262-36d228ad5d99923122bbe354" "-" "-" 0 2026-10-18T10:00:00.249000Z '
+    '"forward" "-" "-" "10.0.0.1:80" "200" "-" "-"'
+)
+
+
+def _write_log(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record.to_json_dict()) + "\n")
+
+
+class TestCMReplayConfiguration:
+    def test_defaults(self):
+        config = CMReplayConfiguration.parse({})
+        assert config.log is None
+        assert 1.0 == config.speed
+        assert not config.loop
+
+    @pytest.mark.parametrize(
+        "data", [{"log": 1}, {"speed": 0}, {"loop": "yes"}, {"queue_size": 0}]
+    )
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            CMReplayConfiguration.parse(data)
+
+
+class TestCMReplayLog:
+    def test_round_trip_gzip(self, tmp_path):
+        record = CMReplayRecord(
+            1.5, "PUT", "/A/patrons/me", {"X": "y"}, '{"a": 1}', "p1", "profile"
+        )
+        path = tmp_path / "replay.jsonl.gz"
+        with gzip.open(path, "wt") as f:
+            f.write("\n" + json.dumps(record.to_json_dict()) + "\n")
+        assert [record] == list(CMReplayLog(str(path)))
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"method": "GET", "path": "/"},
+            {"t": -1, "path": "/"},
+            {"t": 0, "path": "groups"},
+            {"t": 0, "path": "/", "headers": {"A": 1}},
+        ],
+    )
+    def test_invalid(self, tmp_path, data):
+        path = tmp_path / "replay.jsonl"
+        path.write_text(json.dumps(data) + "\n")
+        with pytest.raises(ValueError, match=":1:"):
+            list(CMReplayLog(str(path)))
+
+
+class TestCMReplayer:
+    def test_affinity(self, tmp_path):
+        records = [
+            CMReplayRecord(i * 0.001, "GET", f"/{i}", patron=patron)
+            for i, patron in enumerate(["a", "b", "a", None, "b", "a"])
+        ]
+        path = tmp_path / "replay.jsonl"
+        _write_log(path, records)
+        replayer = CMReplayer(CMReplayLog(str(path)), speed=10.0)
+        first = replayer.register()
+        second = replayer.register()
+
+        received = {first: [], second: []}
+        for channel in (first, second):
+            while True:
+                item = channel.get() if channel.queue.qsize() else None
+                if item is None:
+                    if replayer.finished:
+                        break
+                    gevent.sleep(0.001)
+                    continue
+                received[channel].append(item[1])
+
+        assert 6 == sum(len(items) for items in received.values())
+        for items in received.values():
+            patrons = {record.patron for record in items if record.patron}
+            assert 1 == len(patrons)
+        replayer.unregister(first)
+        replayer.unregister(second)
+
+    def test_speed_and_finish(self, tmp_path):
+        records = [CMReplayRecord(t, "GET", "/") for t in (0.0, 0.2, 0.4)]
+        path = tmp_path / "replay.jsonl"
+        _write_log(path, records)
+        replayer = CMReplayer(CMReplayLog(str(path)), speed=4.0)
+        channel = replayer.register()
+        items = [channel.get() for _ in range(4)]
+        assert items[-1] is None
+        due = [item[0] for item in items[:3]]
+        assert pytest.approx([0.0, 0.05, 0.1]) == [d - due[0] for d in due]
+        assert channel is not None
+        assert replayer.register().get() is None
+
+
+class TestCMReplay:
+    def test_replay(self, live_mock_server, tmp_path):
+        from circulation_load_test.common.cmreplay import CMReplay, CMReplayers
+
+        library = live_mock_server.settings.libraries[0]
+        path = tmp_path / "replay.jsonl"
+        _write_log(
+            path,
+            [
+                CMReplayRecord(0.0, "GET", f"/{library}/groups", patron="p"),
+                CMReplayRecord(
+                    0.01,
+                    "GET",
+                    f"/{library}/loans/",
+                    {"Authorization": AUTHORIZATION_TEMPLATE},
+                    patron="p",
+                    name="loans",
+                ),
+            ],
+        )
+        live_mock_server.hosts["circulation_manager"]["replay"] = {"log": str(path)}
+        live_mock_server.write()
+        user = live_mock_server.user()
+        requests = live_mock_server.requests
+
+        replayer = CMReplayers.get()
+        assert replayer is not None
+        replay = CMReplay(replayer.register())
+        assert replay.execute(user)
+        assert replay.execute(user)
+        assert not replay.execute(user)
+
+        replayed = [r for r in requests if r["request_type"] == "GET"]
+        assert ["/[library]/groups", "loans"] == [r["name"] for r in replayed]
+        assert all(r["exception"] is None for r in replayed)
+
+
+class TestCMAccessLogImporter:
+    def test_nginx(self):
+        importer = CMAccessLogImporter(
+            CMAccessLogParser(CMAccessLogFormat.NGINX), reorder_window=10.0
+        )
+        records = list(importer.convert(NGINX_LINES))
+        assert [0.0, 2.0, 5.0] == [record.time for record in records]
+        assert [
+            "/HAZELNUT/loans/",
+            "/HAZELNUT/groups/",
+            "/HAZELNUT/search?q=x",
+        ] == [record.path for record in records]
+        assert {"Authorization": AUTHORIZATION_TEMPLATE} == records[0].headers
+        assert {} == records[1].headers
+        assert records[1].patron == records[2].patron != records[0].patron
+        assert 3 == importer.imported
+        assert 1 == importer.skipped
+
+    def test_late_entries_keep_order(self):
+        lines = [
+            f'10.0.0.1 - - [18/Oct/2026:10:00:0{second} +0000] "GET / HTTP/1.1" '
+            '200 1 "-" "-"'
+            for second in (0, 1, 5, 0)
+        ]
+        importer = CMAccessLogImporter(
+            CMAccessLogParser(CMAccessLogFormat.NGINX), reorder_window=2.0
+        )
+        records = list(importer.convert(lines))
+        assert [0.0, 1.0, 1.0, 5.0] == [record.time for record in records]
+
+    def test_alb(self):
+        entry = CMAccessLogParser(CMAccessLogFormat.ALB).parse(ALB_LINE)
+        assert entry is not None
+        assert "/HAZELNUT/annotations/" == entry.path
+        assert "192.168.131.39" == entry.client
+        assert "Palace/1.0" == entry.agent
@@ -0,0 +1,112 @@
+import pytest
+
+from circulation_load_test.common.cmrequestnames import DEFAULT_RULES, CMRequestNamer
+from circulation_load_test.common.config import (
+    DEFAULT_QUERY_VALUES,
+    CMRequestNamesConfiguration,
+)
+
+
+@pytest.fixture(scope="function")
+def namer() -> CMRequestNamer:
+    return CMRequestNamer(
+        "http://cm.example.com/",
+        ["HAZELNUT", "WALNUT"],
+        DEFAULT_RULES,
+        set(DEFAULT_QUERY_VALUES),
+    )
+
+
+class TestCMRequestNamer:
+    @pytest.mark.parametrize(
+        "url, name",
+        [
+            ("http://cm.example.com/", "/"),
+            ("http://cm.example.com/HAZELNUT/", "/[library]/"),
+            ("http://cm.example.com/WALNUT/groups/12", "/[library]/groups/[lane]"),
+            (
+                "/HAZELNUT/feed/9?order=title&key=x",
+                "/[library]/feed/[lane]?key=*&order=title",
+            ),
+            ("/HAZELNUT/works/123", "/[library]/works/[work]"),
+            ("/HAZELNUT/works/123/borrow", "/[library]/works/[work]/borrow"),
+            (
+                "/HAZELNUT/works/URI/urn%3Aisbn%3A97/borrow/3",
+                "/[library]/works/[work]/borrow/[id]",
+            ),
+            (
+                "/HAZELNUT/works/contributor/Jane%20Doe/eng/All",
+                "/[library]/works/contributor/[name]",
+            ),
+            ("/HAZELNUT/loans/", "/[library]/loans/"),
+            ("/HAZELNUT/loans/55/revoke", "/[library]/loans/[id]/revoke"),
+            ("/HAZELNUT/annotations/99", "/[library]/annotations/[id]"),
+            (
+                "/HAZELNUT/search/?entrypoint=All&q=cats",
+                "/[library]/search/?entrypoint=All&q=*",
+            ),
+            (
+                "/HAZELNUT/search/?entrypoint=All&q=dogs&after=50",
+                "/[library]/search/?after=*&entrypoint=All&q=*",
+            ),
+            (
+                "https://other.example.org/HAZELNUT/authentication_document",
+                "other.example.org/[library]/authentication_document",
+            ),
+        ],
+    )
+    def test_default_rules(self, namer: CMRequestNamer, url: str, name: str):
+        assert name == namer.name(url)
+
+    def test_configured_rules(self):
+        config = CMRequestNamesConfiguration.parse(
+            {
+                "rules": [{"pattern": r"/patrons/me/?$", "replacement": "/profile"}],
+                "default_rules": False,
+                "query_values": [],
+            }
+        )
+        rules = [(rule.pattern, rule.replacement) for rule in config.rules]
+        namer = CMRequestNamer("http://cm/", [], rules, config.query_values)
+        assert "/HAZELNUT/profile" == namer.name("http://cm/HAZELNUT/patrons/me/")
+        assert "/HAZELNUT/groups/3?entrypoint=*" == namer.name(
+            "http://cm/HAZELNUT/groups/3?entrypoint=Book"
+        )
+
+    def test_cache_is_bounded(self):
+        namer = CMRequestNamer("http://cm/", [], DEFAULT_RULES, set(), cache_size=2)
+        for index in range(5):
+            assert "/groups/[lane]" == namer.name(f"http://cm/groups/{index}")
+        assert len(namer._cache) <= 2
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"rules": [{"pattern": "(", "replacement": ""}]},
+            {"rules": [{"pattern": "x"}]},
+            {"rules": {}},
+            {"default_rules": "no"},
+            {"query_values": "entrypoint"},
+        ],
+    )
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            CMRequestNamesConfiguration.parse(data)
+
+    def test_search_names_are_bounded(self, live_mock_server):
+        from circulation_load_test.common.cmopensearch import CMSearchTemplates
+        from circulation_load_test.common.cmsearch import CMSearch
+
+        user = live_mock_server.user()
+        root = f"{live_mock_server.address}{live_mock_server.settings.libraries[0]}/"
+        template = CMSearchTemplates.find(user, root)
+        assert template is not None
+        for _ in range(3):
+            CMSearch(template).execute(user)
+
+        names = {r["name"] for r in live_mock_server.requests if "search" in r["name"]}
+        assert {
+            "/[library]/search/?entrypoint=All",
+            "/[library]/search/?entrypoint=All&q=*",
+            "/[library]/search/?after=*&entrypoint=All&q=*",
+        } == names
@@ -0,0 +1,116 @@
+import pytest
+
+from circulation_load_test.common.cmopensearch import CMSearchTemplates
+from circulation_load_test.common.cmsearch import CMSearch, CMSearchDepth
+from circulation_load_test.common.config import CMSearchPaginationConfiguration
+
+
+def _search(live_mock_server, pagination: CMSearchPaginationConfiguration):
+    user = live_mock_server.user()
+    root = f"{live_mock_server.address}{live_mock_server.settings.libraries[0]}/"
+    template = CMSearchTemplates.find(user, root)
+    assert template is not None
+    live_mock_server.requests.clear()
+    search = CMSearch(template, pagination)
+    search.execute(user)
+    return search
+
+
+def _pages(requests):
+    return [r for r in requests if r["request_type"] == "GET"]
+
+
+class TestCMSearchDepth:
+    def test_unbounded(self):
+        assert CMSearchDepth(CMSearchPaginationConfiguration())() is None
+
+    def test_weights(self):
+        depth = CMSearchDepth(CMSearchPaginationConfiguration([0, 0, 1]))
+        assert {3} == {depth() for _ in range(20)}
+
+    def test_maximum(self):
+        config = CMSearchPaginationConfiguration([0, 0, 1], maximum_pages=2)
+        assert 2 == CMSearchDepth(config)()
+        assert 4 == CMSearchDepth(CMSearchPaginationConfiguration(maximum_pages=4))()
+
+
+class TestCMSearch:
+    def test_all_pages(self, live_mock_server):
+        pagination = CMSearchPaginationConfiguration(page_stats=True)
+        search = _search(live_mock_server, pagination)
+        requests = live_mock_server.requests
+        assert 3 == search.pages == len(_pages(requests))
+        assert ["1", "2", "3"] == [
+            r["name"] for r in requests if r["request_type"] == "search_page"
+        ]
+
+    def test_depth(self, live_mock_server):
+        search = _search(live_mock_server, CMSearchPaginationConfiguration([0, 1]))
+        assert 2 == search.pages == len(_pages(live_mock_server.requests))
+        assert [] == [
+            r for r in live_mock_server.requests if r["request_type"] == "search_page"
+        ]
+
+    @pytest.mark.parametrize("maximum_pages", [1, 2, None])
+    def test_prefetch(self, live_mock_server, maximum_pages):
+        pagination = CMSearchPaginationConfiguration(
+            maximum_pages=maximum_pages, prefetch=True
+        )
+        search = _search(live_mock_server, pagination)
+        expected = maximum_pages or 3
+        assert expected == search.pages == len(_pages(live_mock_server.requests))
+        assert all(r["exception"] is None for r in live_mock_server.requests)
+
+    @pytest.mark.parametrize("prefetch", [True, False])
+    def test_prefetch_overlaps(self, live_mock_server, prefetch):
+        live_mock_server.settings.latency_ms = 20.0
+        user = live_mock_server.user()
+        root = f"{live_mock_server.address}{live_mock_server.settings.libraries[0]}/"
+        template = CMSearchTemplates.find(user, root)
+        assert template is not None
+        search = CMSearch(template, CMSearchPaginationConfiguration(prefetch=prefetch))
+
+        events = []
+        conditional_get = user.conditional_get
+
+        def get(url, name, headers=None):
+            events.append("get")
+            return conditional_get(url, name, headers)
+
+        def think_time() -> float:
+            events.append("think")
+            return 0.01
+
+        user.conditional_get = get
+        search.page_think_time = think_time
+        search.execute(user)
+
+        # With prefetch, each following page is requested before the patron has
+        # finished looking at the current page; without, only afterwards.
+        if prefetch:
+            assert ["get", "get", "think", "get", "think"] == events
+        else:
+            assert ["get", "think", "get", "think", "get"] == events
+
+    def test_configuration(self):
+        config = CMSearchPaginationConfiguration.parse(
+            {
+                "depth_weights": [5, 3, 1],
+                "maximum_pages": 10,
+                "prefetch": True,
+                "page_think_time": {"distribution": "constant", "seconds": 2},
+            }
+        )
+        assert [5.0, 3.0, 1.0] == config.depth_weights
+        assert 10 == config.maximum_pages and config.prefetch
+        assert 2.0 == config.page_think_time.minimum
+        for bad in [
+            {"depth_weights": [0, 0]},
+            {"depth_weights": [-1, 2]},
+            {"depth_weights": "many"},
+            {"maximum_pages": 0},
+            {"prefetch": "yes"},
+            {"page_think_time": {"distribution": "sometimes"}},
+        ]:
+            with pytest.raises(ValueError):
+                CMSearchPaginationConfiguration.parse(bad)
@@ -0,0 +1,30 @@
+import time
+
+from circulation_load_test.common.cmsession import CMSession, CMSessionCache
+from circulation_load_test.common.cmuser import CMAuthDocument
+
+
+class TestCMSessionCache:
+    def test_empty(self):
+        cache = CMSessionCache(ttl=60.0)
+        assert cache.get() is None
+
+    def test_put_get(self):
+        cache = CMSessionCache(ttl=60.0)
+        session = CMSession(CMAuthDocument({}, {}), None, None)
+        cache.put(session)
+        assert session is cache.get()
+
+    def test_expired(self):
+        cache = CMSessionCache(ttl=60.0)
+        session = CMSession(
+            CMAuthDocument({}, {}), None, None, created=time.monotonic() - 120.0
+        )
+        cache.put(session)
+        assert cache.get() is None
+
+    def test_invalidate(self):
+        cache = CMSessionCache(ttl=60.0)
+        cache.put(CMSession(CMAuthDocument({}, {}), None, None))
+        cache.invalidate()
+        assert cache.get() is None
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from circulation_load_test.common.cmshard import CMShard, CMShards
+
+
+class TestCMShard:
+    def test_size_and_items(self):
+        shards = [CMShard(index, 3) for index in range(3)]
+        assert [4, 3, 3] == [shard.size(10) for shard in shards]
+        items = [
+            shard.item(position)
+            for shard in shards
+            for position in range(shard.size(10))
+        ]
+        assert list(range(10)) == sorted(items)
+        assert [1, 4, 7] == list(shards[1].select(range(10)))
+
+    def test_owns(self):
+        shards = [CMShard(index, 4) for index in range(4)]
+        for key in [f"urn:book:{index}" for index in range(50)]:
+            assert 1 == sum(shard.owns(key) for shard in shards)
+        assert CMShard().owns("anything")
+
+    @pytest.mark.parametrize("index, count", [(0, 0), (2, 2), (-1, 2)])
+    def test_invalid(self, index, count):
+        with pytest.raises(ValueError):
+            CMShard(index, count)
+
+
+class TestCMDistribution:
+    def test_shards(self):
+        from circulation_load_test.common.cmdistribution import CMDistribution
+
+        shards = CMDistribution.shards(["worker-b", "worker-a", "worker-c"])
+        assert CMShard(0, 3) == shards["worker-a"]
+        assert CMShard(2, 3) == shards["worker-c"]
+
+    def test_receive(self, live_mock_server):
+        from circulation_load_test.common.cmdistribution import CMDistribution
+        from circulation_load_test.common.cmuserpool import CMUserPools
+
+        assert ("HAZELNUT", "WALNUT") == CMShards.libraries()
+        before = CMUserPools.get()
+
+        message = SimpleNamespace(data=CMShard(1, 2).to_json_dict())
+        CMDistribution.receive(environment=None, msg=message)
+        assert CMShard(1, 2) == CMShards.get()
+        assert ("WALNUT",) == CMShards.libraries()
+
+        pool = CMUserPools.get()
+        assert pool is not before
+        assert 1 == len(pool)
+        assert "user1" == pool.lease().user.name
+
+    def test_receive_while_running(self, live_mock_server):
+        from circulation_load_test.common.cmdistribution import CMDistribution
+        from circulation_load_test.common.cmuserpool import CMUserPools
+
+        pool = CMUserPools.get()
+        lease = pool.lease()
+        runner = SimpleNamespace(user_count=1)
+        environment = SimpleNamespace(runner=runner)
+
+        # The shard is not used while a user holds a lease from the pool.
+        message = SimpleNamespace(data=CMShard(1, 2).to_json_dict())
+        CMDistribution.receive(environment=environment, msg=message)
+        assert CMShard() == CMShards.get()
+        assert pool is CMUserPools.get()
+        CMDistribution.apply_pending(environment=environment)
+        assert CMShard() == CMShards.get()
+
+        pool.release(lease)
+        runner.user_count = 0
+        CMDistribution.apply_pending(environment=environment)
+        assert CMShard(1, 2) == CMShards.get()
+        assert pool is not CMUserPools.get()
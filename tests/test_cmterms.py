@@ -0,0 +1,95 @@
+import random
+from collections import Counter
+
+import pytest
+
+from circulation_load_test.common.cmterms import (
+    CMAliasSampler,
+    CMQueryGenerator,
+    CMTermCorpus,
+    CMTermTable,
+    zipf_weights,
+)
+from circulation_load_test.common.config import CMQueryShape
+
+
+class TestCMAliasSampler:
+    def test_distribution(self):
+        sampler = CMAliasSampler.create([1.0, 0.0, 3.0])
+        generator = random.Random(1)
+        counts = Counter(sampler.sample(generator) for _ in range(40000))
+        assert 0 == counts[1]
+        assert 0.7 < counts[2] / 30000 < 1.3
+        assert 0.7 < counts[0] / 10000 < 1.3
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            CMAliasSampler.create([])
+        with pytest.raises(ValueError):
+            CMAliasSampler.create([0.0, 0.0])
+
+
+class TestCMTermTable:
+    def test_lookup(self):
+        table = CMTermTable.create(["dog", "café", "", "fish"])
+        assert 4 == len(table)
+        assert ["dog", "café", "", "fish"] == list(table)
+        assert "café" == table[1] and "fish" == table[-1]
+        assert ["café", "fish"] == table[1::2]
+        with pytest.raises(IndexError):
+            table[4]
+
+
+class TestCMTermCorpus:
+    def test_parse_text(self):
+        corpus = CMTermCorpus.parse_text(
+            ["# comment", "dog\t10", "", "cat\t2\n", "fish\n"]
+        )
+        assert ["dog", "cat", "fish"] == list(corpus.terms)
+        assert [10.0, 2.0, 1.0] == list(corpus.frequencies)
+
+    def test_parse_text_malformed(self):
+        with pytest.raises(ValueError):
+            CMTermCorpus.parse_text(["dog\tmany"])
+
+    def test_zipf(self):
+        assert [0.25, 1.0, 1.0 / 9.0] == zipf_weights([5.0, 9.0, 1.0], 2.0)
+        assert [1.0, 1.0, 1.0] == zipf_weights([5.0, 9.0, 1.0], 0.0)
+
+    def test_compile(self, tmp_path):
+        corpus = CMTermCorpus.parse_text(["dog\t10", "café\t2", "fish"])
+        path = str(tmp_path / "terms.bin")
+        corpus.compile(path)
+        loaded = CMTermCorpus.load(path)
+        assert list(corpus.terms) == list(loaded.terms)
+        assert list(corpus.frequencies) == list(loaded.frequencies)
+        assert list(corpus.sampler.aliases) == list(loaded.sampler.aliases)
+        assert loaded.sample() in {"dog", "café", "fish"}
+
+    def test_default_corpus_has_no_newlines(self):
+        from circulation_load_test.common.words import DEFAULT_CORPUS
+
+        corpus = CMTermCorpus.load(DEFAULT_CORPUS)
+        assert len(corpus) > 20000
+        assert not any(term != term.strip() for term in corpus.terms)
+
+
+class TestCMQueryGenerator:
+    def test_shapes(self):
+        words = CMTermCorpus.parse_text(["a", "b"])
+        titles = CMTermCorpus.parse_text(["The Title"])
+        generator = CMQueryGenerator(
+            words,
+            {CMQueryShape.MULTIWORD: 1.0, CMQueryShape.TITLE: 1.0},
+            multiword_terms=3,
+            titles=titles,
+        )
+        queries = {generator.query(random.Random(seed)) for seed in range(100)}
+        assert "The Title" in queries
+        for query in queries - {"The Title"}:
+            assert 2 <= len(query.split(" ")) <= 3
+
+    def test_missing_corpus(self):
+        words = CMTermCorpus.parse_text(["a"])
+        with pytest.raises(ValueError):
+            CMQueryGenerator(words, {CMQueryShape.AUTHOR: 1.0})
@@ -0,0 +1,73 @@
+import pytest
+
+from circulation_load_test.common.cmshard import CMShard
+from circulation_load_test.common.cmuserpool import CMUserFile, CMUserPool
+from circulation_load_test.common.config import CMUser, CMUserAssignmentPolicy
+
+
+@pytest.fixture(scope="function")
+def user_file(tmp_path) -> CMUserFile:
+    path = tmp_path / "patrons.csv"
+    path.write_text("username,password\n# comment\nuser3,pass3\n\nuser4,pass4\n")
+    file = CMUserFile(str(path))
+    yield file
+    file.close()
+
+
+class TestCMUserPool:
+    def test_file(self, user_file: CMUserFile):
+        assert 2 == len(user_file)
+        assert "user4" == user_file.get(1).name
+        assert "pass4" == user_file.get(1).password
+        assert "user3" == user_file.get(0).name
+
+    def test_round_robin(self, user_file: CMUserFile):
+        users = [CMUser("user0", "x", True)]
+        pool = CMUserPool(users, [user_file], CMUserAssignmentPolicy.ROUND_ROBIN)
+        names = [pool.lease().user.name for _ in range(4)]
+        assert ["user0", "user3", "user4", "user0"] == names
+
+    def test_random(self, user_file: CMUserFile):
+        pool = CMUserPool([], [user_file], CMUserAssignmentPolicy.RANDOM)
+        for _ in range(10):
+            assert pool.lease().user.name in {"user3", "user4"}
+
+    def test_exclusive(self, user_file: CMUserFile):
+        pool = CMUserPool([], [user_file], CMUserAssignmentPolicy.EXCLUSIVE)
+        lease0 = pool.lease()
+        lease1 = pool.lease()
+        assert {"user3", "user4"} == {lease0.user.name, lease1.user.name}
+        assert 2 == pool.leased
+        with pytest.raises(ValueError):
+            pool.lease()
+
+        pool.release(lease0)
+        assert 1 == pool.leased
+        assert lease0.user.name == pool.lease().user.name
+
+    def test_shards_are_disjoint(self, user_file: CMUserFile):
+        users = [CMUser(f"user{index}", "x", index == 0) for index in range(3)]
+        names = []
+        for index in range(2):
+            pool = CMUserPool(
+                users, [user_file], CMUserAssignmentPolicy.EXCLUSIVE, CMShard(index, 2)
+            )
+            names.append({pool.lease().user.name for _ in range(len(pool))})
+        assert {"user0", "user2", "user4"} == names[0]
+        assert {"user1", "user3"} == names[1]
+
+    def test_fewer_users_than_shards(self):
+        users = [CMUser(f"user{index}", "x", index == 0) for index in range(2)]
+        names = []
+        for index in range(5):
+            pool = CMUserPool(
+                users, [], CMUserAssignmentPolicy.EXCLUSIVE, CMShard(index, 5)
+            )
+            assert 1 == len(pool)
+            names.append(pool.lease().user.name)
+        assert ["user0", "user1", "user0", "user1", "user0"] == names
+
+    def test_no_users(self):
+        pool = CMUserPool([], [], CMUserAssignmentPolicy.ROUND_ROBIN, CMShard(1, 2))
+        with pytest.raises(ValueError, match="No users"):
+            pool.lease()
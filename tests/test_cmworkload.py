@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from circulation_load_test.common.cmworkload import CMArrivals, CMThinkTime, CMWorkload
+from circulation_load_test.common.config import (
+    CMArrivalDistribution,
+    CMArrivalRateConfiguration,
+    CMThinkTimeConfiguration,
+    CMThinkTimeDistribution,
+    CMWorkloadConfiguration,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def login():
+    pass
+
+
+def search():
+    pass
+
+
+@CMWorkload.optional
+def read():
+    pass
+
+
+class TestCMWorkload:
+    def test_weighted_tasks(self):
+        tasks = CMWorkload.weighted_tasks([login, search, search], {"login": 3})
+        assert [login, login, login, search, search] == tasks
+        assert [search, search] == CMWorkload.weighted_tasks(
+            [login, search, search], {"login": 0}
+        )
+
+    def test_weighted_tasks_optional(self):
+        assert [login] == CMWorkload.weighted_tasks([login, read], {})
+        assert [login, read, read] == CMWorkload.weighted_tasks(
+            [login, read], {"read": 2}
+        )
+        assert [read] == CMWorkload.weighted_tasks([read], {}, tags={"cm", "read"})
+        with pytest.raises(ValueError):
+            CMWorkload.weighted_tasks([read], {}, tags={"cm"})
+
+    def test_weighted_tasks_unknown(self):
+        with pytest.raises(ValueError):
+            CMWorkload.weighted_tasks([login], {"bookmarks": 1})
+        with pytest.raises(ValueError):
+            CMWorkload.weighted_tasks([login], {"login": 0})
+
+    def test_parse(self):
+        config = CMWorkloadConfiguration.parse(
+            {
+                "weights": {"login": 2},
+                "think_time": {"distribution": "uniform", "maximum_seconds": 2},
+            }
+        )
+        assert {"login": 2} == config.weights
+        assert CMThinkTimeDistribution.UNIFORM == config.think_time.distribution
+        assert config.arrival_rate is None
+        with pytest.raises(ValueError):
+            CMWorkloadConfiguration.parse(
+                {"think_time": {}, "arrival_rate": {"per_second": 1}}
+            )
+        with pytest.raises(ValueError):
+            CMWorkloadConfiguration.parse({"arrival_rate": {"per_second": 0}})
+
+
+class TestCMThinkTime:
+    def test_distributions(self):
+        random.seed(1)
+        none = CMThinkTime(CMThinkTimeConfiguration())
+        assert 0.0 == none()
+        uniform = CMThinkTime(
+            CMThinkTimeConfiguration(
+                CMThinkTimeDistribution.UNIFORM, minimum=1.0, maximum=2.0
+            )
+        )
+        assert all(1.0 <= uniform() <= 2.0 for _ in range(100))
+        capped = CMThinkTime(
+            CMThinkTimeConfiguration(
+                CMThinkTimeDistribution.EXPONENTIAL, mean=5.0, maximum=6.0
+            )
+        )
+        assert all(0.0 <= capped() <= 6.0 for _ in range(100))
+        lognormal = CMThinkTime(
+            CMThinkTimeConfiguration(
+                CMThinkTimeDistribution.LOGNORMAL, mean=2.0, sigma=0.5
+            )
+        )
+        mean = sum(lognormal() for _ in range(20000)) / 20000
+        assert 1.8 < mean < 2.2
+
+
+class TestCMArrivals:
+    def test_constant_rate(self):
+        clock = Clock()
+        arrivals = CMArrivals(CMArrivalRateConfiguration(per_second=10.0), clock)
+        assert 0.0 == arrivals.reserve()
+        assert pytest.approx(0.1) == arrivals.reserve()
+        assert pytest.approx(0.2) == arrivals.reserve()
+        clock.now += 0.25
+        # The arrival at 100.3 is due in 0.05 seconds, regardless of how many users
+        # are waiting.
+        assert pytest.approx(0.05) == arrivals.reserve()
+
+    def test_lag_and_drop(self):
+        clock = Clock()
+        arrivals = CMArrivals(
+            CMArrivalRateConfiguration(
+                per_second=10.0,
+                distribution=CMArrivalDistribution.CONSTANT,
+                maximum_lag=0.5,
+            ),
+            clock,
+        )
+        arrivals.reserve()
+        clock.now += 1.05
+        # Arrivals from 100.1 to 100.5 are more than 0.5 seconds late.
+        assert pytest.approx(-0.45) == arrivals.reserve()
+        assert 5 == arrivals.dropped
+        assert 2 == arrivals.started
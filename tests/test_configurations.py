@@ -1,9 +1,18 @@
+import json
 import os
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest
 
-from circulation_load_test.common.config import Configuration, Configurations
+from circulation_load_test.common.config import (
+    CMQueryShape,
+    CMUserAssignmentPolicy,
+    Configuration,
+    Configurations,
+    Configured,
+)
 
 
 class ConfigurationsFixture:
@@ -37,6 +46,17 @@ class TestConfigurations:
         assert "http://example1.example.com/" == config.circulation_manager.address
         assert 3 == len(config.circulation_manager.users)
         assert {"HAZELNUT", "WALNUT"} == config.circulation_manager.library_identifiers
+        assert 300.0 == config.circulation_manager.session_ttl
+        assert (
+            CMUserAssignmentPolicy.ROUND_ROBIN
+            == config.circulation_manager.user_assignment.policy
+        )
+        assert 99 == config.circulation_manager.bookmarks.count
+        assert 1 == config.circulation_manager.bookmarks.concurrency
+        assert not config.circulation_manager.loan_pool.enabled
+        assert {
+            CMQueryShape.WORD: 1.0
+        } == config.circulation_manager.search_terms.shapes
 
     def test_load_bad_user_0(self, configurations_fixture: ConfigurationsFixture):
         file = os.path.join(Path(__file__).parent, "hosts_user_bad_0.json")
@@ -47,3 +67,47 @@ class TestConfigurations:
         file = os.path.join(Path(__file__).parent, "hosts_user_bad_1.json")
         with pytest.raises(ValueError):
             configurations_fixture.load(file)
+
+
+class TestConfigured:
+    def test_lazy(self, configurations_fixture: ConfigurationsFixture):
+        class Example:
+            host = Configured(lambda config: config.circulation_manager.address)
+
+        file = os.path.join(Path(__file__).parent, "hosts.json")
+        configurations_fixture.load(file)
+        address = Configurations.get().circulation_manager.address
+        assert address == Example.host == Example().host
+
+    def test_locustfile(self, tmp_path):
+        # The locustfile can be imported without a configuration; the configuration
+        # is read when Locust initializes.
+        root = Path(__file__).parent.parent
+        environment = dict(os.environ, PYTHONPATH=str(root / "src"))
+        environment.pop("CIRCULATION_LOAD_CONFIGURATION_FILE", None)
+        script = "import locustfile; print(len(locustfile.CMTests.tasks))"
+        subprocess.run(
+            [sys.executable, "-c", script], cwd=root, env=environment, check=True
+        )
+
+        hosts = json.loads((Path(__file__).parent / "hosts.json").read_text())
+        hosts["circulation_manager"]["workload"] = {"weights": {"login": 5}}
+        path = tmp_path / "hosts.json"
+        path.write_text(json.dumps(hosts))
+        environment["CIRCULATION_LOAD_CONFIGURATION_FILE"] = str(path)
+        script = (
+            "import locust, locustfile\n"
+            "from locust.env import Environment\n"
+            "locust.events.init.fire(environment=Environment(), runner=None)\n"
+            "names = [task.__name__ for task in locustfile.CMTests.tasks]\n"
+            "print(names.count('login'), locustfile.CMReplayTests.weight)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=root,
+            env=environment,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        assert "5 0" == result.stdout.strip()
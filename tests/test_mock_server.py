@@ -0,0 +1,147 @@
+import io
+import json
+from base64 import b64encode
+from typing import Optional, Tuple
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from circulation_load_test.common.cmopds import CMOPDSParser
+from circulation_load_test.mock.server import (
+    REL_ANNOTATION_SERVICE,
+    REL_AUTH_DOCUMENT,
+    REL_BORROW,
+    REL_REVOKE,
+    CMMockServer,
+    CMMockSettings,
+)
+
+AUTHORIZATION = "Basic " + b64encode(b"user0:abcd1234").decode("ascii")
+
+
+class MockServerFixture:
+    def __init__(self):
+        self.server = CMMockServer(
+            CMMockSettings(feed_entries=3, search_pages=2, registry_libraries=4)
+        )
+
+    def request(
+        self,
+        path: str,
+        method: str = "GET",
+        body: bytes = b"",
+        authorization: Optional[str] = AUTHORIZATION,
+    ) -> Tuple[str, bytes]:
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "HTTP_HOST": "cm.example.com",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        if authorization:
+            environ["HTTP_AUTHORIZATION"] = authorization
+        setup_testing_defaults(environ)
+
+        statuses = []
+        chunks = self.server(environ, lambda status, headers: statuses.append(status))
+        return statuses[0], b"".join(chunks)
+
+
+@pytest.fixture(scope="function")
+def mock_server() -> MockServerFixture:
+    return MockServerFixture()
+
+
+class TestCMMockServer:
+    def test_root_feed(self, mock_server: MockServerFixture):
+        status, body = mock_server.request("/")
+        assert "200 OK" == status
+        feed = CMOPDSParser.parse(body)
+        link = feed.link(REL_AUTH_DOCUMENT)
+        assert link is not None
+        assert "http://cm.example.com/HAZELNUT/authentication_document" == link.href
+        assert 3 == len(feed.entries)
+
+    def test_auth_document(self, mock_server: MockServerFixture):
+        status, body = mock_server.request("//WALNUT/authentication_document")
+        assert "200 OK" == status
+        document = json.loads(body)
+        assert (
+            "http://opds-spec.org/auth/basic" == document["authentication"][0]["type"]
+        )
+
+    def test_unknown_library(self, mock_server: MockServerFixture):
+        status, _ = mock_server.request("/ACORN/")
+        assert "404 Not Found" == status
+
+    def test_profile_requires_credentials(self, mock_server: MockServerFixture):
+        status, _ = mock_server.request("/HAZELNUT/patrons/me/", authorization=None)
+        assert "401 Unauthorized" == status
+        status, _ = mock_server.request("/HAZELNUT/patrons/me/", method="PUT")
+        assert "200 OK" == status
+
+    def test_search_pagination(self, mock_server: MockServerFixture):
+        status, body = mock_server.request("/HAZELNUT/search/?entrypoint=All&q=dog")
+        assert "200 OK" == status
+        page0 = CMOPDSParser.parse(body)
+        next = page0.link("next")
+        assert next is not None
+        assert REL_BORROW in {link.rel for link in page0.entries[0].links}
+
+        _, body = mock_server.request(next.href.replace("http://cm.example.com", ""))
+        page1 = CMOPDSParser.parse(body)
+        assert page1.link("next") is None
+
+    def test_borrow_shelf_annotations(self, mock_server: MockServerFixture):
+        status, body = mock_server.request("/HAZELNUT/works/17/borrow")
+        assert "201 Created" == status
+        assert CMOPDSParser.parse(body).link(REL_REVOKE) is not None
+
+        _, body = mock_server.request("/HAZELNUT/loans/")
+        assert CMOPDSParser.parse(body).link(REL_ANNOTATION_SERVICE) is not None
+
+        annotation = {"motivation": "x", "target": {"source": "urn:17"}}
+        status, _ = mock_server.request(
+            "/HAZELNUT/annotations/",
+            method="POST",
+            body=json.dumps(annotation).encode("utf-8"),
+        )
+        assert "200 OK" == status
+        _, body = mock_server.request("/HAZELNUT/annotations/")
+        assert 1 == json.loads(body)["total"]
+
+    def test_registry(self, mock_server: MockServerFixture):
+        status, body = mock_server.request("/libraries")
+        assert "200 OK" == status
+        assert 4 == len(json.loads(body)["catalogs"])
+
+
+class TestCMMockServerLive:
+    def test_tasks(self, live_mock_server):
+        from circulation_load_test.common.cmbookmarkwriter import CMBookmarkWriter
+        from circulation_load_test.common.cmfeedwalk import CMFeedWalk
+        from circulation_load_test.common.cmlogin import CMLogin
+        from circulation_load_test.common.cmopensearch import CMSearchTemplates
+        from circulation_load_test.common.cmsearch import CMSearch
+        from circulation_load_test.common.cmsearchbookmark import CMSearchAndBookmark
+        from circulation_load_test.common.cmuser import CMAuthenticationLinkType
+
+        user = live_mock_server.user()
+        requests = live_mock_server.requests
+
+        document = CMLogin.login_cached(user)
+        assert 5 == len(requests)
+        assert document is CMLogin.login_cached(user)
+        assert 5 == len(requests)
+
+        root = document.links[CMAuthenticationLinkType.CATALOG]
+        CMFeedWalk(root, {"collection", "related"}, maximum_visits=4).execute(user)
+        template = CMSearchTemplates.find(user, root)
+        assert template is not None
+        CMSearch(template).execute(user)
+        writer = CMBookmarkWriter(count=20, concurrency=4, read_back=True)
+        CMSearchAndBookmark(template, writer).execute(user)
+        assert all(request["exception"] is None for request in requests)
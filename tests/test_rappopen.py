@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from circulation_load_test.common.config import RAppOpenConfiguration, RDocumentFetch
+from circulation_load_test.common.rappopen import (
+    RAppOpen,
+    RAuthDocumentCaches,
+    RCatalogStream,
+)
+
+LIBRARIES = {
+    "metadata": {"title": "Libraries", "note": 'not "catalogs": ['},
+    "catalogs": [
+        {
+            "metadata": {"title": "Bibliothèque ☃"},
+            "links": [
+                {
+                    "href": f"http://cm{index}/auth",
+                    "type": "application/vnd.opds.authentication.v1.0+json",
+                }
+            ],
+        }
+        for index in range(5)
+    ],
+    "links": [{"href": "http://registry/libraries", "rel": "self"}],
+}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _documents(requests):
+    return [r for r in requests if r["name"].endswith("authentication_document")]
+
+
+class TestRCatalogStream:
+    @pytest.mark.parametrize("size", [1, 7, 1 << 20])
+    def test_chunks(self, size: int):
+        data = json.dumps(LIBRARIES, ensure_ascii=False).encode("utf-8")
+        stream = RCatalogStream()
+        catalogs = []
+        for offset in range(0, len(data), size):
+            catalogs.extend(stream.feed(data[offset : offset + size]))
+        catalogs.extend(stream.close())
+
+        assert LIBRARIES["catalogs"] == catalogs
+        assert 5 == stream.count
+        assert "http://cm3/auth" == RCatalogStream.authentication_document(catalogs[3])
+
+    def test_incomplete(self):
+        stream = RCatalogStream()
+        stream.feed(b'{"catalogs": [{"links": []}, {"links"')
+        with pytest.raises(ValueError):
+            stream.close()
+
+        stream = RCatalogStream()
+        stream.feed(b'{"libraries": []}')
+        with pytest.raises(ValueError):
+            stream.close()
+
+
+class TestRAppOpen:
+    def _open(self, live_mock_server, config: RAppOpenConfiguration, selected=None):
+        user = live_mock_server.user(live_mock_server.address.rstrip("/"))
+        selected = [] if selected is None else selected
+        RAppOpen(config).execute(user, selected)
+        return live_mock_server.requests
+
+    def test_all(self, live_mock_server):
+        requests = self._open(live_mock_server, RAppOpenConfiguration())
+        assert 100 == len(_documents(requests))
+        libraries = [r for r in requests if r["name"] == "libraries"]
+        assert 1 == len(libraries)
+        assert libraries[0]["exception"] is None
+        assert libraries[0]["response_length"] > 0
+
+    def test_nearby(self, live_mock_server):
+        config = RAppOpenConfiguration(fetch=RDocumentFetch.NEARBY, nearby=3)
+        assert 3 == len(_documents(self._open(live_mock_server, config)))
+
+    def test_selected(self, live_mock_server):
+        config = RAppOpenConfiguration(fetch=RDocumentFetch.SELECTED, selected=2)
+        selected = []
+        first = _documents(self._open(live_mock_server, config, selected))
+        assert 2 == len(first) == len(selected)
+        second = _documents(self._open(live_mock_server, config, selected))
+        assert {r["url"] for r in first} == {r["url"] for r in second}
+
+    def test_document_cache(self, live_mock_server):
+        live_mock_server.hosts["registry"]["app_open"] = {"document_ttl_seconds": 60}
+        live_mock_server.write()
+        cache = RAuthDocumentCaches.get()
+        assert cache is not None and 60 == cache.ttl
+
+        # The mock's 100 catalogs share the documents of its 2 libraries.
+        clock = _Clock()
+        cache.clock = clock
+        config = RAppOpenConfiguration(pool_size=1)
+        assert 2 == len(_documents(self._open(live_mock_server, config)))
+        assert 98 == cache.fresh
+
+        # Within the TTL, no documents are fetched.
+        assert [] == _documents(self._open(live_mock_server, config))
+        assert 198 == cache.fresh
+
+        # After it, they are revalidated.
+        clock.now += 61
+        requests = self._open(live_mock_server, config)
+        assert 2 == len(_documents(requests))
+        assert 2 == [r["name"] for r in requests].count("not_modified")
+
+    def test_configuration(self):
+        config = RAppOpenConfiguration.parse({"fetch": "nearby", "nearby": 5})
+        assert RDocumentFetch.NEARBY == config.fetch and 5 == config.nearby
+        with pytest.raises(ValueError):
+            RAppOpenConfiguration.parse({"fetch": "everything"})
+        with pytest.raises(ValueError):
+            RAppOpenConfiguration.parse({"pool_size": 0})
+        with pytest.raises(ValueError):
+            RAppOpenConfiguration.parse({"document_ttl_seconds": -1})